@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+import glob
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use('Agg')
+
+from compressed_io import find_file
+from run_directory import RunDirectory
+
+# HOW TO RUN
+# cd ~/Documents/lammps_work/scripts
+# python batch_postprocess.py [runs_dir] [--workers N] [--force] [--no-tracking]
+# runs_dir defaults to ~/Documents/lammps_runs
+
+TIMESTAMP_RE = re.compile(r'_\d{8}_\d{6}$')
+
+def default_runs_dir():
+    return os.path.join(os.path.expanduser('~'), 'Documents', 'lammps_runs')
+
+def describe_run(run_dir):
+    """Work out what run_lammps.sh was called with from a run directory.
+
+    Directory names are <folder>_<dataname>_<interaction>_<YYYYmmdd_HHMMSS> and
+    data_files/ holds <dataname>.data. Returns a dict with base (the data file
+    name), interaction, oldsteps, totsteps, dataname (as used in output file
+    names) and suffix, or None if this does not look like a run directory.
+    """
+    name = os.path.basename(os.path.normpath(run_dir))
+    data_files = sorted(glob.glob(os.path.join(run_dir, 'data_files', '*.data')))
+    if not data_files or not TIMESTAMP_RE.search(name):
+        return None
+
+    base = os.path.splitext(os.path.basename(data_files[0]))[0]
+    stem = TIMESTAMP_RE.sub('', name)
+    if f'_{base}_' not in f'_{stem}':
+        return None
+    interaction = f'_{stem}'.split(f'_{base}_', 1)[1]
+
+    oldsteps, totsteps = RunDirectory(run_dir, base).log_steps
+    if totsteps is None:
+        # Fall back on the step count in the output file names
+        pattern = os.path.join(run_dir, 'output_files', '*', f'*_{base}_{interaction}_*.dat*')
+        found = [re.search(r'_(\d+)\.dat(?:\.gz|\.zst)?$', p) for p in glob.glob(pattern)]
+        found = [int(m.group(1)) for m in found if m]
+        if not found:
+            return None
+        totsteps = max(found)
+    oldsteps = oldsteps or 0
+
+    dataname = f'{base}_{interaction}_{totsteps}'
+    stress = glob.glob(os.path.join(run_dir, 'output_files', 'stress_data', f'stress_*_{dataname}.dat*'))
+    volume = glob.glob(os.path.join(run_dir, 'output_files', 'volume_data', f'vol_*_{dataname}.dat*'))
+    suffix = {(True, False): '1', (False, True): '2', (True, True): '3'}.get((bool(stress), bool(volume)), '')
+
+    return {'run_dir': run_dir, 'base': base, 'interaction': interaction,
+            'oldsteps': oldsteps, 'totsteps': totsteps, 'dataname': dataname,
+            'suffix': suffix, 'has_stress': bool(stress), 'has_volume': bool(volume)}
+
+def expected_outputs(run):
+    """Plot files the post-processing of this run produces."""
+    plots = os.path.join(run['run_dir'], 'output_plots')
+    outputs = [os.path.join(plots, 'convergence_plots', f"{run['dataname']}_convergence.png")]
+    if run['has_stress']:
+        outputs.append(os.path.join(plots, f"{run['dataname']}_stress.png"))
+    if run['has_volume']:
+        outputs.append(os.path.join(plots, f"{run['dataname']}_volume.png"))
+    return outputs
+
+def is_up_to_date(run):
+    """True if every expected plot exists and is newer than the log and output data."""
+    inputs = [find_file(os.path.join(run['run_dir'], 'log.lammps'))]
+    inputs += glob.glob(os.path.join(run['run_dir'], 'output_files', '*', f"*{run['dataname']}.dat*"))
+    input_times = [os.path.getmtime(p) for p in inputs if os.path.exists(p)]
+    outputs = expected_outputs(run)
+    if not input_times or not all(os.path.exists(p) for p in outputs):
+        return False
+    return min(os.path.getmtime(p) for p in outputs) >= max(input_times)
+
+def process_run(run):
+    """Convergence, stress and volume plots for one run (runs in a worker process).
+
+    Returns (run, tracking) where tracking is (name, box_dims, natoms, logfile)
+    for the parent to record, or (run, error message).
+    """
+    # Imported here so workers only pull in pyplot after the Agg backend is set
+    from plot_lammps_log import plot_convergence
+    from plot_stress_profiles import plot_stress_profiles, plot_volume_fraction_profiles
+    import write_tracking
+
+    folder, dataname = run['run_dir'], run['dataname']
+    try:
+        logfile = find_file(os.path.join(folder, 'log.lammps'))
+        if os.path.exists(logfile):
+            data = RunDirectory(folder, dataname).thermo
+            if data:
+                output_dir = os.path.join(folder, 'output_plots', 'convergence_plots')
+                os.makedirs(output_dir, exist_ok=True)
+                plot_convergence(data, folder, dataname,
+                                 os.path.join(output_dir, f'{dataname}_convergence.png'))
+        if run['has_stress']:
+            plot_stress_profiles(folder, dataname, run['oldsteps'])
+        if run['has_volume']:
+            plot_volume_fraction_profiles(folder, dataname, run['oldsteps'])
+
+        tracking_name = f"{run['base']}{run['suffix']}_{run['interaction']}_{run['totsteps']}"
+        box_dims, natoms = write_tracking.parse_data_file(folder, tracking_name, run['suffix'])
+        return run, (tracking_name, box_dims, natoms, logfile)
+    except Exception:
+        return run, traceback.format_exc()
+
+def batch_postprocess(runs_dir=None, workers=None, force=False, tracking=True):
+    """Post-process every run directory under runs_dir in parallel.
+
+    Directories whose plots are newer than their log and output data are
+    skipped unless force is set. Plots are made in a process pool; tracking
+    rows are then recorded from the parent, tracking.txt re-exported and the
+    performance plots redrawn once.
+    """
+    runs_dir = runs_dir or default_runs_dir()
+    runs = []
+    for run_dir in sorted(glob.glob(os.path.join(runs_dir, '*'))):
+        if not os.path.isdir(run_dir):
+            continue
+        run = describe_run(run_dir)
+        if run is None:
+            print(f"Skipping {os.path.basename(run_dir)}: not a run directory")
+        elif not force and is_up_to_date(run):
+            print(f"Skipping {os.path.basename(run_dir)}: plots up to date")
+        else:
+            runs.append(run)
+
+    print(f"Post-processing {len(runs)} run(s) with {workers or os.cpu_count()} workers")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_run, run) for run in runs]
+        for future in as_completed(futures):
+            run, result = future.result()
+            if isinstance(result, str):
+                print(f"FAILED {os.path.basename(run['run_dir'])}:\n{result}")
+            else:
+                results.append(result)
+
+    if tracking and results:
+        import write_tracking
+        for name, box_dims, natoms, logfile in sorted(results, key=lambda r: r[0]):
+            if box_dims and natoms:
+                write_tracking.record_tracking(name, box_dims, natoms, logfile)
+        write_tracking.refresh_tracking_outputs()
+    return results
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force = '--force' in args
+    tracking = '--no-tracking' not in args
+    workers = None
+    if '--workers' in args:
+        workers = int(args[args.index('--workers') + 1])
+        del args[args.index('--workers'):args.index('--workers') + 2]
+    positional = [a for a in args if not a.startswith('--')]
+    runs_dir = positional[0] if positional else None
+
+    batch_postprocess(runs_dir, workers, force, tracking)
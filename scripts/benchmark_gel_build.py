@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from generate_systems import build_gel_network
+
+# HOW TO RUN
+# cd ~/Documents/lammps_work/scripts
+# python benchmark_gel_build.py [max_units] [output.png]
+
+def benchmark_gel_build(max_units=40, beads_per_chain=5, repeats=3):
+    """Time build_gel_network for units x units x units/2 slabs up to max_units."""
+    a = beads_per_chain - 1.0
+    offset = np.zeros(3)
+    results = []
+
+    units_list = sorted(set([u for u in [2, 5, 10, 15, 20, 30, 40, 60, 80] if u <= max_units] + [max_units]))
+    for units in units_list:
+        units_z = max(1, units // 2)
+        best = float('inf')
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            cross_pos, _, chain_pos, _, bond_atoms = build_gel_network(
+                beads_per_chain, units, units, units_z, a, offset)
+            best = min(best, time.perf_counter() - t0)
+
+        n_cells = units * units * units_z
+        n_chains = len(bond_atoms) // (beads_per_chain - 1)
+        results.append((units, units_z, n_cells, len(cross_pos), n_chains, best))
+        print(f"{units:>3} x {units:<3} x {units_z:<3} {n_cells:>8} cells  {len(cross_pos):>9} crosslinks  "
+              f"{n_chains:>9} chains  {best:8.3f} s  {1e6 * best / n_cells:7.2f} us/cell")
+
+    return results
+
+def plot_benchmark(results, output):
+    """Log-log plot of build time against unit-cell count with fitted slope."""
+    n_cells = np.array([r[2] for r in results], dtype=float)
+    times = np.array([r[5] for r in results])
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.scatter(n_cells, times, color='k', s=60)
+    if len(n_cells) >= 3:
+        slope, intercept = np.polyfit(np.log10(n_cells), np.log10(times), 1)
+        fit = np.logspace(np.log10(n_cells.min()), np.log10(n_cells.max()), 100)
+        ax.plot(fit, 10**(slope * np.log10(fit) + intercept), '--', color='r',
+                label=f'slope {slope:.2f}')
+        ax.legend()
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Unit cells')
+    ax.set_ylabel('Network build time (s)')
+    ax.set_title('Gel network build time vs unit cells')
+    ax.grid(alpha=0.3, which='both')
+    plt.tight_layout()
+    plt.savefig(output, dpi=150)
+    plt.close()
+    print(f"Plot saved to {output}")
+
+if __name__ == "__main__":
+    max_units = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+
+    results = benchmark_gel_build(max_units)
+    if output:
+        plot_benchmark(results, output)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import numpy as np
+
+# Offsets to the 27 cells surrounding a given cell, own cell first (most likely hit)
+NEIGHBOR_OFFSETS = np.array(sorted([(i, j, k) for i in (-1, 0, 1)
+                                              for j in (-1, 0, 1)
+                                              for k in (-1, 0, 1)],
+                                   key=lambda o: abs(o[0]) + abs(o[1]) + abs(o[2])),
+                            dtype=np.int64)
+
+class CellList:
+    """Uniform spatial hash over a periodic orthogonal box (origin at 0)."""
+
+    def __init__(self, box, cell_size):
+        self.box = np.asarray(box, dtype=float)
+        # Cells are at least cell_size wide so only the 27 surrounding cells need checking
+        self.ncells = np.maximum((self.box // cell_size).astype(np.int64), 1)
+        self.cell_size = self.box / self.ncells
+        self.points = np.empty((0, 3))
+        self.order = np.empty(0, dtype=np.int64)
+        self.sorted_points = self.points
+        self.start = np.zeros(int(np.prod(self.ncells)) + 1, dtype=np.int64)
+
+    def cell_coords(self, pos):
+        """Integer (i, j, k) cell coordinates, wrapped into the box."""
+        return np.floor(pos / self.cell_size).astype(np.int64) % self.ncells
+
+    def cell_keys(self, coords):
+        """Flatten (i, j, k) cell coordinates into a single cell key."""
+        ny, nz = self.ncells[1], self.ncells[2]
+        return (coords[:, 0] * ny + coords[:, 1]) * nz + coords[:, 2]
+
+    def build(self, points):
+        """Bin points into cells (counting sort, O(N + ncells))."""
+        self.points = np.ascontiguousarray(points, dtype=float).reshape(-1, 3)
+        keys = self.cell_keys(self.cell_coords(self.points))
+        self.order = np.argsort(keys, kind='stable')
+        # Points stored in cell order so each cell is a contiguous slice
+        self.sorted_points = self.points[self.order]
+        counts = np.bincount(keys, minlength=len(self.start) - 1)
+        self.start[0] = 0
+        np.cumsum(counts, out=self.start[1:])
+        return self
+
+    def overlaps(self, queries, cutoff, earlier_than=None):
+        """Return a bool mask of queries that have a point closer than cutoff.
+
+        Distances use the minimum image convention. If earlier_than is given,
+        only points with index < earlier_than[i] count for query i (used to
+        resolve conflicts inside a batch that is checked against itself).
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        hit = np.zeros(len(queries), dtype=bool)
+        if len(self.points) == 0 or len(queries) == 0:
+            return hit
+
+        cutoff2 = cutoff * cutoff
+        live = np.arange(len(queries))
+        qcells = self.cell_coords(queries)
+
+        for offset in NEIGHBOR_OFFSETS:
+            keys = self.cell_keys((qcells + offset) % self.ncells)
+            lo = self.start[keys]
+            n_in_cell = self.start[keys + 1] - lo
+            found = np.zeros(len(live), dtype=bool)
+
+            # Walk the k-th occupant of every occupied cell at once
+            k = 0
+            active = np.nonzero(n_in_cell)[0]
+            while active.size:
+                slot = lo[active] + k
+                d = self.sorted_points[slot] - queries[live[active]]
+                d -= self.box * np.round(d / self.box)
+                close = np.einsum('ij,ij->i', d, d) < cutoff2
+                if earlier_than is not None:
+                    close &= self.order[slot] < earlier_than[live[active]]
+                found[active[close]] = True
+                k += 1
+                active = active[~close & (n_in_cell[active] > k)]
+
+            # Queries with a hit are done; carry on with the rest
+            hit[live[found]] = True
+            live, qcells = live[~found], qcells[~found]
+            if not live.size:
+                break
+
+        return hit
+
+    def count_within(self, queries, cutoff):
+        """Number of points closer than cutoff to each query (minimum image).
+
+        cutoff must not exceed the cell size. A query that is itself one of the
+        points counts itself.
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        counts = np.zeros(len(queries), dtype=np.int64)
+        if len(self.points) == 0 or len(queries) == 0:
+            return counts
+
+        cutoff2 = cutoff * cutoff
+        qcells = self.cell_coords(queries)
+        # With fewer than 3 cells along an axis some offsets land in the same cell: visit it once
+        offsets = np.unique(NEIGHBOR_OFFSETS % self.ncells, axis=0)
+        for offset in offsets:
+            keys = self.cell_keys((qcells + offset) % self.ncells)
+            lo = self.start[keys]
+            n_in_cell = self.start[keys + 1] - lo
+
+            k = 0
+            active = np.nonzero(n_in_cell)[0]
+            while active.size:
+                d = self.sorted_points[lo[active] + k] - queries[active]
+                d -= self.box * np.round(d / self.box)
+                counts[active] += np.einsum('ij,ij->i', d, d) < cutoff2
+                k += 1
+                active = active[n_in_cell[active] > k]
+        return counts
+
+def insert_solvent(n_target, box, existing=None, min_dist=0.8, seed=42,
+                   max_attempts=None, batch_size=2_000_000, min_acceptance=1e-3):
+    """Randomly insert up to n_target beads that stay min_dist from every other bead.
+
+    Candidates are drawn in NumPy batches and checked against all existing beads
+    (gel, support, earlier solvent) with a cell list, so each check is O(1).
+    Insertion stops early once a batch accepts fewer than min_acceptance of its
+    candidates, i.e. the free volume is saturated. Returns an (n, 3) array of
+    accepted positions.
+    """
+    rng = np.random.default_rng(seed)
+    box = np.asarray(box, dtype=float)
+    if existing is None:
+        existing = np.empty((0, 3))
+    if max_attempts is None:
+        max_attempts = n_target * 100
+
+    fixed = CellList(box, min_dist).build(existing)
+    solvent = CellList(box, min_dist)
+    batch = CellList(box, min_dist)
+
+    placed = np.empty((0, 3))
+    attempts = 0
+    acceptance = 1.0
+
+    while len(placed) < n_target and attempts < max_attempts:
+        remaining = n_target - len(placed)
+        n_cand = int(remaining / max(acceptance, 1e-3) * 1.1) + 1
+        n_cand = min(max(1024, min(n_cand, batch_size)), max_attempts - attempts)
+        cand = rng.random((n_cand, 3)) * box
+        attempts += n_cand
+
+        # Earlier solvent rejects most candidates once the box fills up, so check it first
+        if len(placed):
+            cand = cand[~solvent.overlaps(cand, min_dist)]
+        if len(existing):
+            cand = cand[~fixed.overlaps(cand, min_dist)]
+
+        # Resolve overlaps within the batch: keep the earlier candidate
+        batch.build(cand)
+        cand = cand[~batch.overlaps(cand, min_dist, earlier_than=np.arange(len(cand)))]
+        cand = cand[:remaining]
+
+        acceptance = len(cand) / n_cand
+        placed = np.concatenate([placed, cand])
+        solvent.build(placed)
+        if acceptance < min_acceptance:
+            break
+
+    return placed
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from trajectory_io import Trajectory
+from cell_list import CellList
+from profiles import PROFILE_KINDS, COMPONENTS
+from lammps_output_io import write_ave_time_file
+
+# HOW TO RUN
+# cd ~/Documents/lammps_runs/slab_with_support_*_<timestamp>
+# python ~/Documents/lammps_work/scripts/chunk_profiles.py . <dataname> [--traj <file.lammpstrj>]
+#        [--kind stress|volume|both] [--block N] [--workers N] [--force]
+#
+# Rebuilds the stress_<dim>_<polymer|solvent>_ and vol_<dim>_<polymer|solvent>_
+# ave/time files of slab_with_support.lmp (the commented-out stress/atom and
+# voronoi/atom pipelines) from a dump, so plot_stress_profiles.py reads them
+# unchanged. Stress needs the per-atom stress in the dump, e.g.
+#   dump all_traj all custom ${dump_freq} traj_files/all_${dataname}_${interaction}_${totsteps}.lammpstrj &
+#       id type mol x y z c_stress_all[1] c_stress_all[2] c_stress_all[3]
+# and the volume profiles need the solvent in it as well.
+
+GROUP_TYPES = {'polymer': (1, 2), 'solvent': (3,)}
+STRESS_COLUMN_RE = re.compile(r'^c_\w*stress\w*\[([123])\]$')
+
+def cylinder_chunks(pos, box, ref_box, dim, bin_width):
+    """Chunk index of every atom for bin/cylinder <dim> lower <bin_width> with one radial bin.
+
+    As in slab_with_support.lmp, the cylinder axis goes through (L/2, L/2) of
+    the other two box lengths and its radius is sqrt((c1^2 + c2^2) / 2); both
+    come from ref_box because the input script substitutes them once with
+    ${...}. Atoms outside the radius get -1; the axial bins are redone for
+    every frame's box, with out-of-range atoms going to the end bins.
+    Returns (chunk index per atom, number of bins).
+    """
+    axis = 'xyz'.index(dim)
+    others = [a for a in range(3) if a != axis]
+    lo, hi = box[axis]
+    ref_lengths = ref_box[:, 1] - ref_box[:, 0]
+    centers = ref_lengths[others] / 2
+    radius = np.sqrt((centers ** 2).sum() / 2)
+
+    n_bins = max(1, int(np.ceil((hi - lo) / bin_width - 1e-9)))
+    chunks = np.clip(((pos[:, axis] - lo) // bin_width).astype(np.int64), 0, n_bins - 1)
+    r2 = ((pos[:, others] - centers) ** 2).sum(axis=1)
+    chunks[r2 > radius ** 2] = -1
+    return chunks, n_bins
+
+def atom_pressures(frame, columns):
+    """-(sxx + syy + szz) / 3 per atom from the dumped stress/atom columns (as v_press_* does)."""
+    stress = [c for c in columns if STRESS_COLUMN_RE.match(c)]
+    if len(stress) != 3:
+        return None
+    return -(frame[stress[0]] + frame[stress[1]] + frame[stress[2]]) / 3.0
+
+def atom_volumes(pos, box, cutoff=1.5):
+    """Per-atom volume estimate standing in for voronoi/atom.
+
+    Each atom gets the volume of its cutoff sphere divided by the number of
+    atoms inside it, rescaled so the volumes add up to the box volume like
+    Voronoi cells do. For equal-size beads this tracks the Voronoi volume
+    without a tessellation; the dump must hold every atom for it to mean
+    anything.
+    """
+    lengths = box[:, 1] - box[:, 0]
+    cells = CellList(lengths, cutoff).build(pos - box[:, 0])
+    counts = cells.count_within(pos - box[:, 0], cutoff)
+    volumes = (4.0 / 3.0) * np.pi * cutoff ** 3 / counts
+    return volumes * np.prod(lengths) / volumes.sum()
+
+def frame_chunk_sums(frame, columns, ref_box, kinds, cutoff=1.5):
+    """{kind: {group: {dim: per-chunk sums}}} of one frame, one np.bincount per group and axis."""
+    pos = np.column_stack([frame['x'], frame['y'], frame['z']])
+    weights = {}
+    if 'stress' in kinds:
+        weights['stress'] = atom_pressures(frame, columns)
+    if 'volume' in kinds:
+        weights['volume'] = atom_volumes(pos, frame['box'], cutoff)
+
+    chunks = {}
+    for kind in kinds:
+        bin_width = PROFILE_KINDS[kind]['bin_width']
+        chunks[kind] = {dim: cylinder_chunks(pos, frame['box'], ref_box, dim, bin_width) for dim in 'xyz'}
+
+    sums = {}
+    for kind, w in weights.items():
+        if w is None:
+            continue
+        sums[kind] = {}
+        for group in COMPONENTS:
+            in_group = np.isin(frame['type'], GROUP_TYPES[group])
+            if not in_group.any():
+                continue
+            sums[kind][group] = {}
+            for dim, (chunk, n_bins) in chunks[kind].items():
+                keep = in_group & (chunk >= 0)
+                sums[kind][group][dim] = np.bincount(chunk[keep], weights=w[keep], minlength=n_bins)
+    return sums
+
+def _process_frames(traj_path, frame_ids, ref_box, kinds, cutoff):
+    """Worker: chunk sums of a list of frames (the index was saved by the parent)."""
+    with Trajectory(traj_path, save_index=False) as traj:
+        return [frame_chunk_sums(traj.frame(i), traj.columns, ref_box, kinds, cutoff) for i in frame_ids]
+
+def block_average(profiles, block):
+    """Mean of every block consecutive frames, like fix ave/time with nrepeat = block.
+
+    Frames whose bin counts differ (NPT) are averaged over the bins they share.
+    """
+    averaged = []
+    for start in range(0, len(profiles) - block + 1, block):
+        chunk = profiles[start:start + block]
+        n = min(len(p) for p in chunk)
+        averaged.append(np.mean([p[:n] for p in chunk], axis=0))
+    return averaged
+
+def trajectory_chunk_profiles(traj_path, kinds=('stress', 'volume'), block=1, workers=None, cutoff=1.5):
+    """Chunked stress and volume profiles of a dump, averaged over blocks of frames.
+
+    Frames are split across a process pool. Returns (timesteps, profiles)
+    with profiles[kind][group][dim] a list of per-block arrays and timesteps
+    the last frame of each block (when fix ave/time would write it).
+    """
+    with Trajectory(traj_path) as traj:
+        n_frames, ref_box, timesteps = len(traj), traj.index['box'][0].copy(), traj.timesteps.copy()
+        if 'stress' in kinds and not any(STRESS_COLUMN_RE.match(c) for c in traj.columns):
+            print(f"No per-atom stress columns in {traj_path}: skipping stress profiles")
+            kinds = tuple(k for k in kinds if k != 'stress')
+
+    workers = workers or os.cpu_count()
+    batches = [list(ids) for ids in np.array_split(np.arange(n_frames), min(workers, n_frames) or 1)]
+    if workers == 1:
+        results = [_process_frames(traj_path, ids, ref_box, kinds, cutoff) for ids in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_frames, [traj_path] * len(batches), batches,
+                                    [ref_box] * len(batches), [kinds] * len(batches),
+                                    [cutoff] * len(batches)))
+    per_frame = [sums for batch in results for sums in batch]
+
+    profiles = {}
+    for kind in kinds:
+        for group in COMPONENTS:
+            for dim in 'xyz':
+                series = [s[kind][group][dim] for s in per_frame if group in s.get(kind, {})]
+                if len(series) == n_frames and n_frames:
+                    profiles.setdefault(kind, {}).setdefault(group, {})[dim] = block_average(series, block)
+    block_steps = timesteps[block - 1::block][:n_frames // block]
+    return block_steps, profiles
+
+def write_chunk_profiles(folder, dataname, timesteps, profiles, force=False):
+    """Write the profiles as the ave/time files slab_with_support.lmp would have written."""
+    written = []
+    for kind, by_group in profiles.items():
+        spec = PROFILE_KINDS[kind]
+        data_dir = os.path.join(folder, 'output_files', spec['subdir'])
+        os.makedirs(data_dir, exist_ok=True)
+        for group, by_dim in by_group.items():
+            for dim, blocks in by_dim.items():
+                path = os.path.join(data_dir, f"{spec['prefix']}_{dim}_{group}_{dataname}.dat")
+                if os.path.exists(path) and not force:
+                    print(f"Keeping existing {path} (use --force to overwrite)")
+                    continue
+                label = f"c_{'press' if kind == 'stress' else 'vol'}_{dim}_{group}"
+                write_ave_time_file(path, timesteps, blocks, label)
+                written.append(path)
+    return written
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python chunk_profiles.py <folder> <dataname> [--traj <file.lammpstrj>] "
+              "[--kind stress|volume|both] [--block N] [--workers N] [--force]")
+        sys.exit(1)
+
+    foldername, dataname = sys.argv[1], sys.argv[2]
+    def option(name, default):
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+    traj_path = option('--traj', os.path.join(foldername, 'traj_files', f'all_{dataname}.lammpstrj'))
+    kind = option('--kind', 'both')
+    kinds = ('stress', 'volume') if kind == 'both' else (kind,)
+    if not os.path.exists(traj_path):
+        print(f"Trajectory {traj_path} not found")
+        sys.exit(1)
+
+    timesteps, profiles = trajectory_chunk_profiles(traj_path, kinds, int(option('--block', 1)),
+                                                    int(option('--workers', 0)) or None)
+    written = write_chunk_profiles(foldername, dataname, timesteps, profiles, '--force' in sys.argv)
+    print(f"{len(timesteps)} blocks, wrote {len(written)} files")
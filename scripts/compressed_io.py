@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import sys
+import os
+import gzip
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard  # Optional: only needed for .zst files
+except ImportError:
+    zstandard = None
+
+# HOW TO RUN
+# python compressed_io.py [--zst] [--workers N] [--level L] [--keep] <files...>   # compress
+# python compressed_io.py -d [--keep] <files.gz|.zst...>                           # decompress
+# python compressed_io.py --sidecar <file.gz|.zst> <unpacked copy>                 # copy sidecar over
+# e.g. python compressed_io.py ~/Documents/lammps_data/input_data/*.data
+#      python compressed_io.py run_dir/output_files/*/*.dat
+#
+# The readers in lammps_data_io.py, lammps_output_io.py, output_cache.py,
+# write_tracking.py and run_directory.py open .gz/.zst files through open_file and
+# look for <name>.gz / <name>.zst when <name> is missing, so compressed inputs and
+# outputs can be used in place of the originals. LAMMPS reads a gzipped data file
+# itself when its name ends in .gz.
+
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# Uncompressed bytes per gzip member compressed by one worker
+BLOCK_SIZE = 16 << 20
+
+def is_compressed(path):
+    return str(path).endswith(COMPRESSED_SUFFIXES)
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("Reading or writing .zst files needs the zstandard package (pip install zstandard)")
+
+def open_file(path, mode='rb', **kwargs):
+    """open() that reads and writes .gz and .zst files transparently (binary and text modes).
+
+    Compressed files are decompressed as a stream, so memory stays bounded by
+    what the caller reads.
+    """
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, **kwargs)
+    if path.endswith('.zst'):
+        _require_zstandard()
+        return zstandard.open(path, mode, **kwargs)
+    return open(path, mode, **kwargs)
+
+def find_file(path):
+    """path if it exists, else path.gz or path.zst if one of those does, else path."""
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+def strip_suffix(path):
+    """path without its .gz/.zst suffix."""
+    for suffix in COMPRESSED_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+def _move_sidecar(path, output, keep):
+    # Imported here: lammps_data_io itself imports this module
+    from lammps_data_io import move_sidecar
+    return move_sidecar(path, output, keep)
+
+def _gzip_block(args):
+    data, level = args
+    # mtime=0 so the same input always gives the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def _gzip_parallel(src, dst, workers, level, block_size):
+    """Compress src into dst as one gzip member per block, workers blocks at a time.
+
+    Concatenated members are a valid .gz file (gzip -d, zcat, Python's gzip
+    and LAMMPS all read them), so blocks can be compressed independently.
+    At most 2 * workers blocks are held in memory.
+    """
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            window = [b for b in (src.read(block_size) for _ in range(2 * workers)) if b]
+            if not window:
+                break
+            for member in pool.map(_gzip_block, [(b, level) for b in window]):
+                dst.write(member)
+
+def compress_file(path, output=None, workers=None, level=None, keep=False, block_size=BLOCK_SIZE):
+    """Compress path to output (default path + '.gz'; a .zst output uses zstandard).
+
+    gzip is compressed block-parallel over a process pool and zstd with its
+    own worker threads. The output is written under a temporary name and
+    renamed, and keeps the source's modification time. The source is removed
+    unless keep is set; a data file's metadata sidecar moves with it.
+    Returns the output path.
+    """
+    output = output or path + '.gz'
+    tmp = f'{output}.{os.getpid()}.tmp'
+    with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+        if output.endswith('.zst'):
+            _require_zstandard()
+            cctx = zstandard.ZstdCompressor(level=level or 3, threads=workers or -1)
+            cctx.copy_stream(src, dst)
+        else:
+            _gzip_parallel(src, dst, workers, level or 6, block_size)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, output)
+    _move_sidecar(path, output, keep)
+    if not keep:
+        os.remove(path)
+    return output
+
+def decompress_file(path, output=None, keep=False):
+    """Stream a .gz/.zst file back to output (default: path without the suffix)."""
+    output = output or strip_suffix(path)
+    tmp = f'{output}.{os.getpid()}.tmp'
+    with open_file(path, 'rb') as src, open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, output)
+    _move_sidecar(path, output, keep)
+    if not keep:
+        os.remove(path)
+    return output
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {'--workers': None, '--level': None}
+    for key in options:
+        if key in args:
+            i = args.index(key)
+            options[key] = int(args[i + 1])
+            del args[i:i + 2]
+    flags = {a for a in args if a.startswith('-')}
+    files = [a for a in args if not a.startswith('-')]
+    if '--sidecar' in flags and len(files) == 2:
+        # A copy unpacked outside Python (run_lammps.sh) gets the sidecar of its source
+        found = _move_sidecar(files[0], files[1], keep=True)
+        print(f"Sidecar of {files[0]} copied to {files[1]}" if found else f"No current sidecar for {files[0]}")
+        sys.exit(0)
+    if not files or '--sidecar' in flags:
+        print("Usage: python compressed_io.py [-d] [--zst] [--workers N] [--level L] [--keep] <files...>\n"
+              "       python compressed_io.py --sidecar <file.gz|.zst> <unpacked copy>")
+        sys.exit(1)
+
+    for path in files:
+        if '-d' in flags:
+            if not is_compressed(path):
+                print(f"Skipping {path}: not .gz/.zst")
+                continue
+            print(f"{path} -> {decompress_file(path, keep='--keep' in flags)}")
+            continue
+        if is_compressed(path):
+            print(f"Skipping {path}: already compressed")
+            continue
+        size = os.path.getsize(path)
+        output = compress_file(path, path + ('.zst' if '--zst' in flags else '.gz'),
+                               options['--workers'], options['--level'], '--keep' in flags)
+        print(f"{path} -> {output} ({size / 1e6:.1f} MB -> {os.path.getsize(output) / 1e6:.1f} MB)")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import sys
+import numpy as np
+
+from run_directory import RunDirectory
+from run_chain import RunChain
+
+# HOW TO RUN
+# cd ~/Documents/lammps_runs/slab_with_support_*_<timestamp>
+# python ~/Documents/lammps_work/scripts/convergence.py . <dataname> [--target 0.01] [--chain]
+#
+# For Temp, Press, box volume and the gel volumes: the MSER equilibration
+# cutoff, the autocorrelation time and statistical inefficiency of what is left,
+# the standard error of its mean, whether it has converged to the target
+# relative error, and how many more steps that would take if not. With --chain the
+# run and all its continuations are analyzed as one series (see run_chain.py).
+
+def autocorrelation(x):
+    """Normalized autocorrelation function of a series (FFT, zero-padded to avoid wrap-around)."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n < 2:
+        return np.ones(max(n, 1))
+    if np.all(x == x[0]):
+        # A constant series is uncorrelated with itself at every nonzero lag
+        acf = np.zeros(n)
+        acf[0] = 1.0
+        return acf
+    x = x - x.mean()
+    f = np.fft.rfft(x, 2 ** int(np.ceil(np.log2(2 * n))))
+    acf = np.fft.irfft(f * np.conj(f))[:n]
+    return acf / acf[0]
+
+def integrated_autocorrelation_time(x, c=5.0):
+    """Integrated autocorrelation time in samples, with Sokal's self-consistent window (M >= c tau)."""
+    acf = autocorrelation(x)
+    tau = np.cumsum(acf) - 0.5  # 1/2 + sum_{t=1}^{M} rho(t) for every window M
+    window = np.arange(len(tau)) >= c * tau
+    m = np.argmax(window) if window.any() else len(tau) - 1
+    return max(tau[m], 0.5)
+
+def statistical_inefficiency(x):
+    """g = 1 + 2 sum of rho = 2 tau: the number of samples per independent sample."""
+    return max(1.0, 2.0 * integrated_autocorrelation_time(x))
+
+def block_averages(x, n_blocks=5):
+    """Means of n_blocks contiguous blocks (leftover samples at the start are dropped)."""
+    x = np.asarray(x, dtype=float)
+    block_len = len(x) // n_blocks
+    if block_len == 0:
+        return np.empty(0)
+    return x[len(x) - block_len * n_blocks:].reshape(n_blocks, block_len).mean(axis=1)
+
+def blocking_error(x, min_blocks=4):
+    """Standard error of the mean from Flyvbjerg-Petersen blocking.
+
+    The series is halved by pairwise averaging until fewer than min_blocks
+    blocks remain; the largest error along the way (its plateau for a long
+    enough series) is returned.
+    """
+    x = np.asarray(x, dtype=float)
+    best = np.std(x, ddof=1) / np.sqrt(len(x)) if len(x) > 1 else np.nan
+    while len(x) // 2 >= min_blocks:
+        x = 0.5 * (x[:len(x) // 2 * 2:2] + x[1:len(x) // 2 * 2:2])
+        best = max(best, np.std(x, ddof=1) / np.sqrt(len(x)))
+    return best
+
+def mser_cutoff(x, batch=5):
+    """MSER-m equilibration cutoff: the sample index that minimizes the marginal standard error.
+
+    The series is averaged in batches of batch samples; for every truncation
+    point d the statistic var(rest) / len(rest) is computed at once from
+    cumulative sums, and d is searched over the first half only (near the end
+    the statistic rests on a few batches and falls towards zero).
+    """
+    x = np.asarray(x, dtype=float)
+    n_batches = len(x) // batch
+    if n_batches < 4:
+        return 0
+    b = x[:n_batches * batch].reshape(n_batches, batch).mean(axis=1)
+    # Sums of b and b^2 over b[d:] for every d
+    s1 = np.cumsum(b[::-1])[::-1]
+    s2 = np.cumsum((b ** 2)[::-1])[::-1]
+    k = np.arange(n_batches, 0, -1)
+    mse = (s2 / k - (s1 / k) ** 2) / k
+    half = n_batches // 2
+    return int(np.argmin(mse[:half])) * batch
+
+def analyze_series(x, steps=None, target=0.01, min_independent=10):
+    """Equilibration and error analysis of one observable.
+
+    steps are the timesteps of the samples (None to count in samples).
+    target is the relative standard error of the mean that counts as
+    converged; the run also needs min_independent independent samples after
+    the cutoff. Returns a dict with cutoff (step), mean, sem, tau (steps), g,
+    n_independent, converged and more_steps (0 when converged).
+    """
+    x = np.asarray(x, dtype=float)
+    finite = np.isfinite(x)
+    x = x[finite]
+    if steps is not None:
+        steps = np.asarray(steps)[finite]
+    n = len(x)
+    spacing = float(np.median(np.diff(steps))) if steps is not None and len(steps) > 1 else 1.0
+    if n < 8:
+        return {'n': n, 'cutoff': None, 'mean': np.nan, 'sem': np.nan, 'tau': np.nan, 'g': np.nan,
+                'n_independent': 0, 'converged': False, 'more_steps': None}
+
+    cut = mser_cutoff(x)
+    prod = x[cut:]
+    g = statistical_inefficiency(prod)
+    mean = prod.mean()
+    sem = max(np.std(prod, ddof=1) * np.sqrt(g / len(prod)), blocking_error(prod))
+    n_independent = len(prod) / g
+    tolerance = target * abs(mean) if mean else target
+    converged = bool(sem <= tolerance and n_independent >= min_independent)
+
+    # sem falls as 1/sqrt(samples): samples needed for the target, minus those we have
+    needed = len(prod) * (sem / tolerance) ** 2 if tolerance > 0 else np.inf
+    needed = max(needed, min_independent * g)
+    more = 0 if converged else int(np.ceil(max(needed - len(prod), 0) * spacing))
+    return {'n': n, 'cutoff': (steps[cut] if steps is not None else cut), 'mean': mean, 'sem': sem,
+            'tau': 0.5 * g * spacing, 'g': g, 'n_independent': n_independent,
+            'converged': converged, 'more_steps': more}
+
+def run_series(foldername, dataname, chain=False):
+    """{name: (steps, values)} of the observables plot_convergence draws, where available.
+
+    With chain, the series span every segment of the run's chain.
+    """
+    run = RunChain.of_run(foldername, dataname) if chain else RunDirectory(foldername, dataname)
+    series = {}
+    data = run.thermo
+    for name in ('Temp', 'Press'):
+        if name in data and 'Step' in data:
+            series[name] = (data['Step'], data[name])
+
+    if run.box_volume is not None:
+        series['Box volume'] = run.box_volume
+
+    if run.gel_volume_rg is not None and len(run.gel_volume_rg[1]):
+        series['Gel volume (Rg^3)'] = run.gel_volume_rg
+
+    bb = run.gel_volume_bb
+    if bb is not None and len(bb):
+        series['Gel volume (BB)'] = (run.gel_volume_bb_steps, bb)
+    return series
+
+def analyze_run(foldername, dataname, target=0.01, chain=False):
+    """analyze_series for every observable of a run (or its whole chain): {name: result}."""
+    return {name: analyze_series(values, None if steps is None else np.asarray(steps), target)
+            for name, (steps, values) in run_series(foldername, dataname, chain).items()}
+
+def print_report(results, target):
+    print(f"{'Observable':<20} {'Cutoff':<10} {'Mean':<12} {'SEM':<10} {'tau':<10} "
+          f"{'N indep.':<9} {'Converged':<10} {'More steps':<12}")
+    print("-" * 97)
+    for name, r in results.items():
+        if r['cutoff'] is None:
+            print(f"{name:<20} too few samples ({r['n']})")
+            continue
+        more = '-' if r['converged'] else str(r['more_steps'])
+        print(f"{name:<20} {int(r['cutoff']):<10} {r['mean']:<12.5g} {r['sem']:<10.3g} {r['tau']:<10.4g} "
+              f"{r['n_independent']:<9.1f} {str(r['converged']):<10} {more:<12}")
+    pending = [r['more_steps'] for r in results.values() if r['cutoff'] is not None and not r['converged']]
+    if pending:
+        print(f"Not converged to {target:.1%}: about {max(pending)} more steps needed")
+    elif results:
+        print(f"All observables converged to {target:.1%}: no continuation needed")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python convergence.py <folder> <dataname> [--target 0.01] [--chain]")
+        sys.exit(1)
+
+    foldername, dataname = sys.argv[1], sys.argv[2]
+    target = float(sys.argv[sys.argv.index('--target') + 1]) if '--target' in sys.argv else 0.01
+    results = analyze_run(foldername, dataname, target, '--chain' in sys.argv)
+    if not results:
+        print(f"No thermo or volume data found in {foldername}")
+        sys.exit(1)
+    print_report(results, target)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import sys
+import os
+import numpy as np
+
+from trajectory_io import Trajectory
+from lammps_output_io import write_ave_time_file, write_columns_file
+
+# HOW TO RUN
+# cd ~/Documents/lammps_runs/slab_with_support_*_<timestamp>
+# python ~/Documents/lammps_work/scripts/gel_metrics.py . <dataname> [--every N] [--bin-width 0.5] [--force]
+#
+# Computes from traj_files/polymer_<dataname>.lammpstrj what the gel_vol_bb_output,
+# gel_vol_rg_output, gel_dims_output and box_dims_output fix prints in
+# slab_with_support.lmp write during the run, in the same formats, plus per-axis
+# number density profiles. To move this out of the MD loop, uncomment the
+# poly_traj dump (dump_freq = volume_freq) and comment out the four fix prints
+# and the minx...maxz / rg_polymer computes.
+
+POLYMER_TYPES = (1, 2)
+# Density profile groups; a polymer_and_support dump only has the first two
+DENSITY_GROUPS = {'polymer': (1, 2), 'support': (4, 5), 'solvent': (3,)}
+
+def unwrapped_positions(frame):
+    """(n, 3) positions, unwrapped when the dump has xu/yu/zu or image flags.
+
+    compute gyration unwraps with image flags; with plain x y z (the poly_traj
+    dump) the wrapped positions are used, which is the same as long as the gel
+    does not cross a periodic boundary.
+    """
+    if all(c in frame for c in ('xu', 'yu', 'zu')):
+        return np.column_stack([frame['xu'], frame['yu'], frame['zu']])
+    pos = np.column_stack([frame['x'], frame['y'], frame['z']])
+    if all(c in frame for c in ('ix', 'iy', 'iz')):
+        lengths = frame['box'][:, 1] - frame['box'][:, 0]
+        pos = pos + np.column_stack([frame['ix'], frame['iy'], frame['iz']]) * lengths
+    return pos
+
+def frame_metrics(frame, polymer_types=POLYMER_TYPES):
+    """Gel bounding box, dimensions, volume, radius of gyration and box dimensions of one frame.
+
+    The bounding box uses wrapped coordinates like compute reduce min/max x;
+    Rg is unweighted (all beads have mass 1).
+    """
+    box_dims = frame['box'][:, 1] - frame['box'][:, 0]
+    polymer = np.isin(frame['type'], polymer_types)
+    if not polymer.any():
+        nan3 = np.full(3, np.nan)
+        return {'gel_dims': nan3, 'gel_vol_bb': np.nan, 'rg': np.nan, 'rg_cubed': np.nan,
+                'box_dims': box_dims}
+    wrapped = np.column_stack([frame['x'], frame['y'], frame['z']])[polymer]
+    gel_dims = wrapped.max(axis=0) - wrapped.min(axis=0)
+
+    pos = unwrapped_positions(frame)[polymer]
+    rg = np.sqrt(((pos - pos.mean(axis=0)) ** 2).sum(axis=1).mean())
+    return {'gel_dims': gel_dims, 'gel_vol_bb': float(np.prod(gel_dims)), 'rg': rg,
+            'rg_cubed': rg ** 3, 'box_dims': box_dims}
+
+def density_profiles(frame, bin_width, n_bins, groups=DENSITY_GROUPS):
+    """Number density along x, y and z of each atom group: {group: {dim: (n_bins[dim],) array}}.
+
+    Bins start at the box's lower bound (like bin/1d lower) and are counted
+    with one np.bincount per group and axis. Bins past the end of this frame's
+    box are zero.
+    """
+    lo = frame['box'][:, 0]
+    lengths = frame['box'][:, 1] - lo
+    pos = np.column_stack([frame['x'], frame['y'], frame['z']])
+    profiles = {}
+    for name, types in groups.items():
+        mask = np.isin(frame['type'], types)
+        if not mask.any():
+            continue
+        profiles[name] = {}
+        for axis, dim in enumerate('xyz'):
+            bins = np.clip(((pos[mask, axis] - lo[axis]) // bin_width).astype(np.int64), 0, n_bins[dim] - 1)
+            area = np.prod(np.delete(lengths, axis))
+            profiles[name][dim] = np.bincount(bins, minlength=n_bins[dim]) / (bin_width * area)
+    return profiles
+
+def trajectory_metrics(traj_path, every=1, bin_width=0.5, polymer_types=POLYMER_TYPES):
+    """Per-frame gel metrics and density profiles of every every-th frame of a dump.
+
+    Returns a dict of arrays: timesteps, gel_vol_bb, rg_cubed, gel_dims (n, 3),
+    box_dims (n, 3) and density {group: {dim: (n, n_bins)}}. The number of
+    bins per axis is fixed by the largest box in the frame index, so profiles
+    of an NPT run stack into one array.
+    """
+    with Trajectory(traj_path) as traj:
+        frames = range(0, len(traj), every)
+        boxes = traj.index['box'][::every]
+        n_bins = {dim: max(1, int(np.ceil((boxes[:, axis, 1] - boxes[:, axis, 0]).max() / bin_width)))
+                  if len(boxes) else 1 for axis, dim in enumerate('xyz')}
+
+        metrics = {'timesteps': traj.timesteps[::every].copy(),
+                   'gel_vol_bb': np.empty(len(frames)), 'rg_cubed': np.empty(len(frames)),
+                   'gel_dims': np.empty((len(frames), 3)), 'box_dims': np.empty((len(frames), 3)),
+                   'density': {}}
+        for k, i in enumerate(frames):
+            frame = traj.frame(i)
+            m = frame_metrics(frame, polymer_types)
+            for key in ('gel_vol_bb', 'rg_cubed', 'gel_dims', 'box_dims'):
+                metrics[key][k] = m[key]
+            for name, by_dim in density_profiles(frame, bin_width, n_bins).items():
+                group = metrics['density'].setdefault(name, {})
+                for dim, profile in by_dim.items():
+                    if dim not in group:
+                        group[dim] = np.zeros((len(frames), n_bins[dim]))
+                    group[dim][k] = profile
+    return metrics
+
+def write_metrics(metrics, output_dir, dataname, force=False):
+    """Write the metrics in the formats of the fix prints (and ave/time for density).
+
+    Files: gel_volume_bb_ (volume per line), gel_volume_rg_ (step Rg^3),
+    gel_dimensions_ and box_dimensions_ (step Lx Ly Lz), and
+    density_<dim>_<group>_ profiles. Existing files (e.g. written by
+    LAMMPS) are kept unless force is set. Returns the paths written.
+    """
+    steps = metrics['timesteps'][:, None]
+    outputs = {
+        f'gel_volume_bb_{dataname}.dat': metrics['gel_vol_bb'][:, None],
+        f'gel_volume_rg_{dataname}.dat': np.hstack([steps, metrics['rg_cubed'][:, None]]),
+        f'gel_dimensions_{dataname}.dat': np.hstack([steps, metrics['gel_dims']]),
+        f'box_dimensions_{dataname}.dat': np.hstack([steps, metrics['box_dims']]),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for name, table in outputs.items():
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path) and not force:
+            print(f"Keeping existing {path} (use --force to overwrite)")
+            continue
+        write_columns_file(path, table)
+        written.append(path)
+    for group, by_dim in metrics['density'].items():
+        for dim, values in by_dim.items():
+            path = os.path.join(output_dir, f'density_{dim}_{group}_{dataname}.dat')
+            if os.path.exists(path) and not force:
+                continue
+            write_ave_time_file(path, metrics['timesteps'], values, f'number density of {group}')
+            written.append(path)
+    return written
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python gel_metrics.py <folder> <dataname> [--every N] [--bin-width W] [--force]")
+        sys.exit(1)
+
+    foldername, dataname = sys.argv[1], sys.argv[2]
+    every = int(sys.argv[sys.argv.index('--every') + 1]) if '--every' in sys.argv else 1
+    bin_width = float(sys.argv[sys.argv.index('--bin-width') + 1]) if '--bin-width' in sys.argv else 0.5
+
+    traj_path = os.path.join(foldername, 'traj_files', f'polymer_{dataname}.lammpstrj')
+    if not os.path.exists(traj_path):
+        print(f"Trajectory {traj_path} not found")
+        sys.exit(1)
+
+    metrics = trajectory_metrics(traj_path, every, bin_width)
+    written = write_metrics(metrics, os.path.join(foldername, 'output_files', 'volume_data'),
+                            dataname, '--force' in sys.argv)
+    print(f"{len(metrics['timesteps'])} frames, wrote {len(written)} files")
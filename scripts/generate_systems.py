@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+import numpy as np
+
+from cell_list import CellList, insert_solvent
+from particle_system import System
+from lammps_data_io import write_data_file, write_system_sidecar, read_data_header, read_atoms
+
+# HOW TO RUN
+# from a notebook in lammps_work/scripts:
+#   from generate_systems import generate_gel_slab, generate_solvent_box
+#   generate_gel_slab(5, 15, 15, 10, 1, 13.5, 2, 0.2, "slab_support_5beads_10x10x5_rho6_extra_padding43.data")
+# To reuse an equilibrated solvent box instead of inserting solvent at random, pass
+# solvent_source="final_config_<run>.data" (see tile_solvent).
+
+# Part of the params_key of every cached data file (input_cache.py): bump it when a
+# generator's output changes for the same parameters, so old files are not reused
+GENERATOR_VERSION = 1
+
+# Diamond basis in units of a/4: FCC sublattice 0, sublattice 1 shifted by (1/4, 1/4, 1/4)
+FCC_BASIS = np.array([[0, 0, 0], [2, 2, 0], [2, 0, 2], [0, 2, 2]])
+DIAMOND_BASIS = np.concatenate([FCC_BASIS, FCC_BASIS + 1])
+
+# A sublattice-1 site bonds to the sublattice-0 sites at these offsets (units of a/4)
+DIAMOND_BOND_OFFSETS = np.array([[-1, -1, -1], [1, 1, -1], [1, -1, 1], [-1, 1, 1]])
+
+def diamond_lattice(units_x, units_y, units_z):
+    """Return integer site coordinates (units of a/4) and sublattice flags of a diamond slab.
+
+    Sites are ordered by unit cell (i, j, k), then sublattice, then FCC site, and
+    only those inside [0, units] unit cells along each axis are kept.
+    """
+    units = np.array([units_x, units_y, units_z])
+    cells = np.stack(np.meshgrid(np.arange(units_x + 1), np.arange(units_y + 1),
+                                 np.arange(units_z + 1), indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    sites = (4 * cells + DIAMOND_BASIS).reshape(-1, 3)
+    sublattice = np.tile(np.repeat([0, 1], len(FCC_BASIS)), len(cells))
+
+    inside = np.all((sites >= 0) & (sites <= 4 * units), axis=1)
+    return sites[inside], sublattice[inside]
+
+def diamond_bonds(sites, sublattice):
+    """Return (n_bonds, 2) site index pairs (i < j) of nearest neighbours, sorted.
+
+    Each sublattice-1 site is looked up at its four known bond offsets in a dense
+    site-index grid, so this is linear in the number of sites.
+    """
+    shape = sites.max(axis=0) + 2
+    grid = np.full(shape, -1, dtype=np.int64)
+    grid[sites[:, 0], sites[:, 1], sites[:, 2]] = np.arange(len(sites))
+
+    centers = np.nonzero(sublattice == 1)[0]
+    neighbors = sites[centers][:, None, :] + DIAMOND_BOND_OFFSETS
+    valid = np.all((neighbors >= 0) & (neighbors < shape), axis=2)
+    neighbors = np.where(valid[..., None], neighbors, 0)
+    partner = grid[neighbors[..., 0], neighbors[..., 1], neighbors[..., 2]]
+    valid &= partner >= 0
+
+    first = np.broadcast_to(centers[:, None], partner.shape)[valid]
+    second = partner[valid]
+    pairs = np.column_stack([np.minimum(first, second), np.maximum(first, second)])
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+def build_gel_network(beads_per_chain, units_x, units_y, units_z, a, offset):
+    """Build crosslinks, chain beads and bonds of the diamond gel as arrays.
+
+    Returns crosslink positions and molecule ids, chain bead positions and
+    molecule ids, and (n_bonds, 2) bonded atom ids. Crosslinks get ids
+    1..n_cross, chain beads follow in chain order; chain m has molecule id m+1.
+    """
+    sites, sublattice = diamond_lattice(units_x, units_y, units_z)
+    cross_pos = sites * (a / 4) + offset
+    pairs = diamond_bonds(sites, sublattice)
+    n_chains = len(pairs)
+    n_inner = max(beads_per_chain - 2, 0)
+
+    # Crosslinks keep the molecule id of the last chain they belong to
+    chain_mol_ids = np.arange(1, n_chains + 1)
+    cross_mol = np.zeros(len(sites), dtype=np.int64)
+    np.maximum.at(cross_mol, pairs[:, 0], chain_mol_ids)
+    np.maximum.at(cross_mol, pairs[:, 1], chain_mol_ids)
+
+    # Chain beads interpolated between the two crosslinks of each chain
+    frac = np.arange(1, n_inner + 1) / (beads_per_chain - 1)
+    pos1 = cross_pos[pairs[:, 0]][:, None, :]
+    pos2 = cross_pos[pairs[:, 1]][:, None, :]
+    chain_pos = (pos1 * (1 - frac[None, :, None]) + pos2 * frac[None, :, None]).reshape(-1, 3)
+    chain_mol = np.repeat(chain_mol_ids, n_inner)
+
+    # Atom ids along each chain: crosslink, inner beads, crosslink
+    inner_ids = len(sites) + 1 + np.arange(n_chains * n_inner).reshape(n_chains, n_inner)
+    chain_ids = np.column_stack([pairs[:, 0] + 1, inner_ids, pairs[:, 1] + 1])
+    if beads_per_chain < 2:
+        chain_ids = chain_ids[:, :0]
+    bond_atoms = np.stack([chain_ids[:, :-1], chain_ids[:, 1:]], axis=-1).reshape(-1, 2)
+
+    return cross_pos, cross_mol, chain_pos, chain_mol, bond_atoms
+
+def hexagonal_layer(box_x, box_y, spacing):
+    """Return (n, 2) x-y positions of a hexagonally packed layer covering the box."""
+    nx = int(box_x / spacing) + 1
+    ny = int(box_y / (spacing * np.sqrt(3))) + 1
+    i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')
+    x = (i * spacing).ravel()
+    y = (j * spacing * np.sqrt(3) + np.where(i % 2, spacing / 2, 0)).ravel()
+    inside = (x <= box_x) & (y <= box_y)
+    return np.column_stack([x[inside], y[inside]])
+
+def read_configuration(data_file, atom_types=None):
+    """Box lengths and (n, 3) positions, wrapped into [0, L), of a data file's atoms.
+
+    atom_types keeps only those types (e.g. (3,) for the solvent of a gel run).
+    Works on the final_config_*.data files write_data produces, whose box may
+    not start at the origin.
+    """
+    header = read_data_header(data_file)
+    lo = np.array([header['box'][dim][0] for dim in 'xyz'])
+    box = np.array([header['box'][dim][1] for dim in 'xyz']) - lo
+    atoms = read_atoms(data_file, header, usecols=(2, 3, 4, 5))
+    if atom_types is not None:
+        atoms = atoms[np.isin(atoms[:, 0], atom_types)]
+    return box, (atoms[:, 1:] - lo) % box
+
+def tile_positions(pos, box, target_box, rescale=False, min_dist=0.8):
+    """Replicate a periodic configuration to fill target_box.
+
+    With rescale, round(target / L) copies per axis are stretched to the target
+    box, which keeps the periodic structure seamless but changes the density by
+    the stretch. Otherwise ceil(target / L) copies are cut at the target box,
+    and atoms on the high side of each cut face that come closer than min_dist
+    to an atom across the new periodic boundary are dropped.
+    Returns the (m, 3) positions and the source index of each.
+    """
+    pos = np.asarray(pos, dtype=float)
+    box = np.asarray(box, dtype=float)
+    target_box = np.asarray(target_box, dtype=float)
+    reps = np.maximum(np.round(target_box / box) if rescale else np.ceil(target_box / box - 1e-9), 1)
+    reps = reps.astype(np.int64)
+
+    shifts = np.stack(np.meshgrid(*[np.arange(r) for r in reps], indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    tiled = (pos[None, :, :] + shifts * box).reshape(-1, 3)
+    source = np.tile(np.arange(len(pos)), len(shifts))
+    if rescale:
+        return tiled * (target_box / (reps * box)), source
+
+    inside = np.all(tiled < target_box, axis=1)
+    tiled, source = tiled[inside], source[inside]
+    for axis in np.flatnonzero(reps * box > target_box + 1e-9):
+        # Only cut axes get a seam; check its high side against everything else
+        high = tiled[:, axis] > target_box[axis] - min_dist
+        rest = CellList(target_box, min_dist).build(tiled[~high])
+        clash = np.zeros(len(tiled), dtype=bool)
+        clash[high] = rest.overlaps(tiled[high], min_dist)
+        tiled, source = tiled[~clash], source[~clash]
+    return tiled, source
+
+def tile_solvent(source_file, box_size, solvent_density=None, existing=None, exclude=None,
+                 source_types=None, rescale=False, min_dist=0.8, seed=42):
+    """Solvent positions for box_size built from an equilibrated configuration.
+
+    The source (e.g. the final_config_*.data of a pure solvent run) is tiled
+    with tile_positions. Solvent within min_dist of an existing bead (gel,
+    support) or inside one of the exclude boxes ((lo, hi) pairs of 3-vectors)
+    is removed. The count is then brought to solvent_density * box volume (the
+    source density when None): surplus beads are dropped at random, and
+    missing ones are inserted as in generate_solvent_box. Bonds are not
+    carried over, so the source atoms must be monomers.
+    """
+    rng = np.random.default_rng(seed)
+    box_size = np.asarray(box_size, dtype=float)
+    source_box, source_pos = read_configuration(source_file, source_types)
+    if len(source_pos) == 0:
+        raise ValueError(f"No atoms to tile in {source_file}")
+    if solvent_density is None:
+        solvent_density = len(source_pos) / np.prod(source_box)
+
+    pos, _ = tile_positions(source_pos, source_box, box_size, rescale, min_dist)
+    for lo, hi in exclude or []:
+        pos = pos[~np.all((pos >= lo) & (pos <= hi), axis=1)]
+    if existing is not None and len(existing):
+        pos = pos[~CellList(box_size, min_dist).build(existing).overlaps(pos, min_dist)]
+
+    n_target = int(solvent_density * np.prod(box_size))
+    if len(pos) > n_target:
+        pos = pos[np.sort(rng.choice(len(pos), n_target, replace=False))]
+    elif len(pos) < n_target:
+        occupied = pos if existing is None else np.concatenate([existing, pos])
+        pos = np.concatenate([pos, insert_solvent(n_target - len(pos), box_size, occupied,
+                                                  min_dist=min_dist, seed=seed)])
+    return pos
+
+def generate_gel_slab(beads_per_chain=5, units_x=8, units_y=8, units_z=4,
+                                   solvent_density=0.6,
+                                   solvent_padding=5.0, support_thickness=2.0,
+                                   support_spacing=0.4, output_file="gel_slab.data",
+                                   min_dist=0.8, seed=42, solvent_source=None, source_types=None):
+    """
+    Generate a tetrahedral (diamond lattice) polymer gel slab in solvent bath.
+
+    Parameters:
+    - beads_per_chain: number of beads per chain
+    - units_x, units_y: number of unit cells in x and y (horizontal)
+    - units_z: number of unit cells in z (height, smaller)
+    - solvent_density: solvent density throughout entire box (beads/σ³)
+    - solvent_padding: thickness of solvent layer around gel (in σ)
+    - support_spacing: spacing between support atoms (smaller = denser)
+    - output_file: LAMMPS data file name
+    - min_dist: minimum distance between a solvent bead and any other bead
+    - seed: random seed for solvent insertion
+    - solvent_source: equilibrated data file to tile the solvent from instead of inserting it
+      at random (see tile_solvent); source_types picks its solvent atoms, e.g. (3,)
+    """
+
+    # Lattice parameters
+    bead_spacing = 1.0  # Bond length
+    chain_length = bead_spacing * (beads_per_chain - 1)
+    z_clearance = 0  # Adjust this value as needed
+
+    # Diamond lattice: use chain_length as the FCC lattice constant
+    a = chain_length  # FCC lattice constant
+
+    # Gel dimensions
+    gel_x = units_x * a
+    gel_y = units_y * a
+    gel_z = units_z * a
+
+    # Box dimensions (gel + solvent padding + support)
+    box_x = gel_x + 2 * solvent_padding
+    box_y = gel_y + 2 * solvent_padding
+    box_z = gel_z + solvent_padding + support_thickness + z_clearance
+
+    # Offset to center gel in x-y, place above support in z
+    offset = np.array([solvent_padding, solvent_padding, 2*support_thickness + z_clearance])
+
+    # Crosslinks, chain beads and bonds of the diamond network
+    cross_pos, cross_mol, chain_pos, chain_mol, bond_atoms = build_gel_network(
+        beads_per_chain, units_x, units_y, units_z, a, offset)
+    num_chains = len(bond_atoms) // (beads_per_chain - 1) if beads_per_chain > 1 else 0
+
+    # Create dense support layers with hexagonal packing
+    layer_xy = hexagonal_layer(box_x, box_y, support_spacing)
+    n_layer = len(layer_xy)
+
+    total_volume = box_x * box_y * box_z
+    num_solvent_total = int(solvent_density * total_volume)
+
+    system = System([box_x, box_y, box_z],
+                    capacity=len(cross_pos) + len(chain_pos) + 2 * n_layer + num_solvent_total,
+                    bond_capacity=len(bond_atoms), n_atom_types=5, n_bond_types=1)
+    system.append_block(cross_pos, 1, cross_mol)  # Crosslink
+    system.append_block(chain_pos, 2, chain_mol)  # Chain bead
+    system.append_bonds(bond_atoms, 1)
+
+    # Bottom support layer (type 4 - frozen)
+    system.append_block(np.column_stack([layer_xy, np.full(n_layer, support_thickness / 2 + z_clearance)]), 4)
+
+    # Top piston layer (type 5 - mobile, for compression)
+    system.append_block(np.column_stack([layer_xy, np.full(n_layer, box_z - support_thickness / 2)]), 5)
+
+    # Add solvent uniformly throughout entire box, checked against every existing bead
+    if solvent_source:
+        solvent_pos = tile_solvent(solvent_source, system.box, solvent_density, system.xyz,
+                                   source_types=source_types, min_dist=min_dist, seed=seed)
+    else:
+        solvent_pos = insert_solvent(num_solvent_total, system.box, system.xyz,
+                                     min_dist=min_dist, seed=seed)
+    system.append_block(solvent_pos, 3)  # Solvent
+
+    if system.count(3) < num_solvent_total:
+        print(f"Warning: Only placed {system.count(3)}/{num_solvent_total} solvent particles")
+
+    # Write LAMMPS data file
+    write_data_file(output_file, system, "LAMMPS data file for tetrahedral gel slab with piston",
+                    [(1, 1.0, "Crosslink"),
+                     (2, 1.0, "Chain bead"),
+                     (3, 1.0, "Solvent"),
+                     (4, 1.0, "Bottom support (frozen)"),
+                     (5, 1.0, "Top piston (mobile)")])
+    write_system_sidecar(output_file, system, "generate_gel_slab", {
+        'beads_per_chain': beads_per_chain, 'units': [units_x, units_y, units_z],
+        'solvent_density': solvent_density, 'solvent_padding': solvent_padding,
+        'support_thickness': support_thickness, 'support_spacing': support_spacing,
+        'min_dist': min_dist, 'seed': seed, 'solvent_source': solvent_source})
+
+    num_solvent_final = system.count(3)
+    num_polymer = system.count(1, 2)
+    num_bottom_support = system.count(4)
+    num_top_piston = system.count(5)
+    num_crosslinks = system.count(1)
+
+    print(f"Generated tetrahedral gel slab with piston:")
+    print(f"  Unit cells: {units_x} x {units_y} x {units_z}")
+    print(f"  Beads per chain: {beads_per_chain}")
+    print(f"  Gel dimensions: {gel_x:.2f} x {gel_y:.2f} x {gel_z:.2f}")
+    print(f"  Box dimensions: {box_x:.2f} x {box_y:.2f} x {box_z:.2f}")
+    print(f"  Crosslinks: {num_crosslinks}")
+    print(f"  Chains: {num_chains}")
+    print(f"  Polymer beads: {num_polymer}")
+    print(f"  Bottom support: {num_bottom_support} (spacing: {support_spacing:.2f})")
+    print(f"  Top piston: {num_top_piston} (spacing: {support_spacing:.2f})")
+    print(f"  Solvent beads: {num_solvent_final} (density: {solvent_density:.2f})")
+    print(f"  Total atoms: {system.n_atoms}")
+    print(f"  Total bonds: {system.n_bonds}")
+    print(f"  Output: {output_file}")
+
+def generate_solvent_box(solvent_density=0.6, box_size=None, output_file="solvent_box.data",
+                         min_dist=0.8, seed=42, solvent_source=None, source_types=None, rescale=False):
+    """
+    Generate a box of pure solvent particles.
+
+    Parameters:
+    - solvent_density: solvent density (beads/σ³)
+    - box_size: box dimensions [x, y, z] in σ. If None, uses 80% of default gel box
+    - output_file: LAMMPS data file name
+    - min_dist: minimum distance between solvent beads
+    - seed: random seed for solvent insertion
+    - solvent_source: equilibrated data file (e.g. a small box's final_config) to tile instead
+      of inserting at random; solvent_density None keeps its density. rescale stretches whole
+      copies to the box instead of cutting the last one (see tile_positions)
+    """
+
+    # Default box size (80% of typical gel box dimensions)
+    if box_size is None:
+        # Original gel box was ~26 x 26 x 18 (for 8x8x4 units with padding)
+        # 20% smaller volume means linear dimensions scaled by (0.8)^(1/3) ≈ 0.928
+        scale = 0.8 ** (1/3)
+        box_size = [26 * scale, 26 * scale, 18 * scale]
+
+    box_x, box_y, box_z = box_size
+    total_volume = box_x * box_y * box_z
+
+    if solvent_source:
+        # Tiled from an equilibrated box: needs little more than a short relaxation
+        solvent_pos = tile_solvent(solvent_source, box_size, solvent_density, source_types=source_types,
+                                   rescale=rescale, min_dist=min_dist, seed=seed)
+        num_solvent_total = len(solvent_pos)
+        solvent_density = num_solvent_total / total_volume
+    else:
+        num_solvent_total = int(solvent_density * total_volume)
+
+        # Add solvent uniformly throughout box
+        solvent_pos = insert_solvent(num_solvent_total, [box_x, box_y, box_z],
+                                     min_dist=min_dist, seed=seed)
+    system = System([box_x, box_y, box_z], capacity=len(solvent_pos), bond_capacity=0,
+                    n_atom_types=1, n_bond_types=0)
+    system.append_block(solvent_pos, 1)  # Solvent
+    solvent_count = system.count(1)
+
+    if solvent_count < num_solvent_total:
+        print(f"Warning: Only placed {solvent_count}/{num_solvent_total} solvent particles")
+
+    # Write LAMMPS data file
+    write_data_file(output_file, system, "LAMMPS data file for pure solvent box",
+                    [(1, 1.0, "Solvent")])
+    write_system_sidecar(output_file, system, "generate_solvent_box", {
+        'solvent_density': solvent_density, 'box_size': [float(v) for v in box_size],
+        'min_dist': min_dist, 'seed': seed, 'solvent_source': solvent_source, 'rescale': rescale})
+
+    print(f"Generated pure solvent box:")
+    print(f"  Box dimensions: {box_x:.2f} x {box_y:.2f} x {box_z:.2f}")
+    print(f"  Volume: {total_volume:.2f} σ³")
+    print(f"  Target density: {solvent_density:.2f} beads/σ³")
+    print(f"  Solvent beads: {solvent_count}")
+    print(f"  Actual density: {solvent_count/total_volume:.3f} beads/σ³")
+    print(f"  Output: {output_file}")
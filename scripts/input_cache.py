@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import sys
+import os
+import glob
+import json
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
+import generate_systems
+from lammps_data_io import sidecar_path, read_sidecar
+from compressed_io import is_compressed
+
+# HOW TO RUN
+# python input_cache.py [input_data_dir]     # list the generated data files and their parameters
+#
+# From a notebook in lammps_work/scripts:
+#   from input_cache import cached_generate, generate_sweep
+#   path = cached_generate('generate_gel_slab', 'slab_support_5beads_10x10x5_rho6_extra_padding43.data',
+#                          beads_per_chain=5, units_x=15, units_y=15, units_z=10,
+#                          solvent_density=1, solvent_padding=13.5, support_thickness=2,
+#                          support_spacing=0.2)
+#   paths = generate_sweep('generate_gel_slab', [{'beads_per_chain': n, 'units_x': 10, ...}
+#                                                for n in (5, 10, 20)], workers=3)
+#
+# Every generated file's sidecar carries params_key, a hash of the generator name,
+# generate_systems.GENERATOR_VERSION and all call parameters (defaults and seed
+# included). A call whose key matches a file in input_data returns that file
+# instead of generating it again.
+
+GENERATORS = ('generate_gel_slab', 'generate_solvent_box')
+
+def get_input_data_dir():
+    return os.path.join(os.path.expanduser('~'), 'Documents', 'lammps_data', 'input_data')
+
+def _file_identity(path):
+    """Stand-in for a data file passed as a parameter: its own params_key, else a hash of its contents."""
+    meta = read_sidecar(path)
+    if meta and meta.get('params_key'):
+        return meta['params_key']
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 24), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _normalize(value):
+    """JSON-ready value with numbers as floats, so 1 and 1.0 (or a tuple and a list) hash alike."""
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def canonical_params(generator, params):
+    """All parameters of a generator call with defaults filled in, without output_file.
+
+    Data files passed as parameters (solvent_source) are replaced by their
+    identity, so the key changes when the source does.
+    """
+    signature = inspect.signature(getattr(generate_systems, generator))
+    bound = signature.bind_partial(**params)
+    bound.apply_defaults()
+    canonical = {}
+    for name, value in bound.arguments.items():
+        if name == 'output_file':
+            continue
+        if isinstance(value, str) and name.endswith('_source'):
+            value = _file_identity(value)
+        canonical[name] = _normalize(value)
+    return canonical
+
+def params_key(generator, params):
+    """sha1 of the generator, its version and the canonical parameters."""
+    text = json.dumps({'generator': generator, 'version': generate_systems.GENERATOR_VERSION,
+                       'params': canonical_params(generator, params)}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def file_key(data_file):
+    """params_key of a generated data file, or None (no sidecar, stale, or not made through the cache)."""
+    meta = read_sidecar(data_file)
+    return meta.get('params_key') if meta else None
+
+def find_cached(key, input_dir=None):
+    """Path of the data file in input_dir generated with key, or None."""
+    input_dir = input_dir or get_input_data_dir()
+    for meta_path in sorted(glob.glob(os.path.join(input_dir, '*.meta.json'))):
+        base = meta_path[:-len('.meta.json')]
+        data_file = base if is_compressed(base) else base + '.data'
+        if os.path.exists(data_file) and file_key(data_file) == key:
+            return data_file
+    return None
+
+def _stamp_key(data_file, key):
+    """Add params_key to the sidecar the generator just wrote (the data file is untouched)."""
+    path = sidecar_path(data_file)
+    with open(path, 'r') as f:
+        meta = json.load(f)
+    meta['params_key'] = key
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+def cached_generate(generator, output_name=None, input_dir=None, **params):
+    """Path of a data file made by generate_systems.<generator>(**params), generating it only if needed.
+
+    output_name is the file name in input_dir (default <generator>_<key>.data).
+    If a file with the same key exists under any name it is returned as is.
+    If output_name exists but was made with other parameters it is not
+    overwritten (runs may link to it): the new file gets the key appended.
+    """
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown generator {generator}; expected one of {', '.join(GENERATORS)}")
+    input_dir = input_dir or get_input_data_dir()
+    key = params_key(generator, params)
+    cached = find_cached(key, input_dir)
+    if cached:
+        print(f"Using cached {cached}")
+        return cached
+
+    os.makedirs(input_dir, exist_ok=True)
+    path = os.path.join(input_dir, output_name or f'{generator}_{key[:12]}.data')
+    if os.path.exists(path):
+        root, ext = os.path.splitext(path)
+        print(f"{path} was generated with other parameters: writing {root}_{key[:8]}{ext} instead")
+        path = f'{root}_{key[:8]}{ext}'
+
+    getattr(generate_systems, generator)(**params, output_file=path)
+    _stamp_key(path, key)
+    return path
+
+def _generate_variant(args):
+    generator, output_name, input_dir, params = args
+    return cached_generate(generator, output_name, input_dir, **params)
+
+def generate_sweep(generator, variants, input_dir=None, workers=None):
+    """cached_generate for every parameter dict in variants, missing ones in parallel.
+
+    A variant may carry its file name under 'output_name'. Variants with the
+    same key are generated once. When variants with different keys ask for
+    the same output_name, the later ones get their key appended (as
+    cached_generate does), so no two workers write the same file. Returns the
+    paths in the order of variants.
+    """
+    input_dir = input_dir or get_input_data_dir()
+    jobs = {}
+    keys = []
+    for variant in variants:
+        params = {k: v for k, v in variant.items() if k != 'output_name'}
+        key = params_key(generator, params)
+        keys.append(key)
+        if key not in jobs:
+            jobs[key] = (generator, variant.get('output_name'), input_dir, params)
+
+    paths = {key: find_cached(key, input_dir) for key in jobs}
+    missing = [key for key, path in paths.items() if path is None]
+    taken = set()
+    for key in missing:
+        name = jobs[key][1] or f'{generator}_{key[:12]}.data'
+        if name in taken:
+            root, ext = os.path.splitext(name)
+            print(f"{name} is also requested with other parameters: writing {root}_{key[:8]}{ext} instead")
+            name = f'{root}_{key[:8]}{ext}'
+            jobs[key] = (generator, name, input_dir, jobs[key][3])
+        taken.add(name)
+    if missing:
+        print(f"Generating {len(missing)} of {len(jobs)} variants with {workers or os.cpu_count()} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for key, path in zip(missing, pool.map(_generate_variant, [jobs[k] for k in missing])):
+                paths[key] = path
+    return [paths[key] for key in keys]
+
+if __name__ == "__main__":
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else get_input_data_dir()
+    data_files = sorted(glob.glob(os.path.join(input_dir, '*.data')) +
+                        glob.glob(os.path.join(input_dir, '*.data.gz')) + glob.glob(os.path.join(input_dir, '*.data.zst')))
+    if not data_files:
+        print(f"No data files in {input_dir}")
+        sys.exit(1)
+    for data_file in data_files:
+        meta = read_sidecar(data_file)
+        name = os.path.basename(data_file)
+        if meta is None:
+            print(f"{name:<60} (no current sidecar)")
+            continue
+        key = (meta.get('params_key') or '-')[:12]
+        params = ' '.join(f'{k}={v}' for k, v in sorted(meta.get('params', {}).items()))
+        print(f"{name:<60} {key:<12} {meta.get('atoms', 0):>10} atoms  {meta.get('generator') or '-'} {params}")
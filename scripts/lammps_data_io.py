@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+import os
+import json
+import numpy as np
+
+from compressed_io import open_file, is_compressed, compress_file
+
+# Header keywords of the LAMMPS data files we write and read
+COUNT_KEYWORDS = ('atoms', 'bonds', 'angles', 'dihedrals', 'impropers')
+SECTION_KEYWORDS = ('Masses', 'Atoms', 'Velocities', 'Bonds', 'Angles', 'Dihedrals', 'Impropers',
+                    'Pair Coeffs', 'Bond Coeffs')
+
+def _format_rows(f, row_fmt, columns, chunk=200_000):
+    """Write rows built from equal-length columns, formatting a whole chunk per call."""
+    n = len(columns[0])
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        rows = zip(*[c[start:stop].tolist() for c in columns])
+        values = tuple(v for row in rows for v in row)
+        f.write((row_fmt * (stop - start)) % values)
+
+def write_data_file(output_file, system, title, masses, float_fmt='%.6f', workers=None):
+    """Write a System as a LAMMPS data file (atom_style molecular).
+
+    masses is a list of (type, mass, comment) tuples. Atom and bond rows are
+    formatted in large chunks instead of one f-string per line. An output_file
+    ending in .gz (or .zst) is written plain first and then compressed on
+    workers processes (see compressed_io.compress_file).
+    """
+    box_x, box_y, box_z = (float(v) for v in system.box)
+    target = output_file + '.plain.tmp' if is_compressed(output_file) else output_file
+
+    with open(target, 'w') as f:
+        f.write(f"{title}\n\n")
+        f.write(f"{system.n_atoms} atoms\n")
+        f.write(f"{system.n_bonds} bonds\n")
+        f.write("0 angles\n")
+        f.write("0 dihedrals\n")
+        f.write("0 impropers\n\n")
+        if system.n_bond_types:
+            f.write(f"{system.n_atom_types} atom types\n")
+            f.write(f"{system.n_bond_types} bond types\n\n")
+        else:
+            f.write(f"{system.n_atom_types} atom types\n\n")
+        f.write(f"0.0 {box_x} xlo xhi\n")
+        f.write(f"0.0 {box_y} ylo yhi\n")
+        f.write(f"0.0 {box_z} zlo zhi\n\n")
+        f.write("Masses\n\n")
+        for atom_type, mass, comment in masses:
+            f.write(f"{atom_type} {mass}  # {comment}\n")
+        f.write("\nAtoms\n\n")
+
+        xyz = system.xyz
+        _format_rows(f, f"%d %d %d {float_fmt} {float_fmt} {float_fmt}\n",
+                     [system.ids, system.mol, system.type, xyz[:, 0], xyz[:, 1], xyz[:, 2]])
+
+        if system.n_bond_types:
+            f.write("\nBonds\n\n")
+            bonds = system.bonds
+            _format_rows(f, "%d %d %d %d\n",
+                         [np.arange(1, system.n_bonds + 1), bonds[:, 0], bonds[:, 1], bonds[:, 2]])
+
+    if target != output_file:
+        compress_file(target, output_file, workers)
+
+def read_data_header(data_file):
+    """Parse counts, type counts, box bounds and masses, stopping at the Atoms section.
+
+    Returns a dict with 'counts', 'types', 'box' ({'x': (lo, hi), ...}), 'masses',
+    'atom_style' and 'atoms_offset' (byte offset of the first line after 'Atoms').
+    """
+    header = {'counts': {}, 'types': {}, 'box': {}, 'masses': {},
+              'atom_style': None, 'atoms_offset': None}
+    section = None
+
+    with open_file(data_file, 'rb') as f:
+        f.readline()  # Title line
+        for raw in iter(f.readline, b''):
+            line = raw.decode()
+            text, _, comment = line.partition('#')
+            text = text.strip()
+            if not text:
+                continue
+
+            if text in SECTION_KEYWORDS:
+                section = text
+                if section == 'Atoms':
+                    header['atom_style'] = comment.strip() or None
+                    # Point at the first atom line, past the blank separator
+                    while True:
+                        offset = f.tell()
+                        raw = f.readline()
+                        if not raw or raw.strip():
+                            break
+                    header['atoms_offset'] = offset
+                    break
+                continue
+
+            parts = text.split()
+            if section == 'Masses':
+                header['masses'][int(parts[0])] = float(parts[1])
+            elif section is not None:
+                continue
+            elif len(parts) == 2 and parts[1] in COUNT_KEYWORDS:
+                header['counts'][parts[1]] = int(parts[0])
+            elif len(parts) == 3 and parts[2] == 'types':
+                header['types'][parts[1]] = int(parts[0])
+            elif len(parts) == 4 and parts[2] in ('xlo', 'ylo', 'zlo'):
+                header['box'][parts[2][0]] = (float(parts[0]), float(parts[1]))
+
+    return header
+
+def box_lengths(header):
+    """Box lengths {'x': Lx, 'y': Ly, 'z': Lz} from a parsed header or sidecar."""
+    return {dim: hi - lo for dim, (lo, hi) in header['box'].items()}
+
+def _read_line_block(f, n_lines):
+    """Read exactly n_lines lines from the current position as one bytes object."""
+    first = f.readline()
+    if not first:
+        return b''
+    chunks = [first]
+    n_found = 1
+    chunk_size = max(1 << 20, int(len(first) * (n_lines - 1) * 1.1))
+    while n_found < n_lines:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+        if n_found + len(newlines) >= n_lines:
+            chunks.append(chunk[:newlines[n_lines - n_found - 1] + 1])
+            n_found = n_lines
+        else:
+            chunks.append(chunk)
+            n_found += len(newlines)
+    return b''.join(chunks)
+
+def read_atoms(data_file, header=None, usecols=None):
+    """Load the Atoms section in one vectorized pass.
+
+    Returns a 2D float array with one row per atom (id, mol, type, x, y, z
+    [, ix, iy, iz]), or only the requested usecols. The block is parsed with a
+    single np.fromstring call; np.loadtxt is the fallback for odd layouts.
+    """
+    if header is None:
+        header = read_data_header(data_file)
+    n_atoms = header['counts'].get('atoms', 0)
+    if header['atoms_offset'] is None or n_atoms == 0:
+        return np.empty((0, 6 if usecols is None else len(np.atleast_1d(usecols))))
+
+    with open_file(data_file, 'rb') as f:
+        f.seek(header['atoms_offset'])
+        block = _read_line_block(f, n_atoms)
+
+    n_cols = len(block[:block.find(b'\n')].split())
+    values = np.fromstring(block, sep=' ') if b'#' not in block else np.empty(0)
+    if values.size == n_atoms * n_cols:
+        atoms = values.reshape(n_atoms, n_cols)
+    else:
+        atoms = np.loadtxt(block.decode().splitlines(), comments='#', ndmin=2)
+
+    if usecols is not None:
+        atoms = atoms[:, np.atleast_1d(usecols)]
+    return atoms
+
+def read_atom_types(data_file, header=None):
+    """Return the type column of the Atoms section as an int array.
+
+    For single-space separated rows (what write_data and our generators emit)
+    the third token is decoded straight from the raw bytes; anything else goes
+    through read_atoms.
+    """
+    if header is None:
+        header = read_data_header(data_file)
+    n_atoms = header['counts'].get('atoms', 0)
+    if header['atoms_offset'] is None or n_atoms == 0:
+        return np.empty(0, dtype=np.int64)
+
+    with open_file(data_file, 'rb') as f:
+        f.seek(header['atoms_offset'])
+        block = _read_line_block(f, n_atoms)
+
+    # With single spaces every line has exactly n_cols separators (spaces + newline);
+    # double spaces, tabs or CRLF change the count and fall back to read_atoms
+    n_cols = len(block[:block.find(b'\n')].split())
+    buf = np.frombuffer(block, dtype=np.uint8)
+    separators = np.flatnonzero(buf <= 32)
+    if len(separators) != n_atoms * n_cols:
+        return read_atoms(data_file, header, usecols=(2,))[:, 0].astype(np.int64)
+    separators = separators.reshape(n_atoms, n_cols)
+
+    # The type is the token between the 2nd and 3rd separator of each line
+    lo = separators[:, 1] + 1
+    width = separators[:, 2] - lo
+    types = np.zeros(n_atoms, dtype=np.int64)
+    for digit in range(int(width.max())):
+        more = width > digit
+        types[more] = types[more] * 10 + (buf[lo[more] + digit] - 48)
+    return types
+
+def count_atom_types(data_file, header=None):
+    """Return {atom type: count} from the type column of the Atoms section."""
+    counts = np.bincount(read_atom_types(data_file, header))
+    return {int(t): int(c) for t, c in enumerate(counts) if c}
+
+def sidecar_path(data_file):
+    """Metadata sidecar next to the real data file (symlinks are resolved)."""
+    real = os.path.realpath(data_file)
+    base = real[:-len('.data')] if real.endswith('.data') else real
+    return base + '.meta.json'
+
+def _file_stamp(data_file):
+    st = os.stat(os.path.realpath(data_file))
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def write_sidecar(data_file, box, atom_types, n_atoms, n_bonds, generator=None, params=None):
+    """Write a small JSON summary (box, per-type counts, bonds, generator params) of a data file.
+
+    box is {'x': (lo, hi), ...}; atom_types is {type: count}. The data file's
+    size and mtime are stored so stale sidecars can be detected.
+    """
+    meta = {
+        'data_file': os.path.basename(os.path.realpath(data_file)),
+        **_file_stamp(data_file),
+        'box': {dim: [float(lo), float(hi)] for dim, (lo, hi) in box.items()},
+        'atoms': int(n_atoms),
+        'bonds': int(n_bonds),
+        'atom_types': {str(t): int(c) for t, c in sorted(atom_types.items())},
+        'generator': generator,
+        'params': params or {},
+    }
+    _write_json(sidecar_path(data_file), meta)
+    return meta
+
+def _write_json(path, meta):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+def move_sidecar(data_file, new_data_file, keep=False):
+    """Carry a current sidecar of data_file over to new_data_file (e.g. its compressed copy).
+
+    The file name, size and mtime are restamped for new_data_file; everything
+    else (box, counts, params_key) is kept. The old sidecar is removed unless
+    keep is set. Returns the new metadata, or None if data_file had no current sidecar.
+    """
+    if read_sidecar(data_file) is None:
+        return None
+    path = sidecar_path(data_file)
+    with open(path, 'r') as f:
+        meta = json.load(f)
+    meta['data_file'] = os.path.basename(os.path.realpath(new_data_file))
+    meta.update(_file_stamp(new_data_file))
+    _write_json(sidecar_path(new_data_file), meta)
+    if not keep:
+        os.remove(path)
+    return meta
+
+def write_system_sidecar(data_file, system, generator=None, params=None):
+    """Write the sidecar for a data file just written from a System."""
+    box = {dim: (0.0, float(length)) for dim, length in zip('xyz', system.box)}
+    return write_sidecar(data_file, box, system.type_counts(), system.n_atoms, system.n_bonds,
+                         generator, params)
+
+def read_sidecar(data_file):
+    """Return the sidecar dict, or None if it is missing, unreadable or stale."""
+    path = sidecar_path(data_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            meta = json.load(f)
+        stamp = _file_stamp(data_file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('size') != stamp['size'] or meta.get('mtime_ns') != stamp['mtime_ns']:
+        return None
+    meta['atom_types'] = {int(t): c for t, c in meta['atom_types'].items()}
+    meta['box'] = {dim: tuple(bounds) for dim, bounds in meta['box'].items()}
+    return meta
+
+def data_file_summary(data_file):
+    """Box, atom/bond counts and per-type counts, from the sidecar when it is current.
+
+    Falls back to scanning the data file and then (re)writes the sidecar so the
+    next lookup is instant.
+    """
+    meta = read_sidecar(data_file)
+    if meta is not None:
+        return meta
+
+    header = read_data_header(data_file)
+    atom_types = count_atom_types(data_file, header)
+    try:
+        meta = write_sidecar(data_file, header['box'], atom_types,
+                             header['counts'].get('atoms', 0), header['counts'].get('bonds', 0))
+    except OSError:
+        return {'box': header['box'], 'atoms': header['counts'].get('atoms', 0),
+                'bonds': header['counts'].get('bonds', 0), 'atom_types': atom_types,
+                'generator': None, 'params': {}}
+    return read_sidecar(data_file) or meta
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+import os
+import re
+import numpy as np
+
+from compressed_io import open_file
+
+def _strip_comments(buf):
+    """Drop '#' comment lines (ave/time rewrites its header on every append)."""
+    pieces = []
+    start = 0
+    hash_at = buf.find(b'#')
+    while hash_at != -1:
+        line_start = buf.rfind(b'\n', start, hash_at) + 1
+        line_end = buf.find(b'\n', hash_at)
+        line_end = len(buf) if line_end == -1 else line_end + 1
+        pieces.append(buf[start:line_start])
+        start = line_end
+        hash_at = buf.find(b'#', start)
+    if not pieces:
+        return buf
+    pieces.append(buf[start:])
+    return b''.join(pieces)
+
+def iter_ave_time_blocks(filepath):
+    """Yield (timestep, rows, values) blocks from a fix ave/time vector file.
+
+    The file is read line by line, so memory stays bounded by one block. A
+    block cut short at the end of a file still being written is yielded with
+    the rows it has.
+    """
+    with open_file(filepath, 'rt') as f:
+        block = None
+        for line in f:
+            if line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) == 2 and block is None:  # Timestep line
+                timestep, nrows = int(parts[0]), int(parts[1])
+                block = (timestep, nrows, [])
+                if nrows == 0:
+                    block = None
+                continue
+            if block is None or len(parts) < 2:
+                continue
+
+            timestep, nrows, values = block
+            try:
+                values.append(float(parts[1]))
+            except ValueError:  # Line cut short mid-write
+                continue
+            if len(values) == nrows:
+                yield timestep, np.arange(1, nrows + 1), np.array(values)
+                block = None
+
+        if block is not None and block[2]:
+            timestep, _, values = block
+            yield timestep, np.arange(1, len(values) + 1), np.array(values)
+
+def parse_ave_time_buffer(buf):
+    """Parse the complete blocks of an ave/time vector buffer in one vectorized pass.
+
+    Returns (timesteps, values, consumed), where consumed is the byte count up to
+    the end of the last complete block (a block still being written is left for
+    the next call), or None if the blocks do not all have the same nrows.
+    """
+    end = buf.rfind(b'\n') + 1
+    numbers = np.fromstring(_strip_comments(buf[:end]), sep=' ')
+    if numbers.size < 2:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0)), 0
+    nrows = int(numbers[1])
+    block = 2 + 2 * nrows
+    n_blocks = numbers.size // block
+    leftover = numbers.size - n_blocks * block
+    if nrows == 0 or leftover % 2:
+        return None
+
+    blocks = numbers[:n_blocks * block].reshape(n_blocks, block)
+    # Every block must start with "timestep nrows" and number its rows 1..nrows
+    if not (np.all(blocks[:, 1] == nrows) and
+            np.all(blocks[:, 2::2] == np.arange(1, nrows + 1))):
+        return None
+
+    # Each leftover line (header or row) holds two numbers; back up over them
+    consumed = end
+    for _ in range(leftover // 2):
+        consumed = buf.rfind(b'\n', 0, consumed - 1) + 1
+    return blocks[:, 0].astype(np.int64), blocks[:, 3::2].copy(), consumed
+
+def read_ave_time_file(filepath):
+    """Read a fix ave/time vector file ("timestep nrows" then "row value" lines).
+
+    Returns (timesteps, values) with values a 2D (n_timesteps, n_bins) array;
+    bin i sits at row i + 1. Uniform files are parsed in a single vectorized
+    pass; otherwise the blocks are streamed and ragged ones padded with NaN.
+    """
+    with open_file(filepath, 'rb') as f:
+        buf = f.read()
+    parsed = parse_ave_time_buffer(buf)
+    if parsed is not None and parsed[2] == len(buf):
+        return parsed[:2]
+
+    timesteps = []
+    blocks = []
+    for timestep, _, values in iter_ave_time_blocks(filepath):
+        timesteps.append(timestep)
+        blocks.append(values)
+    if not blocks:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0))
+
+    n_bins = max(len(v) for v in blocks)
+    values = np.full((len(blocks), n_bins), np.nan)
+    for i, v in enumerate(blocks):
+        values[i, :len(v)] = v
+    return np.array(timesteps, dtype=np.int64), values
+
+def parse_columns_buffer(buf):
+    """Parse the complete lines of a whitespace-separated numeric table (fix print output).
+
+    Returns (table, consumed): a 2D float array with one row per line and the
+    byte count of the lines parsed. Comment lines are skipped; lines with the
+    wrong number of fields or non-numeric text fall back to a per-line parse.
+    """
+    end = buf.rfind(b'\n') + 1
+    body = _strip_comments(buf[:end])
+    lines = body.split(b'\n', 1) if body.strip() else [b'']
+    n_cols = len(lines[0].split())
+    if n_cols == 0:
+        return _read_columns_lines(body), end
+
+    # One number per field on every line; anything irregular takes the slow path
+    numbers = np.fromstring(body, sep=' ')
+    if numbers.size == n_cols * body.count(b'\n'):
+        return numbers.reshape(-1, n_cols), end
+    return _read_columns_lines(body, n_cols), end
+
+def _read_columns_lines(body, n_cols=None):
+    """Per-line fallback for parse_columns_buffer: keep the numeric lines with n_cols fields."""
+    rows = []
+    for line in body.decode().splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if n_cols is None:
+            n_cols = len(parts)
+        if len(parts) != n_cols:
+            continue
+        try:
+            rows.append([float(v) for v in parts])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=float).reshape(-1, n_cols or 0)
+
+def read_columns_file(filepath):
+    """Read a numeric table written by fix print (e.g. "step Lx Ly Lz") as a 2D array."""
+    with open_file(filepath, 'rb') as f:
+        buf = f.read()
+    if buf and not buf.endswith(b'\n'):
+        buf += b'\n'
+    return parse_columns_buffer(buf)[0]
+
+def write_ave_time_file(filepath, timesteps, values, label='value'):
+    """Write (n_timesteps, n_rows) values as a fix ave/time vector file (see read_ave_time_file).
+
+    values may also be a list of 1D arrays whose lengths differ (chunk counts
+    that change with the box). The header mimics the one LAMMPS writes.
+    """
+    tmp = f'{filepath}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(f"# Time-averaged data written by post-processing\n"
+                f"# TimeStep Number-of-rows\n# Row {label}\n")
+        if isinstance(values, np.ndarray):
+            values = np.atleast_2d(values)
+        for timestep, row_values in zip(timesteps, values):
+            f.write(f"{int(timestep)} {len(row_values)}\n")
+            f.writelines(f"{i} {v:.10g}\n" for i, v in enumerate(row_values, 1))
+    os.replace(tmp, filepath)
+
+def write_columns_file(filepath, table):
+    """Write a 2D array one row per line, like fix print (see read_columns_file)."""
+    table = np.atleast_2d(table)
+    tmp = f'{filepath}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        for row in table:
+            f.write(' '.join(f"{v:.10g}" for v in row) + '\n')
+    os.replace(tmp, filepath)
+
+def parse_thermo_buffer(buf, headers=None, reading=False):
+    """Parse the complete lines of a log.lammps chunk into thermo segments.
+
+    Every 'Step ...' header starts a new segment; 'Loop time' or a WARNING ends
+    it. headers/reading carry the open segment over from the previous chunk.
+    Returns (segments, reading, consumed): segments is a list of
+    (headers, rows, continues) with rows a 2D float array, continues True for
+    rows that extend the segment passed in.
+    """
+    end = buf.rfind(b'\n') + 1
+    segments = []
+    rows = []
+    continues = headers is not None
+
+    for raw in buf[:end].decode(errors='replace').splitlines():
+        line = raw.strip()
+
+        if line.startswith('Step'):
+            if headers is not None and (rows or continues):
+                segments.append((headers, np.array(rows, dtype=float).reshape(-1, len(headers)), continues))
+            headers = line.split()
+            rows = []
+            continues = False
+            reading = True
+            continue
+
+        if reading and ('Loop time' in line or line.startswith('WARNING')):
+            reading = False
+            continue
+
+        if reading and line and not line.startswith('#'):
+            values = line.split()
+            if len(values) == len(headers):
+                try:
+                    rows.append([float(v) for v in values])
+                except ValueError:
+                    continue
+
+    if headers is not None and (rows or not continues):
+        segments.append((headers, np.array(rows, dtype=float).reshape(-1, len(headers)), continues))
+    return segments, reading, end
+
+class ThermoSegment:
+    """Rows of one 'Step ...' thermo block, kept in a growable array."""
+
+    def __init__(self, headers, capacity=1024):
+        self.headers = list(headers)
+        self.n_rows = 0
+        self._values = np.empty((capacity, len(self.headers)))
+
+    @property
+    def values(self):
+        return self._values[:self.n_rows]
+
+    def column(self, name):
+        return self.values[:, self.headers.index(name)]
+
+    def append(self, rows):
+        n = len(rows)
+        need = self.n_rows + n
+        if need > len(self._values):
+            new = np.empty((max(need, 2 * len(self._values)), len(self.headers)))
+            new[:self.n_rows] = self._values[:self.n_rows]
+            self._values = new
+        self._values[self.n_rows:need] = rows
+        self.n_rows = need
+
+class ThermoLog:
+    """Follow a log.lammps as it grows, parsing only the lines added since the last update.
+
+    Keeps the byte offset and open-block state between calls. Each 'Step ...'
+    block (minimization, gentle push, production, ...) is its own segment.
+    """
+
+    def __init__(self, filepath='log.lammps'):
+        self.filepath = filepath
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.reading = False
+        self.segments = []
+
+    def update(self):
+        """Parse newly appended lines and return the number of new thermo rows."""
+        try:
+            size = os.path.getsize(self.filepath)
+        except OSError:
+            return 0
+        if size < self.offset:  # Log was restarted from scratch
+            self.reset()
+        if size == self.offset:
+            return 0
+
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            tail = f.read(size - self.offset)
+
+        headers = self.segments[-1].headers if self.segments else None
+        segments, self.reading, consumed = parse_thermo_buffer(tail, headers, self.reading)
+        self.offset += consumed
+
+        n_new = 0
+        for seg_headers, rows, continues in segments:
+            if not continues:
+                self.segments.append(ThermoSegment(seg_headers))
+            self.segments[-1].append(rows)
+            n_new += len(rows)
+        return n_new
+
+    def columns(self):
+        """Dict of header -> array; columns of later segments replace earlier ones."""
+        data = {}
+        for segment in self.segments:
+            for j, h in enumerate(segment.headers):
+                data[h] = segment.values[:, j]
+        return data
+
+# End-of-run performance summary printed after every run/minimize
+TIMING_SECTIONS = ('Pair', 'Bond', 'Kspace', 'Neigh', 'Comm', 'Output', 'Modify', 'Other')
+_LOOP_RE = re.compile(r'Loop time of ([\d.eE+-]+) on (\d+) procs for (\d+) steps with (\d+) atoms')
+_ATOM_STEP_SCALE = {'': 1.0, 'k': 1e3, 'M': 1e6, 'G': 1e9}
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def parse_performance_blocks(filepath):
+    """Extract every end-of-run performance summary from a LAMMPS log.
+
+    Returns a list of dicts, one per 'Loop time of' line, with loop_time,
+    nprocs, nsteps, natoms, tau_per_day, timesteps_per_s, atom_steps_per_s,
+    cpu_percent, mpi_tasks, omp_threads, proc_grid (the last processor grid
+    set up before the run), timing ({section: {'min', 'avg', 'max',
+    'varavg', 'total'}}), nlocal/nghost/neighs ({'ave', 'max', 'min'}),
+    total_neighbors, ave_neighs_per_atom, neighbor_builds and dangerous_builds.
+    """
+    blocks = []
+    block = None
+    proc_grid = None
+    omp_threads = None
+    in_timing = False
+
+    with open_file(filepath, 'rt', errors='replace') as f:
+        for line in f:
+            text = line.strip()
+
+            m = re.match(r'(\d+) by (\d+) by (\d+) MPI processor grid', text)
+            if m:
+                proc_grid = tuple(int(v) for v in m.groups())
+                continue
+            m = re.match(r'using (\d+) OpenMP thread\(s\) per MPI task', text)
+            if m:
+                omp_threads = int(m.group(1))
+                continue
+
+            m = _LOOP_RE.search(text)
+            if m:
+                block = {'loop_time': float(m.group(1)), 'nprocs': int(m.group(2)),
+                         'nsteps': int(m.group(3)), 'natoms': int(m.group(4)),
+                         'tau_per_day': None, 'timesteps_per_s': None, 'atom_steps_per_s': None,
+                         'cpu_percent': None, 'mpi_tasks': None, 'omp_threads': omp_threads,
+                         'proc_grid': proc_grid, 'timing': {},
+                         'nlocal': None, 'nghost': None, 'neighs': None,
+                         'total_neighbors': None, 'ave_neighs_per_atom': None,
+                         'neighbor_builds': None, 'dangerous_builds': None}
+                blocks.append(block)
+                in_timing = False
+                continue
+            if block is None:
+                continue
+
+            if text.startswith('Performance:'):
+                m = re.search(r'([\d.]+) tau/day', text)
+                block['tau_per_day'] = float(m.group(1)) if m else None
+                m = re.search(r'([\d.]+) timesteps/s', text)
+                block['timesteps_per_s'] = float(m.group(1)) if m else None
+                m = re.search(r'([\d.]+) ([kMG]?)atom-step/s', text)
+                if m:
+                    block['atom_steps_per_s'] = float(m.group(1)) * _ATOM_STEP_SCALE[m.group(2)]
+                continue
+            m = re.match(r'([\d.]+)% CPU use with (\d+) MPI tasks x (\d+) OpenMP threads', text)
+            if m:
+                block['cpu_percent'] = float(m.group(1))
+                block['mpi_tasks'] = int(m.group(2))
+                block['omp_threads'] = int(m.group(3))
+                continue
+
+            if text.startswith('MPI task timing breakdown'):
+                in_timing = True
+                continue
+            if in_timing:
+                fields = [v.strip() for v in text.split('|')]
+                if len(fields) == 6 and fields[0] in TIMING_SECTIONS:
+                    block['timing'][fields[0]] = dict(zip(('min', 'avg', 'max', 'varavg', 'total'),
+                                                          (_to_float(v) for v in fields[1:])))
+                    continue
+                if fields[0] in ('Section', '') or set(text) == {'-'}:
+                    continue
+                in_timing = False
+
+            m = re.match(r'(Nlocal|Nghost|Neighs):\s+([\d.eE+-]+) ave\s+([\d.eE+-]+) max\s+([\d.eE+-]+) min', text)
+            if m:
+                block[m.group(1).lower()] = {'ave': float(m.group(2)), 'max': float(m.group(3)),
+                                             'min': float(m.group(4))}
+                continue
+            for key, prefix, cast in (('total_neighbors', 'Total # of neighbors =', int),
+                                      ('ave_neighs_per_atom', 'Ave neighs/atom =', float),
+                                      ('neighbor_builds', 'Neighbor list builds =', int),
+                                      ('dangerous_builds', 'Dangerous builds =', int)):
+                if text.startswith(prefix):
+                    block[key] = cast(float(text[len(prefix):].split()[0]))  # Large counts print as 3.6e+08
+                    break
+
+    return blocks
+
+def limiting_section(block):
+    """Name and %total of the timing section that takes the largest share of a run."""
+    timing = {k: v['total'] for k, v in block['timing'].items() if v['total'] is not None}
+    if not timing:
+        return None, None
+    name = max(timing, key=timing.get)
+    return name, timing[name]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import numpy as np
+
+from compressed_io import open_file, is_compressed
+from lammps_output_io import (parse_ave_time_buffer, read_ave_time_file,
+                              parse_columns_buffer, read_columns_file, parse_thermo_buffer)
+
+# Parsed outputs are cached as .npy files in a hidden directory next to the
+# source, e.g. output_files/stress_data/.npcache/stress_x_polymer_<run>.dat.ave_time.json
+CACHE_DIR = '.npcache'
+DIGEST_BYTES = 4096
+
+def _cache_prefix(source, kind):
+    folder, name = os.path.split(os.path.abspath(source))
+    return os.path.join(folder, CACHE_DIR, f'{name}.{kind}')
+
+def _digest(f, n_bytes):
+    f.seek(0)
+    return hashlib.sha1(f.read(n_bytes)).hexdigest()
+
+def _load_cache(prefix):
+    """Return (meta, arrays) from the cache, with arrays memory-mapped, or (None, None)."""
+    try:
+        with open(prefix + '.json', 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(f'{prefix}.{name}.npy', mmap_mode='r') for name in meta['arrays']}
+    except (OSError, ValueError, KeyError):
+        return None, None
+    return meta, arrays
+
+def _save_cache(prefix, meta, arrays, loaded):
+    """Write changed arrays, then the meta file, each via an atomic rename of a per-process temp file."""
+    try:
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        for name, arr in arrays.items():
+            if loaded and loaded.get(name) is arr:
+                continue
+            tmp = f'{prefix}.{name}.{os.getpid()}.tmp.npy'
+            np.save(tmp, np.ascontiguousarray(arr))
+            os.replace(tmp, f'{prefix}.{name}.npy')
+        meta['arrays'] = sorted(arrays)
+        tmp = f'{prefix}.json.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, prefix + '.json')
+    except OSError:
+        pass  # Read-only output directory: still return the parsed data
+
+def _cached_parse(source, kind, parse):
+    """Return (arrays, state) for source, parsing only the bytes appended since the last call.
+
+    parse(tail, state, arrays) turns the unparsed tail into updated arrays and
+    returns (arrays, state, consumed), or None when the tail cannot extend the
+    cached arrays. The cache is rebuilt from scratch when the file was
+    rewritten (shorter, or its first bytes changed). Returns None if the file
+    cannot be parsed incrementally at all. Offsets count decompressed bytes,
+    so .gz/.zst sources (which are not appended to) are cached the same way.
+    """
+    prefix = _cache_prefix(source, kind)
+    stat = os.stat(source)
+    meta, loaded = _load_cache(prefix)
+    if meta is not None and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+        return loaded, meta['state']
+
+    with open_file(source, 'rb') as f:
+        if meta is not None and (is_compressed(source) or meta['offset'] <= stat.st_size) and \
+                _digest(f, meta['digest_bytes']) == meta['digest']:
+            offset, state, arrays = meta['offset'], meta['state'], dict(loaded)
+        else:
+            offset, state, arrays, loaded = 0, None, {}, None
+        f.seek(offset)
+        tail = f.read()
+        length = offset + len(tail)
+
+        result = parse(tail, state, arrays)
+        if result is None and offset:
+            offset, state, arrays, loaded = 0, None, {}, None
+            f.seek(0)
+            tail = f.read()
+            length = len(tail)
+            result = parse(tail, state, arrays)
+        if result is None:
+            return None
+
+        arrays, state, consumed = result
+        offset += consumed
+        digest_bytes = min(offset, DIGEST_BYTES)
+        digest = _digest(f, digest_bytes)
+
+    meta = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'offset': offset,
+            'digest_bytes': digest_bytes, 'digest': digest, 'state': state}
+    # The file is still being appended to: only its parsed part is final
+    if offset != length:
+        meta['size'] = meta['mtime_ns'] = None
+    _save_cache(prefix, meta, arrays, loaded)
+    return arrays, state
+
+def _parse_ave_time_tail(tail, state, arrays):
+    parsed = parse_ave_time_buffer(tail)
+    if parsed is None:
+        return None
+    timesteps, values, consumed = parsed
+    if 'values' in arrays and len(timesteps):
+        if values.shape[1] != arrays['values'].shape[1]:
+            return None
+        timesteps = np.concatenate([arrays['timesteps'], timesteps])
+        values = np.concatenate([arrays['values'], values])
+    elif 'values' in arrays:
+        return arrays, state, consumed
+    return {'timesteps': timesteps, 'values': values}, state, consumed
+
+def cached_ave_time_file(filepath):
+    """read_ave_time_file backed by the binary cache: (timesteps, values (n_timesteps, n_bins))."""
+    cached = _cached_parse(filepath, 'ave_time', _parse_ave_time_tail)
+    if cached is None:
+        return read_ave_time_file(filepath)
+    arrays, _ = cached
+    return arrays['timesteps'], arrays['values']
+
+def _parse_columns_tail(tail, state, arrays):
+    table, consumed = parse_columns_buffer(tail)
+    if 'table' in arrays and table.size:
+        if table.shape[1] != arrays['table'].shape[1]:
+            return None
+        table = np.concatenate([arrays['table'], table])
+    elif 'table' in arrays:
+        return arrays, state, consumed
+    return {'table': table}, state, consumed
+
+def cached_columns_file(filepath):
+    """read_columns_file backed by the binary cache: a 2D array, one row per line."""
+    cached = _cached_parse(filepath, 'columns', _parse_columns_tail)
+    if cached is None:
+        return read_columns_file(filepath)
+    return cached[0]['table']
+
+def _parse_thermo_tail(tail, state, arrays):
+    state = state or {'headers': [], 'reading': False}
+    headers = state['headers'][-1] if state['headers'] else None
+    segments, reading, consumed = parse_thermo_buffer(tail, headers, state['reading'])
+
+    state = {'headers': list(state['headers']), 'reading': reading}
+    for seg_headers, rows, continues in segments:
+        if continues:
+            name = f"seg{len(state['headers']) - 1}"
+            if len(rows):
+                arrays[name] = np.concatenate([arrays[name], rows])
+        else:
+            state['headers'].append(seg_headers)
+            arrays[f"seg{len(state['headers']) - 1}"] = rows
+    return arrays, state, consumed
+
+def cached_thermo_log(filepath):
+    """Thermo segments of log.lammps as a list of (headers, values), one per 'Step' block."""
+    arrays, state = _cached_parse(filepath, 'thermo', _parse_thermo_tail)
+    return [(headers, arrays[f'seg{i}']) for i, headers in enumerate((state or {}).get('headers', []))]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import numpy as np
+
+class System:
+    """Particles and bonds stored as preallocated structure-of-arrays.
+
+    Atoms get consecutive ids in the order they are appended. Arrays grow by
+    doubling when the capacity is exceeded, so pass a good estimate up front.
+    """
+
+    def __init__(self, box, capacity=1024, bond_capacity=1024, n_atom_types=1, n_bond_types=1):
+        self.box = np.asarray(box, dtype=float)
+        self.n_atom_types = n_atom_types
+        self.n_bond_types = n_bond_types
+        self.n_atoms = 0
+        self.n_bonds = 0
+        self.next_mol = 1
+
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._mol = np.empty(capacity, dtype=np.int64)
+        self._type = np.empty(capacity, dtype=np.int32)
+        self._xyz = np.empty((capacity, 3), dtype=float)
+        self._bonds = np.empty((bond_capacity, 3), dtype=np.int64)  # type, atom1, atom2
+        self._type_counts = {}
+
+    # Views of the filled part of each array
+    @property
+    def ids(self):
+        return self._ids[:self.n_atoms]
+
+    @property
+    def mol(self):
+        return self._mol[:self.n_atoms]
+
+    @property
+    def type(self):
+        return self._type[:self.n_atoms]
+
+    @property
+    def xyz(self):
+        return self._xyz[:self.n_atoms]
+
+    @property
+    def bonds(self):
+        return self._bonds[:self.n_bonds]
+
+    def _reserve_atoms(self, n):
+        need = self.n_atoms + n
+        if need <= len(self._ids):
+            return
+        capacity = max(need, 2 * len(self._ids))
+        for name in ('_ids', '_mol', '_type', '_xyz'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n_atoms] = old[:self.n_atoms]
+            setattr(self, name, new)
+
+    def _reserve_bonds(self, n):
+        need = self.n_bonds + n
+        if need <= len(self._bonds):
+            return
+        new = np.empty((max(need, 2 * len(self._bonds)), 3), dtype=np.int64)
+        new[:self.n_bonds] = self._bonds[:self.n_bonds]
+        self._bonds = new
+
+    def append_block(self, xyz, atom_type, mol=None):
+        """Append a block of atoms of one type and return their ids.
+
+        mol may be an array (one molecule id per atom), a scalar (shared by the
+        block), or None to give every atom its own new molecule id.
+        """
+        xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        n = len(xyz)
+        self._reserve_atoms(n)
+        lo, hi = self.n_atoms, self.n_atoms + n
+
+        self._ids[lo:hi] = np.arange(lo + 1, hi + 1)
+        self._type[lo:hi] = atom_type
+        self._xyz[lo:hi] = xyz
+        if mol is None:
+            self._mol[lo:hi] = np.arange(self.next_mol, self.next_mol + n)
+            self.next_mol += n
+        else:
+            self._mol[lo:hi] = mol
+            if n:
+                self.next_mol = max(self.next_mol, int(np.max(mol)) + 1)
+
+        self.n_atoms = hi
+        self._type_counts[atom_type] = self._type_counts.get(atom_type, 0) + n
+        return self._ids[lo:hi]
+
+    def append_bonds(self, atoms, bond_type=1):
+        """Append (n, 2) bonded atom id pairs of one bond type."""
+        atoms = np.asarray(atoms, dtype=np.int64).reshape(-1, 2)
+        n = len(atoms)
+        self._reserve_bonds(n)
+        self._bonds[self.n_bonds:self.n_bonds + n, 0] = bond_type
+        self._bonds[self.n_bonds:self.n_bonds + n, 1:] = atoms
+        self.n_bonds += n
+
+    def count(self, *atom_types):
+        """Number of atoms of the given type(s), or all atoms if none are given."""
+        if not atom_types:
+            return self.n_atoms
+        return sum(self._type_counts.get(t, 0) for t in atom_types)
+
+    def type_counts(self):
+        """Dict of atom type -> count."""
+        return dict(self._type_counts)
@@ -3,83 +3,55 @@ import numpy as np
 import matplotlib.pyplot as plt
 import sys
 import os
+import time
+
+from lammps_output_io import ThermoLog
+from output_cache import cached_columns_file, cached_thermo_log
+from run_directory import RunDirectory
+from run_chain import RunChain
+from plot_rendering import plot_series, save_figure, parse_formats, DEFAULT_FORMATS
 
 def read_volume_file(filepath):
     """Read single-column volume data."""
-    data = []
-    with open(filepath, 'r') as f:
-        for line in f:
-            if line.strip() and not line.startswith('#'):
-                try:
-                    data.append(float(line.split()[0]))
-                except (ValueError, IndexError):
-                    continue
-    return np.array(data)
+    table = cached_columns_file(filepath)
+    return table[:, 0] if table.size else np.array([])
 
 def read_timestep_volume_file(filepath):
     """Read two-column timestep + volume data."""
-    timesteps = []
-    volumes = []
-    with open(filepath, 'r') as f:
-        for line in f:
-            if line.strip() and not line.startswith('#'):
-                try:
-                    parts = line.split()
-                    timesteps.append(float(parts[0]))
-                    volumes.append(float(parts[1]))
-                except (ValueError, IndexError):
-                    continue
-    return np.array(timesteps), np.array(volumes)
+    table = cached_columns_file(filepath)
+    if table.size == 0 or table.shape[1] < 2:
+        return np.array([]), np.array([])
+    return table[:, 0], table[:, 1]
 
 def parse_lammps_log(filepath='log.lammps'):
-    """Parse LAMMPS log file and extract thermo data."""
+    """Parse LAMMPS log file and extract thermo data.
+
+    Columns of later 'Step' blocks replace those of earlier ones. Only the part
+    of the log appended since the last call is parsed (see output_cache.py).
+    """
     data = {}
-    reading_data = False
-    headers = []
-    
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-            
-            if line.startswith('Step'):
-                headers = line.split()
-                reading_data = True
-                for h in headers:
-                    data[h] = []
-                continue
-            
-            if reading_data and ('Loop time' in line or line.startswith('WARNING')):
-                reading_data = False
-                continue
-            
-            if reading_data and line and not line.startswith('#'):
-                try:
-                    values = line.split()
-                    if len(values) == len(headers):
-                        for h, v in zip(headers, values):
-                            data[h].append(float(v))
-                except ValueError:
-                    continue
-    
-    for key in data:
-        data[key] = np.array(data[key])
-    
+    for headers, values in cached_thermo_log(filepath):
+        for j, h in enumerate(headers):
+            data[h] = values[:, j]
     return data
 
-def plot_convergence(data, foldername, dataname, output='convergence.png'):
-    """Plot temperature, pressure, normalized box volume, and gel volumes."""
+def plot_convergence(data, foldername, dataname, output='convergence.png', run=None, formats=DEFAULT_FORMATS):
+    """Plot temperature, pressure, normalized box volume, and gel volumes.
+
+    run is the RunDirectory (default) or RunChain the volume series come from.
+    Series are decimated to the plot width (the last-30% statistics use every
+    point); formats picks the files written, e.g. ('png', 'pdf').
+    """
     
-    # Try to read volume files
-    box_vol_file = os.path.join(foldername, 'output_files/volume_data', 
-                                 f'box_dimensions_{dataname}.dat')
-    gel_bb_file = os.path.join(foldername, 'output_files/volume_data', 
-                                f'gel_volume_bb_{dataname}.dat')
-    gel_rg_file = os.path.join(foldername, 'output_files/volume_data', 
-                                f'gel_volume_rg_{dataname}.dat')
+    # Volume files of the run (parsed once per process, see run_directory.py)
+    run = run or RunDirectory(foldername, dataname)
+    box_volume = run.box_volume
+    gel_bb_vols = run.gel_volume_bb
+    gel_rg = run.gel_volume_rg
     
-    has_box = os.path.exists(box_vol_file)
-    has_gel_bb = os.path.exists(gel_bb_file)
-    has_gel_rg = os.path.exists(gel_rg_file)
+    has_box = run.has_volume_data('box_dimensions')
+    has_gel_bb = gel_bb_vols is not None
+    has_gel_rg = gel_rg is not None
     
     num_plots = 2  # temp + pressure always
     if has_box:
@@ -99,7 +71,7 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     
     # Temperature
     if 'Temp' in data:
-        axes[plot_idx].plot(data['Step'], data['Temp'], 'b-', linewidth=2.0)
+        plot_series(axes[plot_idx], data['Step'], data['Temp'], 'b-', linewidth=2.0)
         axes[plot_idx].set_ylabel('Temperature')
         axes[plot_idx].grid(alpha=0.3)
         n_last = int(len(data['Temp']) * 0.3)
@@ -113,7 +85,7 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     
     # Pressure
     if 'Press' in data:
-        axes[plot_idx].plot(data['Step'], data['Press'], 'g-', linewidth=2.0)
+        plot_series(axes[plot_idx], data['Step'], data['Press'], 'g-', linewidth=2.0)
         axes[plot_idx].set_ylabel('Pressure')
         axes[plot_idx].grid(alpha=0.3)
         n_last = int(len(data['Press']) * 0.3)
@@ -127,22 +99,12 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     
     # Box Volume (normalized)
     if has_box:
-        timesteps, box_dims = read_timestep_volume_file(box_vol_file)
-        # Compute volume from dimensions (assuming format: timestep Lx Ly Lz)
-        # Actually file has: timestep Lx Ly Lz
-        box_vols = []
-        with open(box_vol_file, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    parts = line.split()
-                    if len(parts) == 4:
-                        lx, ly, lz = float(parts[1]), float(parts[2]), float(parts[3])
-                        box_vols.append(lx * ly * lz)
-        box_vols = np.array(box_vols)
+        # File has: timestep Lx Ly Lz
+        timesteps, box_vols = map(np.asarray, box_volume) if box_volume is not None else (np.array([]), np.array([]))
         
         if len(box_vols) > 0:
             vol_normalized = box_vols / box_vols[0]
-            axes[plot_idx].plot(timesteps, vol_normalized, 'm-', linewidth=2.0)
+            plot_series(axes[plot_idx], timesteps, vol_normalized, 'm-', linewidth=2.0)
             axes[plot_idx].set_ylabel('Box Volume / Initial')
             axes[plot_idx].grid(alpha=0.3)
             
@@ -157,12 +119,14 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     
     # Gel Volume - Bounding Box (normalized)
     if has_gel_bb:
-        gel_bb_vols = read_volume_file(gel_bb_file)
         if len(gel_bb_vols) > 0:
+            gel_bb_vols = np.asarray(gel_bb_vols)
             gel_bb_normalized = gel_bb_vols / gel_bb_vols[0]
-            timesteps_gel = np.arange(len(gel_bb_vols))
+            # The file has no steps: borrow those of the Rg/box file (or the rebuilt chain axis)
+            timesteps_gel = run.gel_volume_bb_steps
+            timesteps_gel = np.arange(len(gel_bb_vols)) if timesteps_gel is None else np.asarray(timesteps_gel)
             
-            axes[plot_idx].plot(timesteps_gel, gel_bb_normalized, 'orange', linewidth=2.0)
+            plot_series(axes[plot_idx], timesteps_gel, gel_bb_normalized, 'orange', linewidth=2.0)
             axes[plot_idx].set_ylabel('Gel Volume (BB) / Initial')
             axes[plot_idx].grid(alpha=0.3)
             
@@ -177,11 +141,11 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     
     # Gel Volume - Radius of Gyration (normalized)
     if has_gel_rg:
-        timesteps_rg, gel_rg_vols = read_timestep_volume_file(gel_rg_file)
+        timesteps_rg, gel_rg_vols = map(np.asarray, gel_rg)
         if len(gel_rg_vols) > 0:
             gel_rg_normalized = gel_rg_vols / gel_rg_vols[0]
             
-            axes[plot_idx].plot(timesteps_rg, gel_rg_normalized, 'cyan', linewidth=2.0)
+            plot_series(axes[plot_idx], timesteps_rg, gel_rg_normalized, 'cyan', linewidth=2.0)
             axes[plot_idx].set_ylabel('Gel Volume (Rg³) / Initial')
             axes[plot_idx].grid(alpha=0.3)
             
@@ -197,27 +161,69 @@ def plot_convergence(data, foldername, dataname, output='convergence.png'):
     axes[-1].set_xlabel('Step')
     
     plt.tight_layout()
-    plt.savefig(output, dpi=150)
-    print(f"Plot saved to {output}")
+    paths = save_figure(fig, output, formats=formats)
+    plt.close(fig)
+    print(f"Plot saved to {', '.join(paths)}")
+
+def follow_log(foldername, dataname, output, interval=60.0, formats=DEFAULT_FORMATS):
+    """Re-plot convergence every interval seconds while the run is going (Ctrl-C to stop).
+
+    The log is parsed incrementally: each refresh only reads what LAMMPS wrote
+    since the previous one, and the plot is only redrawn when there are new rows.
+    """
+    log = ThermoLog(os.path.join(foldername, 'log.lammps'))
+    try:
+        while True:
+            n_new = log.update()
+            if n_new:
+                plot_convergence(log.columns(), foldername, dataname, output, formats=formats)
+                print(f"  +{n_new} thermo rows ({sum(s.n_rows for s in log.segments)} total, "
+                      f"{len(log.segments)} segments)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped following")
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python plot_lammps_log.py <folder> <dataname>")
+        print("Usage: python plot_lammps_log.py <folder> <dataname> [--follow [seconds] | --chain] [--formats png,pdf]")
         sys.exit(1)
     
     foldername = sys.argv[1]
     dataname = sys.argv[2]
     
-    filepath = os.path.join(foldername, 'log.lammps')
-    data = parse_lammps_log(filepath)
+    if '--follow' in sys.argv:
+        i = sys.argv.index('--follow')
+        interval = 60.0
+        # The interval is optional, so only a following number is taken as one
+        if len(sys.argv) > i + 1 and not sys.argv[i + 1].startswith('--'):
+            try:
+                interval = float(sys.argv[i + 1])
+            except ValueError:
+                pass
+        os.makedirs(os.path.join(foldername, 'output_plots/convergence_plots'), exist_ok=True)
+        output = os.path.join(foldername, 'output_plots/convergence_plots', f'{dataname}_convergence.png')
+        follow_log(foldername, dataname, output, interval, parse_formats(sys.argv))
+        sys.exit(0)
+    
+    if '--chain' in sys.argv:
+        # The run and every continuation of it in the sibling run directories
+        run = RunChain.of_run(foldername, dataname)
+        filepath = f"the logs of {len(run.segments)} segments"
+        data = {k: np.asarray(v) for k, v in run.thermo.items()}
+        name = f'{dataname}_chain'
+    else:
+        run = RunDirectory(foldername, dataname)
+        filepath = run.log_file
+        data = run.thermo
+        name = dataname
     
     if not data:
         print(f"No thermo data found in {filepath}")
         sys.exit(1)
     
-    output = os.path.join(foldername, 'output_plots/convergence_plots', f'{dataname}_convergence.png')
+    output = os.path.join(foldername, 'output_plots/convergence_plots', f'{name}_convergence.png')
     os.makedirs(os.path.join(foldername, 'output_plots/convergence_plots'), exist_ok=True)
     
-    plot_convergence(data, foldername, dataname, output)
+    plot_convergence(data, foldername, dataname, output, run, parse_formats(sys.argv))
 
 
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import Normalize
+from matplotlib.cm import ScalarMappable
+
+# Shared by plot_lammps_log.py and plot_stress_profiles.py; not run on its own.
+#
+# Long series are decimated to the pixel width of their axes before plotting
+# (min/max envelope by default, LTTB on request), profile families are drawn as
+# one LineCollection per axes coloured by timestep, independent figures can be
+# rendered in a process pool, and every figure can be saved as PNG and/or a
+# vector format (pdf, svg).
+
+DEFAULT_FORMATS = ('png',)
+
+def minmax_envelope(x, y, n_out):
+    """Indices of the min and max of y in n_out // 2 equal-count bins, plus both end points.
+
+    Drawn as a line, the points trace the same vertical extent in every pixel
+    column as the full series, so spikes survive decimation. NaNs are ignored.
+    """
+    n = len(y)
+    n_bins = max(n_out // 2, 1)
+    per = n // n_bins
+    if per < 2:
+        return np.arange(n)
+    main = y[:per * n_bins].reshape(n_bins, per)
+    offsets = np.arange(n_bins) * per
+    lo = np.where(np.isnan(main), np.inf, main).argmin(axis=1) + offsets
+    hi = np.where(np.isnan(main), -np.inf, main).argmax(axis=1) + offsets
+    tail = np.arange(per * n_bins, n)
+    if len(tail):
+        rest = y[tail]
+        if not np.all(np.isnan(rest)):
+            tail = tail[[np.nanargmin(rest), np.nanargmax(rest)]]
+    return np.unique(np.concatenate([[0], lo, hi, tail, [n - 1]]))
+
+def lttb(x, y, n_out):
+    """Indices of the Largest-Triangle-Three-Buckets downsample of (x, y) to n_out points.
+
+    Keeps the visual shape of a smooth series with fewer points than the
+    min/max envelope, at the cost of single-sample spikes.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)  # The last point is the bucket after the final one
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = x[hi:edges[i + 2]].mean(), np.nanmean(y[hi:edges[i + 2]])
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + (int(np.nanargmax(area)) if not np.all(np.isnan(area)) else 0)
+        keep[i + 1] = a
+    return keep
+
+def decimate(x, y, n_out, method='minmax'):
+    """(x, y) reduced to about n_out points with minmax_envelope or lttb; short series are returned as is."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(y) <= n_out:
+        return x, y
+    idx = lttb(x, y, n_out) if method == 'lttb' else minmax_envelope(x, y, n_out)
+    return x[idx], y[idx]
+
+def screen_points(ax):
+    """Pixel width of an axes at the figure's dpi."""
+    return max(int(ax.get_window_extent().width), 1)
+
+def plot_series(ax, x, y, *args, method='minmax', **kwargs):
+    """ax.plot of (x, y) decimated to the axes' pixel width (two points per column for minmax)."""
+    width = screen_points(ax)
+    return ax.plot(*decimate(x, y, 2 * width if method == 'minmax' else width, method), *args, **kwargs)
+
+def profile_collection(ax, coords, frames, timesteps, norm, cmap='viridis', **kwargs):
+    """Add every frame of a profile family to ax as one LineCollection coloured by timestep."""
+    frames = np.asarray(frames, dtype=float)
+    segments = np.stack([np.broadcast_to(coords, frames.shape), frames], axis=-1)
+    lines = LineCollection(segments, cmap=cmap, norm=norm, **kwargs)
+    lines.set_array(np.asarray(timesteps, dtype=float))
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    return lines
+
+def timestep_colorbar(fig, norm, cmap='viridis', label='Timestep'):
+    """A colorbar for the timestep colours in a strip at the right of the figure (call after tight_layout(rect=[0, 0, 0.93, 1]))."""
+    cax = fig.add_axes([0.945, 0.1, 0.012, 0.8])
+    return fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), cax=cax, label=label)
+
+def timestep_norm(*timesteps):
+    """Normalize over the range of all given timestep arrays."""
+    values = [np.asarray(t, dtype=float) for t in timesteps if t is not None and len(t)]
+    if not values:
+        return Normalize(0, 1)
+    lo, hi = min(v.min() for v in values), max(v.max() for v in values)
+    return Normalize(lo, hi if hi > lo else lo + 1)
+
+def save_figure(fig, output, dpi=150, formats=DEFAULT_FORMATS):
+    """Save fig as output with its extension replaced by each format; returns the paths."""
+    root = os.path.splitext(output)[0]
+    paths = []
+    for fmt in formats:
+        path = f'{root}.{fmt}'
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
+
+def parse_formats(argv):
+    """The --formats png,pdf option of a command line (default png only).
+
+    Prints usage and exits when --formats is not followed by a value.
+    """
+    if '--formats' in argv:
+        i = argv.index('--formats')
+        if i + 1 >= len(argv) or argv[i + 1].startswith('--'):
+            print("Usage: --formats takes a comma-separated list of formats, e.g. --formats png,pdf")
+            sys.exit(1)
+        return tuple(argv[i + 1].split(','))
+    return DEFAULT_FORMATS
+
+def _render(job):
+    func, args, kwargs = job
+    return func(*args, **kwargs)
+
+def render_parallel(jobs, workers=None):
+    """Run independent figure jobs (func, args, kwargs) in a process pool; returns their results.
+
+    Each job must build, save and close its own figure. With one job or
+    workers=1 they run in this process.
+    """
+    if len(jobs) < 2 or workers == 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(jobs))) as pool:
+        return list(pool.map(_render, jobs))
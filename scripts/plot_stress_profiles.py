@@ -3,376 +3,153 @@ import numpy as np
 import matplotlib.pyplot as plt
 import sys
 import os
-import re
 
-def read_ave_time_file(filepath):
-    """Read LAMMPS ave/time output file with format: timestep nrows, then row pressure."""
-    data_by_time = []
-    
-    with open(filepath, 'r') as f:
-        lines = [line for line in f if not line.startswith('#') and line.strip()]
-        
-        i = 0
-        while i < len(lines):
-            parts = lines[i].split()
-            if len(parts) == 2:  # Timestep line
-                timestep = int(parts[0])
-                nrows = int(parts[1])
-                pressures = []
-                
-                for j in range(1, nrows + 1):
-                    if i + j < len(lines):
-                        p_parts = lines[i + j].split()
-                        if len(p_parts) == 2:
-                            pressures.append(float(p_parts[1]))
-                
-                if pressures:
-                    rows = np.arange(1, len(pressures) + 1)
-                    data_by_time.append((timestep, rows, np.array(pressures)))
-                
-                i += nrows + 1
-            else:
-                i += 1
-    
-    return data_by_time
+from run_directory import RunDirectory
+from run_chain import RunChain
+from plot_rendering import (profile_collection, timestep_norm, timestep_colorbar, save_figure,
+                            parse_formats, render_parallel, DEFAULT_FORMATS)
 
 def get_box_dims(folder, dataname):
-    """Extract box dimensions from data file in the working directory."""
-    # Extract base dataname without interaction and timesteps
-    # Format: slab_support_5beads_10x10x5_rho6_extra_padding43_1.5_1.4_40000
-    # Need to strip: _1.5_1.4_40000
-    parts = dataname.split('_')
-    
-    # Find where interaction starts (format: number.number)
-    base_parts = []
-    for part in parts:
-        if re.match(r'\d+\.\d+', part):  # Found interaction parameter
-            break
-        base_parts.append(part)
-    
-    base_name = '_'.join(base_parts)
-    
-    # Try multiple possible locations for the data file
-    possible_paths = [
-        os.path.join(folder, 'data_files', f'{base_name}.data'),  # Original input file (symlink)
-        os.path.join(folder, f'final_config_{dataname}.data'),    # Final output from LAMMPS
-        os.path.join(folder, 'data_files', f'{dataname}.data'),   # Full name fallback
-    ]
-    
-    data_file = None
-    for path in possible_paths:
-        if os.path.exists(path):
-            data_file = path
-            print(f"Found data file: {path}")
-            break
-    
-    if not data_file:
-        # Fallback: extract from dataname (assumes format includes dimensions)
-        print(f"Warning: Could not find data file (tried {base_name}.data and {dataname}.data), using default box dimensions")
-        return {'x': 100.0, 'y': 100.0, 'z': 50.0}
-    
-    box_dims = {}
-    with open(data_file, 'r') as f:
-        for line in f:
-            if 'xlo xhi' in line:
-                vals = line.split()
-                box_dims['x'] = float(vals[1]) - float(vals[0])
-            elif 'ylo yhi' in line:
-                vals = line.split()
-                box_dims['y'] = float(vals[1]) - float(vals[0])
-            elif 'zlo zhi' in line:
-                vals = line.split()
-                box_dims['z'] = float(vals[1]) - float(vals[0])
-                break
-    return box_dims
+    """Extract box dimensions from data file in the working directory (see RunDirectory.box)."""
+    return RunDirectory(folder, dataname).box
 
 def check_stress_data_exists(folder, dataname):
     """Check if any stress data files exist."""
-    data_dir = os.path.join(folder, 'output_files', 'stress_data')
-    dims = ['x', 'y', 'z']
-    
-    for dim in dims:
-        poly_file = os.path.join(data_dir, f'stress_{dim}_polymer_{dataname}.dat')
-        solv_file = os.path.join(data_dir, f'stress_{dim}_solvent_{dataname}.dat')
-        if os.path.exists(poly_file) or os.path.exists(solv_file):
-            return True
-    return False
+    return RunDirectory(folder, dataname).has_profiles('stress')
 
 def check_volume_data_exists(folder, dataname):
     """Check if any volume data files exist."""
-    data_dir = os.path.join(folder, 'output_files', 'volume_data')
-    dims = ['x', 'y', 'z']
-    
-    for dim in dims:
-        poly_file = os.path.join(data_dir, f'vol_{dim}_polymer_{dataname}.dat')
-        solv_file = os.path.join(data_dir, f'vol_{dim}_solvent_{dataname}.dat')
-        if os.path.exists(poly_file) or os.path.exists(solv_file):
-            return True
-    return False
+    return RunDirectory(folder, dataname).has_profiles('volume')
+
+def _plot_profile_grid(axes, dataset, labels, total_label, plot_every=10):
+    """Draw polymer (left), solvent (middle) and total (right) profiles of every axis.
+
+    Every len // plot_every-th frame is drawn, all frames of a panel as one
+    LineCollection coloured by timestep; the curves come straight from the
+    precomputed dataset (see profiles.py). Returns the timestep Normalize for
+    the colorbar.
+    """
+    norm = timestep_norm(*(dataset[dim]['timesteps'] for dim in 'xyz'))
+    ylims = {name: [float('inf'), float('-inf')] for name in ('polymer', 'solvent', 'total')}
+
+    for row, (label, dim) in enumerate(zip(['X', 'Y', 'Z'], ['x', 'y', 'z'])):
+        profile = dataset[dim]
+
+        for col, name in enumerate(('polymer', 'solvent', 'total')):
+            values = profile[name]
+            if values is not None:
+                plot_interval = max(1, len(values) // plot_every)
+                frames = values[::plot_interval]
+                coords = profile['grid'] if name == 'total' else profile['coords'][name]
+                ylims[name][0] = min(ylims[name][0], np.nanmin(frames))
+                ylims[name][1] = max(ylims[name][1], np.nanmax(frames))
 
-def plot_stress_profiles(folder, dataname, oldsteps):
-    """Plot pressure profiles for polymer (left), solvent (middle), and total (right)."""
-    box_dims = get_box_dims(folder, dataname)
+                timesteps = profile['timesteps']
+                if len(timesteps) < len(values):
+                    timesteps = np.arange(len(values))  # Solvent file without a matching polymer one
+                profile_collection(axes[row, col], coords, frames, timesteps[:len(values)][::plot_interval],
+                                   norm, linewidth=1.5, alpha=0.7)
+
+            axes[row, col].set_ylabel(f'{total_label if name == "total" else labels} ({label})')
+            axes[row, col].set_xlabel(f'{label}/L{label}')
+            if col > 0:
+                axes[row, col].set_xlim(0, 1)
+            axes[row, col].grid(alpha=0.3)
+            if row == 0:
+                axes[row, col].set_title(name.capitalize(), fontweight='bold')
+
+    for col, name in enumerate(('polymer', 'solvent', 'total')):
+        if ylims[name][0] != float('inf'):
+            for row in range(3):
+                axes[row, col].set_ylim(ylims[name])
+    return norm
+
+def _chain_title(run):
+    segments = run.segments
+    return f"{len(segments)} segments, steps {segments[0]['oldsteps']}-{segments[-1]['totsteps']}"
+
+def plot_stress_profiles(folder, dataname, oldsteps, run=None, formats=DEFAULT_FORMATS):
+    """Plot pressure profiles for polymer (left), solvent (middle), and total (right).
+
+    run is the RunDirectory (default) or RunChain to plot; formats picks the
+    files written, e.g. ('png', 'svg').
+    """
+    run = run or RunDirectory(folder, dataname)
+    dataset = run.profiles('stress')
+    name = f'{dataname}_chain' if isinstance(run, RunChain) else dataname
     
     fig, axes = plt.subplots(3, 3, figsize=(18, 10))
-    if oldsteps > 0:
+    if isinstance(run, RunChain):
+        fig.suptitle(f'{dataname} ({_chain_title(run)})', fontsize=14, fontweight='bold')
+    elif oldsteps > 0:
         fig.suptitle(f'{dataname} (continuing from {oldsteps} steps)', fontsize=14, fontweight='bold')
     else:
         fig.suptitle(f'{dataname} (fresh run)', fontsize=14, fontweight='bold')
     
-    labels = ['X', 'Y', 'Z']
-    dims = ['x', 'y', 'z']
-    colors = plt.cm.viridis(np.linspace(0, 1, 10))
-    binWidth = 2
-    
-    data_dir = os.path.join(folder, 'output_files', 'stress_data')
-    
-    polymer_ylims = [float('inf'), float('-inf')]
-    solvent_ylims = [float('inf'), float('-inf')]
-    total_ylims = [float('inf'), float('-inf')]
+    norm = _plot_profile_grid(axes, dataset, 'Partial stress', 'Total stress')
     
-    for row, (label, dim) in enumerate(zip(labels, dims)):
-        poly_file = os.path.join(data_dir, f'stress_{dim}_polymer_{dataname}.dat')
-        solv_file = os.path.join(data_dir, f'stress_{dim}_solvent_{dataname}.dat')
-        
-        poly_data = read_ave_time_file(poly_file) if os.path.exists(poly_file) else []
-        solv_data = read_ave_time_file(solv_file) if os.path.exists(solv_file) else []
-        
-        if poly_data:
-            plot_interval = max(1, len(poly_data) // 10)
-            
-            for i, (t, rows, P) in enumerate(poly_data):
-                if i % plot_interval != 0:
-                    continue
-                coords_norm = (rows * binWidth - binWidth/2) / box_dims[dim]
-                polymer_ylims[0] = min(polymer_ylims[0], P.min())
-                polymer_ylims[1] = max(polymer_ylims[1], P.max())
-                
-                axes[row, 0].plot(coords_norm, P, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)],
-                                 label=f't={t}' if row == 0 else None)
-        
-        axes[row, 0].set_ylabel(f'Partial stress ({label})')
-        axes[row, 0].set_xlabel(f'{label}/L{label}')
-        axes[row, 0].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 0].legend(loc='best', fontsize=7, ncol=2)
-            axes[row, 0].set_title('Polymer', fontweight='bold')
-        
-        if solv_data:
-            plot_interval = max(1, len(solv_data) // 10)
-            
-            for i, (t, rows, P) in enumerate(solv_data):
-                if i % plot_interval != 0:
-                    continue
-                coords_norm = (rows * binWidth - binWidth/2) / box_dims[dim]
-                solvent_ylims[0] = min(solvent_ylims[0], P.min())
-                solvent_ylims[1] = max(solvent_ylims[1], P.max())
-                
-                axes[row, 1].plot(coords_norm, P, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)])
-        
-        axes[row, 1].set_ylabel(f'Partial stress ({label})')
-        axes[row, 1].set_xlabel(f'{label}/L{label}')
-        axes[row, 1].set_xlim(0, 1)
-        axes[row, 1].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 1].set_title('Solvent', fontweight='bold')
-        
-        # Total stress (interpolate and sum)
-        if poly_data and solv_data:
-            plot_interval = max(1, len(poly_data) // 10)
-            
-            for i, ((t_p, rows_p, P_p), (t_s, rows_s, P_s)) in enumerate(zip(poly_data, solv_data)):
-                if i % plot_interval != 0:
-                    continue
-                
-                coords_p = (rows_p * binWidth - binWidth/2) / box_dims[dim]
-                coords_s = (rows_s * binWidth - binWidth/2) / box_dims[dim]
-                
-                # Create common grid
-                coords_common = np.linspace(0, 1, 200)
-                P_p_interp = np.interp(coords_common, coords_p, P_p, left=0, right=0)
-                P_s_interp = np.interp(coords_common, coords_s, P_s, left=0, right=0)
-                P_total = P_p_interp + P_s_interp
-                
-                total_ylims[0] = min(total_ylims[0], P_total.min())
-                total_ylims[1] = max(total_ylims[1], P_total.max())
-                
-                axes[row, 2].plot(coords_common, P_total, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)])
-        
-        axes[row, 2].set_ylabel(f'Total stress ({label})')
-        axes[row, 2].set_xlabel(f'{label}/L{label}')
-        axes[row, 2].set_xlim(0, 1)
-        axes[row, 2].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 2].set_title('Total', fontweight='bold')
-    
-    if polymer_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 0].set_ylim(polymer_ylims)
-    if solvent_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 1].set_ylim(solvent_ylims)
-    if total_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 2].set_ylim(total_ylims)
-    
-    plt.tight_layout()
+    plt.tight_layout(rect=[0, 0, 0.93, 1])
+    timestep_colorbar(fig, norm)
     output_dir = os.path.join(folder, 'output_plots')
     os.makedirs(output_dir, exist_ok=True)
-    plt.savefig(os.path.join(output_dir, f'{dataname}_stress.png'), dpi=150)
-    print(f"Stress profile saved to {os.path.join(output_dir, f'{dataname}_stress.png')}")
+    paths = save_figure(fig, os.path.join(output_dir, f'{name}_stress.png'), formats=formats)
+    print(f"Stress profile saved to {', '.join(paths)}")
     plt.close()
 
-def plot_volume_fraction_profiles(folder, dataname, oldsteps):
+def plot_volume_fraction_profiles(folder, dataname, oldsteps, run=None, formats=DEFAULT_FORMATS):
     """Plot volume fraction profiles for polymer (left), solvent (middle), and total (right)."""
-    box_dims = get_box_dims(folder, dataname)
+    run = run or RunDirectory(folder, dataname)
+    dataset = run.profiles('volume')
+    name = f'{dataname}_chain' if isinstance(run, RunChain) else dataname
     
     fig, axes = plt.subplots(3, 3, figsize=(18, 10))
-    if oldsteps > 0:
+    if isinstance(run, RunChain):
+        fig.suptitle(f'{dataname} Volume Fractions ({_chain_title(run)})', fontsize=14, fontweight='bold')
+    elif oldsteps > 0:
         fig.suptitle(f'{dataname} Volume Fractions (continuing from {oldsteps} steps)', fontsize=14, fontweight='bold')
     else:
         fig.suptitle(f'{dataname} Volume Fractions (fresh run)', fontsize=14, fontweight='bold')
     
-    labels = ['X', 'Y', 'Z']
-    dims = ['x', 'y', 'z']
-    colors = plt.cm.viridis(np.linspace(0, 1, 10))
-    binWidth = 0.5
-    
-    data_dir = os.path.join(folder, 'output_files', 'volume_data')
-    
-    polymer_ylims = [float('inf'), float('-inf')]
-    solvent_ylims = [float('inf'), float('-inf')]
-    total_ylims = [float('inf'), float('-inf')]
-    
-    for row, (label, dim) in enumerate(zip(labels, dims)):
-        # Calculate bin volume for this direction
-        if dim == 'x':
-            bin_volume = binWidth * box_dims['y'] * box_dims['z']
-        elif dim == 'y':
-            bin_volume = box_dims['x'] * binWidth * box_dims['z']
-        else:  # z
-            bin_volume = box_dims['x'] * box_dims['y'] * binWidth
-        
-        poly_file = os.path.join(data_dir, f'vol_{dim}_polymer_{dataname}.dat')
-        solv_file = os.path.join(data_dir, f'vol_{dim}_solvent_{dataname}.dat')
-        
-        poly_data = read_ave_time_file(poly_file) if os.path.exists(poly_file) else []
-        solv_data = read_ave_time_file(solv_file) if os.path.exists(solv_file) else []
-        
-        if poly_data:
-            plot_interval = max(1, len(poly_data) // 10)
-            
-            for i, (t, rows, V) in enumerate(poly_data):
-                if i % plot_interval != 0:
-                    continue
-                coords_norm = (rows * binWidth - binWidth/2) / box_dims[dim]
-                phi = V / bin_volume
-                polymer_ylims[0] = min(polymer_ylims[0], phi.min())
-                polymer_ylims[1] = max(polymer_ylims[1], phi.max())
-                
-                axes[row, 0].plot(coords_norm, phi, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)],
-                                 label=f't={t}' if row == 0 else None)
-        
-        axes[row, 0].set_ylabel(f'Volume fraction ({label})')
-        axes[row, 0].set_xlabel(f'{label}/L{label}')
-        axes[row, 0].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 0].legend(loc='best', fontsize=7, ncol=2)
-            axes[row, 0].set_title('Polymer', fontweight='bold')
-        
-        if solv_data:
-            plot_interval = max(1, len(solv_data) // 10)
-            
-            for i, (t, rows, V) in enumerate(solv_data):
-                if i % plot_interval != 0:
-                    continue
-                coords_norm = (rows * binWidth - binWidth/2) / box_dims[dim]
-                phi = V / bin_volume
-                solvent_ylims[0] = min(solvent_ylims[0], phi.min())
-                solvent_ylims[1] = max(solvent_ylims[1], phi.max())
-                
-                axes[row, 1].plot(coords_norm, phi, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)])
-        
-        axes[row, 1].set_ylabel(f'Volume fraction ({label})')
-        axes[row, 1].set_xlabel(f'{label}/L{label}')
-        axes[row, 1].set_xlim(0, 1)
-        axes[row, 1].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 1].set_title('Solvent', fontweight='bold')
-        
-        # Total volume fraction (interpolate and sum)
-        if poly_data and solv_data:
-            plot_interval = max(1, len(poly_data) // 10)
-            
-            for i, ((t_p, rows_p, V_p), (t_s, rows_s, V_s)) in enumerate(zip(poly_data, solv_data)):
-                if i % plot_interval != 0:
-                    continue
-                
-                coords_p = (rows_p * binWidth - binWidth/2) / box_dims[dim]
-                coords_s = (rows_s * binWidth - binWidth/2) / box_dims[dim]
-                phi_p = V_p / bin_volume
-                phi_s = V_s / bin_volume
-                
-                # Create common grid
-                coords_common = np.linspace(0, 1, 200)
-                phi_p_interp = np.interp(coords_common, coords_p, phi_p, left=0, right=0)
-                phi_s_interp = np.interp(coords_common, coords_s, phi_s, left=0, right=0)
-                phi_total = phi_p_interp + phi_s_interp
-                
-                total_ylims[0] = min(total_ylims[0], phi_total.min())
-                total_ylims[1] = max(total_ylims[1], phi_total.max())
-                
-                axes[row, 2].plot(coords_common, phi_total, linewidth=1.5, alpha=0.7,
-                                 color=colors[(i // plot_interval) % len(colors)])
-        
-        axes[row, 2].set_ylabel(f'Total volume fraction ({label})')
-        axes[row, 2].set_xlabel(f'{label}/L{label}')
-        axes[row, 2].set_xlim(0, 1)
-        axes[row, 2].grid(alpha=0.3)
-        if row == 0:
-            axes[row, 2].set_title('Total', fontweight='bold')
-    
-    if polymer_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 0].set_ylim(polymer_ylims)
-    if solvent_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 1].set_ylim(solvent_ylims)
-    if total_ylims[0] != float('inf'):
-        for row in range(3):
-            axes[row, 2].set_ylim(total_ylims)
+    norm = _plot_profile_grid(axes, dataset, 'Volume fraction', 'Total volume fraction')
     
-    plt.tight_layout()
+    plt.tight_layout(rect=[0, 0, 0.93, 1])
+    timestep_colorbar(fig, norm)
     output_dir = os.path.join(folder, 'output_plots')
     os.makedirs(output_dir, exist_ok=True)
-    plt.savefig(os.path.join(output_dir, f'{dataname}_volume.png'), dpi=150)
-    print(f"Volume fraction profile saved to {os.path.join(output_dir, f'{dataname}_volume.png')}")
+    paths = save_figure(fig, os.path.join(output_dir, f'{name}_volume.png'), formats=formats)
+    print(f"Volume fraction profile saved to {', '.join(paths)}")
     plt.close()
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python plot_stress_profiles.py <folder> <dataname> <oldsteps>")
+        print("Usage: python plot_stress_profiles.py <folder> <dataname> <oldsteps> [--chain] [--formats png,svg]")
         sys.exit(1)
     
-    folder = sys.argv[1]
-    dataname = sys.argv[2]
-    oldsteps = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    formats = parse_formats(sys.argv)
+    args = sys.argv[1:]
+    if '--formats' in args:
+        i = args.index('--formats')
+        del args[i:i + 2]
+    args = [a for a in args if a != '--chain']
+    folder = args[0]
+    dataname = args[1]
+    oldsteps = int(args[2]) if len(args) > 2 else 0
+    # --chain: the run and every continuation of it in the sibling run directories
+    run = RunChain.of_run(folder, dataname) if '--chain' in sys.argv else RunDirectory(folder, dataname)
     
     # Check if data exists before creating plots
-    stress_exists = check_stress_data_exists(folder, dataname)
-    volume_exists = check_volume_data_exists(folder, dataname)
+    stress_exists = run.has_profiles('stress')
+    volume_exists = run.has_profiles('volume')
     
+    # The two figures are independent: render them side by side
+    jobs = []
     if stress_exists:
-        plot_stress_profiles(folder, dataname, oldsteps)
+        jobs.append((plot_stress_profiles, (folder, dataname, oldsteps, run, formats), {}))
     else:
         print(f"No stress data found for {dataname}, skipping stress plots")
     
     if volume_exists:
-        plot_volume_fraction_profiles(folder, dataname, oldsteps)
+        jobs.append((plot_volume_fraction_profiles, (folder, dataname, oldsteps, run, formats), {}))
     else:
         print(f"No volume data found for {dataname}, skipping volume fraction plots")
+    render_parallel(jobs)
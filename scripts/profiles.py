@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import os
+import warnings
+import numpy as np
+
+from output_cache import cached_ave_time_file
+from compressed_io import find_file
+
+# Output folder, file prefix, chunk bin width and normalization of each profile kind
+PROFILE_KINDS = {
+    'stress': {'subdir': 'stress_data', 'prefix': 'stress', 'bin_width': 2.0, 'per_volume': False},
+    'volume': {'subdir': 'volume_data', 'prefix': 'vol', 'bin_width': 0.5, 'per_volume': True},
+}
+COMPONENTS = ('polymer', 'solvent')
+
+def bin_coords(n_bins, bin_width, box_length):
+    """Bin centers along one axis, normalized by the box length."""
+    rows = np.arange(1, n_bins + 1)
+    return (rows * bin_width - bin_width / 2) / box_length
+
+def bin_volume(box_dims, dim, bin_width):
+    """Volume of one bin slab perpendicular to dim."""
+    other = [box_dims[d] for d in 'xyz' if d != dim]
+    return bin_width * other[0] * other[1]
+
+def interp_profiles(x, values, grid):
+    """np.interp(grid, x, row, left=0, right=0) for every row of values in one pass."""
+    values = np.nan_to_num(values)  # Ragged blocks are NaN-padded; treat missing bins as empty
+    if len(x) < 2:
+        out = [np.interp(grid, x, row, left=0, right=0) for row in values]
+        return np.array(out).reshape(len(values), len(grid))
+
+    idx = np.clip(np.searchsorted(x, grid, side='right') - 1, 0, len(x) - 2)
+    w = (grid - x[idx]) / (x[idx + 1] - x[idx])
+    out = values[:, idx] * (1 - w) + values[:, idx + 1] * w
+    out[:, (grid < x[0]) | (grid > x[-1])] = 0
+    return out
+
+def time_stats(values, n_blocks=5):
+    """Mean, std and block averages over time (axis 0) of an (n_timesteps, n_bins) array.
+
+    Blocks are contiguous runs of n_timesteps // n_blocks frames; leftover
+    frames at the start are dropped so every block has the same length.
+    """
+    n = len(values)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN bins of ragged files
+        return _time_stats(values, n, n_blocks)
+
+def _time_stats(values, n, n_blocks):
+    stats = {'mean': np.nanmean(values, axis=0) if n else np.empty(values.shape[1:]),
+             'std': np.nanstd(values, axis=0) if n else np.empty(values.shape[1:]),
+             'blocks': np.empty((0,) + values.shape[1:])}
+    block_len = n // n_blocks
+    if block_len:
+        trimmed = values[n - block_len * n_blocks:]
+        stats['blocks'] = np.nanmean(trimmed.reshape(n_blocks, block_len, -1), axis=1)
+    return stats
+
+def compute_profiles(polymer, solvent, box_dims, dim, bin_width, per_volume=False,
+                     n_grid=200, n_blocks=5):
+    """Normalize, interpolate and sum polymer/solvent profiles for every frame at once.
+
+    polymer and solvent are (n_timesteps, n_bins) arrays or None. With
+    per_volume the values are divided by the bin volume (volume fractions).
+    The total is polymer + solvent on a common n_grid-point grid over [0, 1],
+    using the frames both files have.
+    """
+    scale = 1.0 / bin_volume(box_dims, dim, bin_width) if per_volume else 1.0
+    profile = {'grid': np.linspace(0, 1, n_grid), 'coords': {}, 'stats': {}}
+
+    for name, values in zip(COMPONENTS, (polymer, solvent)):
+        if values is None or len(values) == 0:
+            profile[name] = None
+            continue
+        profile[name] = np.asarray(values) * scale
+        profile['coords'][name] = bin_coords(profile[name].shape[1], bin_width, box_dims[dim])
+        profile['stats'][name] = time_stats(profile[name], n_blocks)
+
+    profile['total'] = None
+    if profile['polymer'] is not None and profile['solvent'] is not None:
+        n = min(len(profile['polymer']), len(profile['solvent']))
+        profile['total'] = sum(interp_profiles(profile['coords'][name], profile[name][:n], profile['grid'])
+                               for name in COMPONENTS)
+        profile['stats']['total'] = time_stats(profile['total'], n_blocks)
+    return profile
+
+def load_profiles(folder, dataname, kind, box_dims, n_grid=200, n_blocks=5):
+    """Read the x/y/z polymer and solvent ave/time files of a run and compute their profiles.
+
+    Returns {dim: profile} (see compute_profiles), with the frame timesteps
+    (of the polymer file when present) under 'timesteps'.
+    """
+    spec = PROFILE_KINDS[kind]
+    data_dir = os.path.join(folder, 'output_files', spec['subdir'])
+
+    dataset = {}
+    for dim in 'xyz':
+        timesteps = np.empty(0, dtype=np.int64)
+        arrays = {}
+        for name in COMPONENTS:
+            path = find_file(os.path.join(data_dir, f"{spec['prefix']}_{dim}_{name}_{dataname}.dat"))
+            arrays[name] = None
+            if os.path.exists(path):
+                t, arrays[name] = cached_ave_time_file(path)
+                if len(timesteps) == 0:
+                    timesteps = t
+        dataset[dim] = compute_profiles(arrays['polymer'], arrays['solvent'], box_dims, dim,
+                                        spec['bin_width'], spec['per_volume'], n_grid, n_blocks)
+        dataset[dim]['timesteps'] = timesteps
+    return dataset
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+import glob
+import numpy as np
+
+from run_directory import RunDirectory, memoized
+from output_cache import cached_ave_time_file
+from profiles import PROFILE_KINDS, COMPONENTS, compute_profiles
+
+# HOW TO RUN
+# python run_chain.py <dataname> [runs_dir]
+# e.g. python run_chain.py slab_support_5beads_10x10x5_rho6_extra_padding43_1.5_1.4_8000000
+# Lists the segments (fresh run and continuations) of the run's chain and the steps each covers.
+#
+# From Python:
+#   from run_chain import RunChain
+#   chain = RunChain('slab_support_5beads_10x10x5_rho6_extra_padding43_1.5_1.4')
+#   chain.thermo['Temp'], chain.box_volume, chain.gel_volume_bb_steps, chain.profiles('stress')
+#
+# Every continuation writes its outputs with ${totsteps} in their names, usually in
+# a new timestamped run directory. RunChain finds all segments of a dataname and
+# interaction under runs_dir (~/Documents/lammps_runs), orders them by
+# oldsteps -> totsteps and stitches their series into SegmentedArrays, which keep
+# the per-segment arrays (memory-mapped from .npcache) and only copy rows when indexed.
+
+# Outputs named <prefix>_<dataname>_<interaction>_<totsteps>.dat (see slab_with_support.lmp)
+OUTPUT_PREFIXES = ('gel_volume_bb', 'gel_volume_rg', 'gel_dimensions', 'box_dimensions',
+                   r'(?:stress|vol)_[xyz]_(?:polymer|solvent)')
+TIMESTAMP_RE = re.compile(r'_(\d{8}_\d{6})$')
+
+def get_runs_dir():
+    return os.path.join(os.path.expanduser('~'), 'Documents', 'lammps_runs')
+
+class SegmentedArray:
+    """Read-only concatenation of arrays along the first axis that copies nothing until indexed.
+
+    The pieces are kept as they are. An int, a slice or an index array (plus
+    indices for the other axes, e.g. view[:, 3]) gathers only the rows asked
+    for; a slice gives another SegmentedArray. np.asarray() builds the whole
+    array, and chunks(), map() and the sum/mean/std/min/max reductions over
+    the first axis work piece by piece.
+    """
+
+    def __init__(self, pieces, dtype=float, tail=()):
+        self.pieces = [p for p in pieces if len(p)]
+        self.offsets = np.cumsum([0] + [len(p) for p in self.pieces])
+        self.dtype = np.result_type(*self.pieces) if self.pieces else np.dtype(dtype)
+        # tail: the shape beyond the first axis when there are no pieces
+        self.shape = (int(self.offsets[-1]),) + (self.pieces[0].shape[1:] if self.pieces else tuple(tail))
+        if any(p.shape[1:] != self.shape[1:] for p in self.pieces):
+            raise ValueError("All pieces must have the same shape beyond the first axis")
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __repr__(self):
+        return f'SegmentedArray(shape={self.shape}, dtype={self.dtype}, pieces={len(self.pieces)})'
+
+    def __array__(self, dtype=None, copy=None):
+        if not self.pieces:
+            out = np.empty(self.shape, self.dtype)
+        elif len(self.pieces) == 1:
+            out = np.asarray(self.pieces[0])
+        else:
+            out = np.concatenate(self.pieces)
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __getitem__(self, index):
+        rest = ()
+        if isinstance(index, tuple):
+            index, rest = index[0], index[1:]
+        n = len(self)
+
+        if isinstance(index, (int, np.integer)):
+            i = index + n if index < 0 else index
+            if not 0 <= i < n:
+                raise IndexError(f"index {index} is out of bounds for length {n}")
+            k = np.searchsorted(self.offsets, i, side='right') - 1
+            return self.pieces[k][(i - self.offsets[k],) + rest]
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(n)
+            if step < 0:
+                return np.asarray(self)[(index,) + rest]
+            parts = []
+            tail = np.empty((0,) + self.shape[1:])[(slice(None),) + rest].shape[1:]
+            for piece, lo, hi in zip(self.pieces, self.offsets[:-1], self.offsets[1:]):
+                first = max(start, lo)
+                first += -(first - start) % step  # Next row on the stride
+                last = min(stop, hi)
+                if first < last:
+                    parts.append(piece[(slice(first - lo, last - lo, step),) + rest])
+            return SegmentedArray(parts, self.dtype, tail)
+
+        idx = np.asarray(index)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        idx = np.where(idx < 0, idx + n, idx)
+        if idx.size and (idx.min() < 0 or idx.max() >= n):
+            raise IndexError(f"index out of bounds for length {n}")
+        if idx.size == 0:
+            return np.empty((0,) + self.shape[1:], self.dtype)[(slice(None),) + rest]
+        which = np.searchsorted(self.offsets, idx, side='right') - 1
+        order = np.argsort(which, kind='stable')
+        gathered = np.concatenate([self.pieces[k][(idx[order][which[order] == k] - self.offsets[k],) + rest]
+                                   for k in np.unique(which)])
+        out = np.empty_like(gathered)
+        out[order] = gathered
+        return out
+
+    def chunks(self):
+        """The pieces, in order."""
+        return iter(self.pieces)
+
+    def map(self, func):
+        """SegmentedArray of func applied to every piece (func must keep the rows)."""
+        return SegmentedArray([func(p) for p in self.pieces], self.dtype, self.shape[1:])
+
+    def sum(self):
+        return sum((p.sum(axis=0) for p in self.pieces), np.zeros(self.shape[1:]))
+
+    def mean(self):
+        return self.sum() / len(self) if len(self) else np.full(self.shape[1:], np.nan)
+
+    def std(self):
+        mean = self.mean()
+        return np.sqrt(sum((((p - mean) ** 2).sum(axis=0) for p in self.pieces), np.zeros(self.shape[1:]))
+                       / max(len(self), 1))
+
+    def min(self):
+        return np.min([p.min(axis=0) for p in self.pieces], axis=0)
+
+    def max(self):
+        return np.max([p.max(axis=0) for p in self.pieces], axis=0)
+
+def split_dataname(dataname, interaction=None):
+    """(LAMMPS dataname, interaction) of a run dataname <name>_<epsSS>_<epsSP>[_<totsteps>]."""
+    if interaction is None:
+        m = re.search(r'_(\d+\.\d+_\d+\.\d+)(?:_\d+)?$', dataname)
+        if not m:
+            raise ValueError(f"No interaction (epsSS_epsSP) in {dataname}; pass it explicitly")
+        return dataname[:m.start()], m.group(1)
+    m = re.search(rf'_{re.escape(interaction)}(?:_\d+)?$', dataname)
+    return (dataname[:m.start()] if m else dataname), interaction
+
+def find_segments(name, interaction, runs_dir=None, simulation=None):
+    """Every segment of the chain of name (the LAMMPS dataname) and interaction under runs_dir.
+
+    A segment is a run directory and a totsteps, found from the outputs,
+    final config and restart named after it or from log.lammps. simulation
+    restricts the search to <simulation>_<name>_<interaction>_<timestamp>
+    directories. Returns dicts with folder, dataname (the full one the
+    plotting scripts take), oldsteps, totsteps, timestamp and has_log, in
+    chain order: by oldsteps, then totsteps, then directory timestamp.
+    oldsteps comes from log.lammps; without it the previous segment's
+    totsteps is assumed.
+    """
+    runs_dir = runs_dir or get_runs_dir()
+    tag = f'{name}_{interaction}'
+    file_re = re.compile(rf'^(?:final_config|restart|{"|".join(OUTPUT_PREFIXES)})_{re.escape(tag)}_(\d+)'
+                         r'\.(?:dat|data|restart)(?:\.gz|\.zst)?$')
+
+    segments = []
+    for folder in sorted(glob.glob(os.path.join(runs_dir, f'{simulation or "*"}_{tag}_*'))):
+        if not os.path.isdir(folder):
+            continue
+        names = os.listdir(folder) + [os.path.basename(p) for p in
+                                      glob.glob(os.path.join(folder, 'output_files', '*', '*'))]
+        steps = {int(m.group(1)) for m in map(file_re.match, names) if m}
+        oldsteps, totsteps = RunDirectory(folder, tag).log_steps
+        if totsteps is not None:
+            steps.add(totsteps)
+        stamp = TIMESTAMP_RE.search(folder)
+        for tot in sorted(steps):
+            # The log belongs to the last run made in the directory
+            has_log = tot == totsteps or (totsteps is None and len(steps) == 1)
+            segments.append({'folder': folder, 'dataname': f'{tag}_{tot}',
+                             'oldsteps': oldsteps if has_log else None, 'totsteps': tot,
+                             'timestamp': stamp.group(1) if stamp else '', 'has_log': has_log})
+
+    segments.sort(key=lambda s: (s['totsteps'], s['timestamp']))
+    previous = 0
+    for segment in segments:
+        if segment['oldsteps'] is None:
+            segment['oldsteps'] = previous
+        previous = segment['totsteps']
+    segments.sort(key=lambda s: (s['oldsteps'], s['totsteps'], s['timestamp']))
+    return segments
+
+def stitch(parts):
+    """Stitch row-aligned series of consecutive segments, the later segment winning where they overlap.
+
+    parts is a list of (oldsteps, steps, {name: array}) with steps increasing
+    within each segment. Rows of earlier segments from a later segment's
+    first step on (or after its oldsteps, if it starts later) are dropped: a
+    segment re-run from an older restart replaces what it overlaps, and the
+    step shared at a boundary is kept once. Returns (steps, {name: array}) as
+    SegmentedArrays; names missing from any segment are left out.
+    """
+    kept = []
+    for oldsteps, steps, arrays in parts:
+        if len(steps) == 0:
+            continue
+        trimmed = []
+        for s, a in kept:
+            n = min(np.searchsorted(s, steps[0], side='left'), np.searchsorted(s, oldsteps, side='right'))
+            if n:
+                trimmed.append((s[:n], {k: v[:n] for k, v in a.items()}))
+        kept = trimmed + [(steps, arrays)]
+    names = [k for k in (kept[0][1] if kept else {}) if all(k in a for _, a in kept)]
+    return SegmentedArray([s for s, _ in kept]), {k: SegmentedArray([a[k] for _, a in kept]) for k in names}
+
+def _pad_columns(values, width):
+    """values with NaN columns appended up to width (bin counts differ between segments under NPT)."""
+    if values.shape[1] == width:
+        return values
+    return np.pad(np.asarray(values, dtype=float), ((0, 0), (0, width - values.shape[1])),
+                  constant_values=np.nan)
+
+class RunChain:
+    """A fresh run and its continuations as one history.
+
+    Offers the series of RunDirectory (thermo, box dimensions and volume, gel
+    volumes, profiles) stitched over every segment, with true step axes:
+    gel_volume_bb_steps rebuilds the steps the bounding-box file does not
+    have. Per-segment artifacts come from RunDirectory's cache.
+    """
+
+    def __init__(self, dataname, runs_dir=None, interaction=None, simulation=None):
+        self.name, self.interaction = split_dataname(dataname, interaction)
+        self.runs_dir = runs_dir or get_runs_dir()
+        self.segments = find_segments(self.name, self.interaction, self.runs_dir, simulation)
+        self.runs = [RunDirectory(s['folder'], s['dataname']) for s in self.segments]
+        self.dataname = self.segments[-1]['dataname'] if self.segments else f'{self.name}_{self.interaction}'
+
+    @classmethod
+    def of_run(cls, folder, dataname):
+        """The chain of a run directory: its sibling directories of the same simulation folder."""
+        folder = os.path.abspath(folder)
+        name, interaction = split_dataname(dataname)
+        base = os.path.basename(folder)
+        i = base.find(f'_{name}_{interaction}_')
+        return cls(dataname, os.path.dirname(folder), interaction, base[:i] if i > 0 else None)
+
+    def __repr__(self):
+        return f'RunChain({self.name!r}, {self.interaction!r}, {len(self.segments)} segments)'
+
+    def _stitch(self, series):
+        """stitch() of series(run) -> (steps, {name: array}) or None, over the segments."""
+        parts = []
+        for segment, run in zip(self.segments, self.runs):
+            found = series(segment, run)
+            if found is not None:
+                parts.append((segment['oldsteps'],) + found)
+        return stitch(parts) if parts else None
+
+    @property
+    def thermo(self):
+        """{column: SegmentedArray} of the production thermo output of every segment's log."""
+        def series(segment, run):
+            data = run.thermo if segment['has_log'] else {}
+            return (data['Step'], data) if 'Step' in data else None
+        stitched = self._stitch(series)
+        return stitched[1] if stitched else {}
+
+    @property
+    def box_dimensions(self):
+        """(timesteps, (n, 3) box lengths) over the chain, or None."""
+        def series(segment, run):
+            dims = run.box_dimensions
+            return (dims[0], {'dims': dims[1]}) if dims is not None else None
+        stitched = self._stitch(series)
+        return (stitched[0], stitched[1]['dims']) if stitched else None
+
+    @property
+    def box_volume(self):
+        """(timesteps, box volume) over the chain, or None."""
+        dims = self.box_dimensions
+        return None if dims is None else (dims[0], dims[1].map(lambda d: np.prod(d, axis=1)))
+
+    @property
+    def gel_volume_rg(self):
+        """(timesteps, Rg^3) over the chain, or None."""
+        def series(segment, run):
+            rg = run.gel_volume_rg
+            return (rg[0], {'rg': rg[1]}) if rg is not None else None
+        stitched = self._stitch(series)
+        return (stitched[0], stitched[1]['rg']) if stitched else None
+
+    def _gel_volume_bb(self):
+        def series(segment, run):
+            bb = run.gel_volume_bb
+            if bb is None:
+                return None
+            steps = run.gel_volume_bb_steps
+            if steps is None:
+                # No sibling file to borrow from: spread the rows over the segment
+                steps = np.linspace(segment['oldsteps'], segment['totsteps'], len(bb))
+            return steps, {'bb': bb}
+        return self._stitch(series)
+
+    @property
+    def gel_volume_bb(self):
+        """Bounding-box gel volumes over the chain, or None (see gel_volume_bb_steps)."""
+        stitched = self._gel_volume_bb()
+        return stitched[1]['bb'] if stitched else None
+
+    @property
+    def gel_volume_bb_steps(self):
+        """Rebuilt timesteps of gel_volume_bb: those of the segment's Rg or box file, else spread over oldsteps..totsteps."""
+        stitched = self._gel_volume_bb()
+        return stitched[0] if stitched else None
+
+    @property
+    def box(self):
+        """Box lengths of the last segment (see RunDirectory.box)."""
+        return self.runs[-1].box
+
+    def has_volume_data(self, prefix):
+        return any(run.has_volume_data(prefix) for run in self.runs)
+
+    def has_profiles(self, kind):
+        return any(run.has_profiles(kind) for run in self.runs)
+
+    def ave_time(self, kind, dim, component):
+        """(timesteps, (n, n_bins) values) of one profile file over the chain, or None.
+
+        Segments with fewer bins are padded with NaN to the widest one.
+        """
+        found = []
+        for segment, run in zip(self.segments, self.runs):
+            path = run.profile_files(kind)[(dim, component)]
+            if os.path.exists(path):
+                timesteps, values = cached_ave_time_file(path)
+                if len(timesteps):
+                    found.append((segment['oldsteps'], timesteps, values))
+        if not found:
+            return None
+        width = max(values.shape[1] for _, _, values in found)
+        steps, arrays = stitch([(old, t, {'values': _pad_columns(v, width)}) for old, t, v in found])
+        return steps, arrays['values']
+
+    def profiles(self, kind, n_grid=200, n_blocks=5):
+        """load_profiles of a kind over the chain, with the last segment's box."""
+        box = self.box
+        sources = [path for run in self.runs for path in run.profile_files(kind).values()]
+        sources.append(self.runs[-1].data_file or self.runs[-1].input_data_file)
+        key = ('chain', os.path.abspath(self.runs_dir), self.name, self.interaction,
+               tuple(s['folder'] for s in self.segments), f'profiles_{kind}_{n_grid}_{n_blocks}')
+
+        def load():
+            spec = PROFILE_KINDS[kind]
+            dataset = {}
+            for dim in 'xyz':
+                stitched = {name: self.ave_time(kind, dim, name) for name in COMPONENTS}
+                arrays = {name: np.asarray(s[1]) if s else None for name, s in stitched.items()}
+                dataset[dim] = compute_profiles(arrays['polymer'], arrays['solvent'], box, dim,
+                                                spec['bin_width'], spec['per_volume'], n_grid, n_blocks)
+                first = stitched['polymer'] or stitched['solvent']
+                dataset[dim]['timesteps'] = np.asarray(first[0]) if first else np.empty(0, dtype=np.int64)
+            return dataset
+        return memoized(key, sources, load)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python run_chain.py <dataname> [runs_dir]")
+        sys.exit(1)
+
+    chain = RunChain(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    if not chain.segments:
+        print(f"No segments of {chain.name}_{chain.interaction} in {chain.runs_dir}")
+        sys.exit(1)
+
+    print(f"{'Oldsteps':>12} {'Totsteps':>12}  {'Log':<4} {'Note':<10} Folder")
+    previous = None
+    for segment in chain.segments:
+        note = ''
+        if previous is not None and segment['oldsteps'] > previous:
+            note = 'gap'
+        elif previous is not None and segment['oldsteps'] < previous:
+            note = 'replaces'
+        print(f"{segment['oldsteps']:>12} {segment['totsteps']:>12}  {'yes' if segment['has_log'] else 'no':<4} "
+              f"{note:<10} {os.path.basename(segment['folder'])}")
+        previous = segment['totsteps']
+    thermo = chain.thermo
+    if 'Step' in thermo:
+        print(f"Thermo: {len(thermo['Step'])} rows, steps {thermo['Step'][0]:.0f} to {thermo['Step'][-1]:.0f}")
+    bb_steps = chain.gel_volume_bb_steps
+    if bb_steps is not None and len(bb_steps):
+        print(f"Gel volume (BB): {len(bb_steps)} rows, steps {bb_steps[0]:.0f} to {bb_steps[-1]:.0f}")
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+from collections import OrderedDict
+import numpy as np
+
+from lammps_data_io import read_data_header, read_sidecar, box_lengths, data_file_summary
+from lammps_output_io import parse_performance_blocks
+from output_cache import cached_columns_file, cached_thermo_log
+from compressed_io import open_file, find_file
+from profiles import PROFILE_KINDS, COMPONENTS, load_profiles
+
+# HOW TO RUN
+# python run_directory.py <folder> <dataname> [suffix]
+# Prints what the dataname encodes and which outputs the run directory has.
+#
+# From Python:
+#   from run_directory import RunDirectory
+#   run = RunDirectory('.', 'slab_support_5beads_10x10x5_rho6_extra_padding43_1.5_1.4_40000')
+#   run.info['epsSS'], run.box, run.thermo['Temp'], run.profiles('stress')
+#
+# Every loaded artifact is kept in one process-wide LRU cache keyed by run and
+# artifact, and reloaded when one of its source files changes size or mtime.
+
+CACHE_SIZE = 64
+# Used when no data file is found (plot_stress_profiles.py always did this)
+DEFAULT_BOX = {'x': 100.0, 'y': 100.0, 'z': 50.0}
+# Printed near the top of log.lammps by the input scripts
+STEPS_RE = re.compile(rb'>>> (Previous|Cumulative)\s+# of timesteps: (\d+)')
+
+_cache = OrderedDict()
+
+def _stamp(paths):
+    """(path, size, mtime_ns) of every source; missing files stamp as None."""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            stamp.append((path, None, None))
+    return tuple(stamp)
+
+def memoized(key, sources, load):
+    """load(), cached under key until one of the source paths changes.
+
+    The cache holds the CACHE_SIZE most recently used entries.
+    """
+    stamp = _stamp(sources)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        _cache.move_to_end(key)
+        return entry[1]
+    value = load()
+    _cache[key] = (stamp, value)
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return value
+
+def clear_cache():
+    """Drop every cached artifact of every run."""
+    _cache.clear()
+
+def base_name(dataname, suffix=''):
+    """The data file name of a dataname: everything before the interaction, without the type suffix.
+
+    slab_support_5beads_10x10x5_rho6_extra_padding431_1.5_1.4_40000 with
+    suffix '1' gives slab_support_5beads_10x10x5_rho6_extra_padding43.
+    """
+    base_parts = []
+    for part in dataname.split('_'):
+        if re.match(r'\d+\.\d+', part):  # Found interaction parameter
+            break
+        base_parts.append(part)
+    base = '_'.join(base_parts)
+    if suffix and base.endswith(suffix):
+        base = base[:-len(suffix)]
+    return base
+
+def parse_dataname(dataname, suffix=''):
+    """System and run parameters encoded in a dataname.
+
+    Format: slab_support_<beads>beads_<nx>x<ny>x<nz>_rho<rho>_extra_padding<code>_<epsSS>_<epsSP>_<steps>.
+    Returns base_name, beads, grid (nx, ny, nz), rho, padding (the code as
+    written, type suffix included), epsSS, epsSP, interaction and steps;
+    fields that are not in the name are None.
+    """
+    beads = re.search(r'(\d+)beads', dataname)
+    grid = re.search(r'_(\d+)x(\d+)x(\d+)(?:_|$)', dataname)
+    rho = re.search(r'_rho(\d+(?:\.\d+)?)', dataname)
+    padding = re.search(r'extra_padding(\d+)', dataname)
+    tail = re.search(r'_(\d+\.\d+)_(\d+\.\d+)(?:_(\d+))?$', dataname)
+    return {
+        'base_name': base_name(dataname, suffix),
+        'beads': int(beads.group(1)) if beads else None,
+        'grid': tuple(int(g) for g in grid.groups()) if grid else None,
+        'rho': float(rho.group(1)) if rho else None,
+        'padding': int(padding.group(1)) if padding else None,
+        'epsSS': float(tail.group(1)) if tail else None,
+        'epsSP': float(tail.group(2)) if tail else None,
+        'interaction': f'{tail.group(1)}_{tail.group(2)}' if tail else None,
+        'steps': int(tail.group(3)) if tail and tail.group(3) else None,
+    }
+
+class RunDirectory:
+    """One run directory and the outputs of one dataname in it.
+
+    Paths are built here instead of in every script, and each artifact (thermo
+    columns, box, gel volumes, profiles, performance blocks) is parsed on first
+    access and then served from the process-wide cache, so two plotters asking
+    for the box of the same run read the data file once. invalidate() drops a
+    run's cached artifacts explicitly, e.g. after rewriting its outputs in place.
+    """
+
+    def __init__(self, folder, dataname, suffix=''):
+        self.folder = folder
+        self.dataname = dataname
+        self.suffix = suffix
+        self.info = parse_dataname(dataname, suffix)
+        self._key = (os.path.abspath(folder), dataname)
+
+    def __repr__(self):
+        return f'RunDirectory({self.folder!r}, {self.dataname!r})'
+
+    def path(self, *parts):
+        return os.path.join(self.folder, *parts)
+
+    @property
+    def log_file(self):
+        """log.lammps (or its .gz/.zst version when only that exists)."""
+        return find_file(self.path('log.lammps'))
+
+    def output_file(self, subdir, prefix):
+        """output_files/<subdir>/<prefix>_<dataname>.dat, or its .gz/.zst version when only that exists."""
+        return find_file(self.path('output_files', subdir, f'{prefix}_{self.dataname}.dat'))
+
+    def volume_file(self, prefix):
+        return self.output_file('volume_data', prefix)
+
+    def profile_files(self, kind):
+        """{(dim, component): path} of the ave/time profile files of a PROFILE_KINDS kind."""
+        spec = PROFILE_KINDS[kind]
+        return {(dim, name): self.output_file(spec['subdir'], f"{spec['prefix']}_{dim}_{name}")
+                for dim in 'xyz' for name in COMPONENTS}
+
+    @property
+    def input_data_file(self):
+        """data_files/<base_name>.data, the symlink run_lammps.sh makes to the input data (or .data.gz/.zst)."""
+        return find_file(self.path('data_files', f"{self.info['base_name']}.data"))
+
+    @property
+    def data_file(self):
+        """The input data file, else the final config LAMMPS wrote, else the full-name fallback; None if none exist."""
+        for path in (self.input_data_file,
+                     find_file(self.path(f'final_config_{self.dataname}.data')),
+                     find_file(self.path('data_files', f'{self.dataname}.data'))):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def cached(self, name, sources, load):
+        """load() memoized as artifact name of this run until one of sources changes."""
+        return memoized(self._key + (name,), sources, load)
+
+    def invalidate(self, *names):
+        """Drop the named cached artifacts of this run (all of them when no names are given)."""
+        for key in [k for k in _cache if k[:2] == self._key and (not names or k[2] in names)]:
+            del _cache[key]
+
+    @property
+    def thermo(self):
+        """{column: array} of the thermo output in log.lammps ({} without a log); later blocks replace earlier columns."""
+        def load():
+            data = {}
+            if os.path.exists(self.log_file):
+                for headers, values in cached_thermo_log(self.log_file):
+                    for j, h in enumerate(headers):
+                        data[h] = values[:, j]
+            return data
+        return self.cached('thermo', [self.log_file], load)
+
+    @property
+    def performance(self):
+        """The performance blocks of log.lammps (see lammps_output_io.parse_performance_blocks)."""
+        def load():
+            return parse_performance_blocks(self.log_file) if os.path.exists(self.log_file) else []
+        return self.cached('performance', [self.log_file], load)
+
+    @property
+    def log_steps(self):
+        """(oldsteps, totsteps) from the '>>> Previous/Cumulative # of timesteps' lines of log.lammps.
+
+        Either is None when the log or the line is missing.
+        """
+        def load():
+            found = {}
+            if os.path.exists(self.log_file):
+                with open_file(self.log_file, 'rb') as f:
+                    for _, line in zip(range(5000), f):
+                        m = STEPS_RE.search(line)
+                        if m:
+                            found.setdefault(m.group(1), int(m.group(2)))
+                            if len(found) == 2:
+                                break
+            return found.get(b'Previous'), found.get(b'Cumulative')
+        return self.cached('log_steps', [self.log_file], load)
+
+    @property
+    def data_summary(self):
+        """Box, atom/bond and per-type counts of the data file (None without one)."""
+        path = self.data_file
+        return self.cached('data_summary', [path or self.input_data_file],
+                           lambda: data_file_summary(path) if path else None)
+
+    @property
+    def box(self):
+        """Box lengths {'x', 'y', 'z'} from the data file header (or sidecar), else DEFAULT_BOX."""
+        path = self.data_file
+        def load():
+            if not path:
+                print(f"Warning: Could not find data file (tried {self.info['base_name']}.data and "
+                      f"{self.dataname}.data), using default box dimensions")
+                return dict(DEFAULT_BOX)
+            print(f"Found data file: {path}")
+            # The generator's sidecar saves reading the header; fall back to it when missing or stale
+            return box_lengths(read_sidecar(path) or read_data_header(path))
+        return self.cached('box', [path or self.input_data_file], load)
+
+    def _columns(self, prefix):
+        path = self.volume_file(prefix)
+        def load():
+            if not os.path.exists(path):
+                return None
+            return cached_columns_file(path)
+        return self.cached(prefix, [path], load)
+
+    @property
+    def box_dimensions(self):
+        """(timesteps, (n, 3) box lengths) from box_dimensions_<dataname>.dat, or None."""
+        table = self._columns('box_dimensions')
+        if table is None or table.size == 0 or table.shape[1] != 4:
+            return None
+        return table[:, 0], table[:, 1:]
+
+    @property
+    def box_volume(self):
+        """(timesteps, box volume) from box_dimensions_<dataname>.dat, or None."""
+        dims = self.box_dimensions
+        return None if dims is None else (dims[0], np.prod(dims[1], axis=1))
+
+    @property
+    def gel_volume_bb(self):
+        """Bounding-box gel volumes (one per fix print line, without timesteps), or None."""
+        table = self._columns('gel_volume_bb')
+        if table is None:
+            return None
+        return table[:, 0] if table.size else np.array([])
+
+    @property
+    def gel_volume_bb_steps(self):
+        """Timesteps of the gel_volume_bb rows, taken from the Rg or box file when it has as many rows; else None.
+
+        All volume files are written by fix print at the same frequency, but
+        the bounding-box one has no step column.
+        """
+        bb = self.gel_volume_bb
+        if bb is None:
+            return None
+        for series in (self.gel_volume_rg, self.box_dimensions):
+            if series is not None and len(series[0]) == len(bb):
+                return series[0]
+        return None
+
+    @property
+    def gel_volume_rg(self):
+        """(timesteps, Rg^3) from gel_volume_rg_<dataname>.dat, or None."""
+        table = self._columns('gel_volume_rg')
+        if table is None:
+            return None
+        if table.size == 0 or table.shape[1] < 2:
+            return np.array([]), np.array([])
+        return table[:, 0], table[:, 1]
+
+    def has_volume_data(self, prefix):
+        """True if output_files/volume_data/<prefix>_<dataname>.dat (or a compressed version) exists."""
+        return os.path.exists(self.volume_file(prefix))
+
+    def has_profiles(self, kind):
+        """True if any of the x/y/z polymer/solvent files of a profile kind exist."""
+        return any(os.path.exists(p) for p in self.profile_files(kind).values())
+
+    def profiles(self, kind, n_grid=200, n_blocks=5):
+        """load_profiles of a kind ('stress' or 'volume') with this run's box."""
+        box = self.box
+        sources = list(self.profile_files(kind).values()) + [self.data_file or self.input_data_file]
+        return self.cached(f'profiles_{kind}_{n_grid}_{n_blocks}', sources,
+                           lambda: load_profiles(self.folder, self.dataname, kind, box, n_grid, n_blocks))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python run_directory.py <folder> <dataname> [suffix]")
+        sys.exit(1)
+
+    run = RunDirectory(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else '')
+    for key, value in run.info.items():
+        print(f"  {key:<12} {value}")
+    print(f"  {'data file':<12} {run.data_file}")
+    print(f"  {'log steps':<12} oldsteps={run.log_steps[0]} totsteps={run.log_steps[1]}")
+    print(f"  {'log':<12} {'yes' if os.path.exists(run.log_file) else 'no'}"
+          f"{f' ({len(run.performance)} run/minimize blocks)' if os.path.exists(run.log_file) else ''}")
+    for kind in PROFILE_KINDS:
+        print(f"  {kind + ' data':<12} {'yes' if run.has_profiles(kind) else 'no'}")
+    for prefix in ('box_dimensions', 'gel_volume_bb', 'gel_volume_rg'):
+        print(f"  {prefix:<12} {'yes' if os.path.exists(run.volume_file(prefix)) else 'no'}")
@@ -16,6 +16,27 @@ NSTEPS=$4
 OLDSTEPS=${5:-0}  # Default to 0 for fresh runs
 TOTSTEPS=$((OLDSTEPS + NSTEPS))
 
+# Determine suffix and profile outputs based on 6th argument (type)
+TYPE=${6:-}
+SUFFIX=""
+STRESS_OUTPUTS=0
+VOLUME_OUTPUTS=0
+case "$TYPE" in
+    stress)
+        SUFFIX="1"
+        STRESS_OUTPUTS=1
+        ;;
+    volume)
+        SUFFIX="2"
+        VOLUME_OUTPUTS=1
+        ;;
+    stressvol)
+        SUFFIX="3"
+        STRESS_OUTPUTS=1
+        VOLUME_OUTPUTS=1
+        ;;
+esac
+
 # Scratch directory for trajectories
 SCRATCH_DIR="/scratch/$USER"
 
@@ -55,11 +76,25 @@ echo "Trajectory directory (scratch): $TRAJ_DIR"
 echo "======================================"
 
 # Copy or link the data file
+COMPRESSED_SOURCE=""
 DATA_FILE_SOURCE="$HOME/Documents/lammps_data/input_data/${DATANAME}.data"
 if [ ! -f "$DATA_FILE_SOURCE" ]; then
-    echo "Error: Data file $DATA_FILE_SOURCE not found"
-    echo "Please ensure your .data file is in ~/Documents/lammps_data/input_data/"
-    exit 1
+    # Compressed input (compressed_io.py): unpack it on scratch, next to the trajectories
+    if [ -f "$DATA_FILE_SOURCE.gz" ]; then
+        gunzip -c "$DATA_FILE_SOURCE.gz" > "$TRAJ_DIR/${DATANAME}.data" \
+            || { echo "Error: could not decompress $DATA_FILE_SOURCE.gz"; exit 1; }
+        COMPRESSED_SOURCE="$DATA_FILE_SOURCE.gz"
+        DATA_FILE_SOURCE="$TRAJ_DIR/${DATANAME}.data"
+    elif [ -f "$DATA_FILE_SOURCE.zst" ]; then
+        zstd -dc "$DATA_FILE_SOURCE.zst" > "$TRAJ_DIR/${DATANAME}.data" \
+            || { echo "Error: could not decompress $DATA_FILE_SOURCE.zst"; exit 1; }
+        COMPRESSED_SOURCE="$DATA_FILE_SOURCE.zst"
+        DATA_FILE_SOURCE="$TRAJ_DIR/${DATANAME}.data"
+    else
+        echo "Error: Data file $DATA_FILE_SOURCE not found"
+        echo "Please ensure your .data file is in ~/Documents/lammps_data/input_data/"
+        exit 1
+    fi
 fi
 
 # Create symlink to data file
@@ -72,6 +107,7 @@ echo "Running LAMMPS in $FOLDER with:"
 echo "  dataname=$DATANAME"
 echo "  epsSS=$EPSSS, epsSP=$EPSSP"
 echo "  nsteps=$NSTEPS, oldsteps=$OLDSTEPS, totsteps=$TOTSTEPS"
+echo "  type=$TYPE"
 echo "SLURM tasks per node: $SLURM_NTASKS_PER_NODE"
 echo "SLURM CPUs per task: $SLURM_CPUS_PER_TASK"
 
@@ -91,24 +127,11 @@ srun --mpi=pmix \
     -var nsteps $NSTEPS \
     -var oldsteps $OLDSTEPS \
     -var totsteps $TOTSTEPS \
+    -var stress_outputs $STRESS_OUTPUTS \
+    -var volume_outputs $VOLUME_OUTPUTS \
+    -var simdir $SIM_DIR \
     -in $LAMMPS_FILE
 
-# Determine suffix based on 6th argument (type) - moved from 7th position
-SUFFIX=""
-if [ $# -ge 6 ]; then
-    case "$6" in
-        stress)
-            SUFFIX="1"
-            ;;
-        volume)
-            SUFFIX="2"
-            ;;
-        stressvol)
-            SUFFIX="3"
-            ;;
-    esac
-fi
-
 # Run post-processing Python scripts
 echo "======================================"
 echo "Running post-processing..."
@@ -120,14 +143,24 @@ module load miniconda
 source $(conda info --base)/etc/profile.d/conda.sh # loads Conda's shell functions into bash session
 conda activate lammps_analysis
 
+# An unpacked input needs its sidecar next to it, or every script rescans the data file
+if [ -n "$COMPRESSED_SOURCE" ]; then
+    python "$SCRIPT_DIR/compressed_io.py" --sidecar "$COMPRESSED_SOURCE" "$DATA_FILE_SOURCE"
+fi
+
 echo "Generating convergence plot..."
 python "$SCRIPT_DIR/plot_lammps_log.py" "." "${DATANAME}_${INTERACTION}_${TOTSTEPS}"
 
 echo "Generating stress profiles..."
 python "$SCRIPT_DIR/plot_stress_profiles.py" "." "${DATANAME}_${INTERACTION}_${TOTSTEPS}" "$OLDSTEPS"
 
-echo "Generating computational efficiency plot..."
-python "$SCRIPT_DIR/write_tracking.py" "." "${DATANAME}${SUFFIX}_${INTERACTION}_${TOTSTEPS}" "$SUFFIX"
+# Benchmark jobs (scaling_benchmark.py) set SKIP_TRACKING=1 to stay out of tracking.db
+if [ -z "$SKIP_TRACKING" ]; then
+    echo "Generating computational efficiency plot..."
+    python "$SCRIPT_DIR/write_tracking.py" "." "${DATANAME}${SUFFIX}_${INTERACTION}_${TOTSTEPS}" "$SUFFIX"
+else
+    echo "Benchmark run: not recorded in tracking"
+fi
 
 echo "======================================"
 echo "Done! Results are in: $WORK_DIR"
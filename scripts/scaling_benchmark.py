@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+import sys
+import os
+import re
+import glob
+import json
+import shutil
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from lammps_output_io import parse_performance_blocks, limiting_section
+import tracking_db
+from write_tracking import parse_parallel_config, loglog_fit, get_tracking_file_path
+from walltime_estimator import TYPE_SUFFIX
+from compressed_io import open_file, find_file, is_compressed, strip_suffix
+
+# HOW TO RUN
+# cd ~/Documents/lammps_work/scripts
+# python scaling_benchmark.py plan <matrix.json> <bench_dir> [--generate]   # batch files + submit_all.sh
+# bash <bench_dir>/submit_all.sh                                           # on the cluster
+# python scaling_benchmark.py report <bench_dir>                           # once the jobs are done
+#
+# Without a cluster, replay recorded logs instead of running (picks the log with
+# the same type and tasks/threads/GPUs and the closest atom count for every case):
+# python scaling_benchmark.py replay <matrix.json> <bench_dir> ../simulations/*/slurm_*.out
+#
+# Example matrix.json:
+# {"folder": "slab_with_support", "interaction": "1.5_1.4", "nsteps": 20000,
+#  "ntasks": [10, 20, 40, 80, 120], "omp_threads": [1],
+#  "types": ["", "stress"],
+#  "systems": [{"dataname": "slab_support_5beads_10x10x5_rho6_extra_padding43"},
+#              {"dataname": "slab_support_5beads_15x15x10_rho6_extra_padding43",
+#               "generator": "generate_gel_slab",
+#               "params": {"beads_per_chain": 5, "units_x": 15, "units_y": 15, "units_z": 10,
+#                          "solvent_density": 6, "solvent_padding": 13.5}}],
+#  "cores_per_node": 128, "time": "2:00:00"}
+
+MATRIX_DEFAULTS = {'omp_threads': [1], 'gpus': [0], 'types': [''], 'oldsteps': 0,
+                   'cores_per_node': 128, 'time': '2:00:00', 'template': None,
+                   'gpu_partition': 'GPU-shared'}
+
+def get_input_data_dir():
+    return os.path.join(os.path.expanduser('~'), 'Documents', 'lammps_data', 'input_data')
+
+def load_matrix(path):
+    with open(path, 'r') as f:
+        matrix = json.load(f)
+    return {**MATRIX_DEFAULTS, **matrix}
+
+def case_name(case):
+    """Short unique name of a case, used for its batch, output and replay files."""
+    system = re.sub(r'^slab_support_', '', case['dataname'])
+    kind = case['type'] or 'sim'
+    gpus = f"_{case['gpus']}gpu" if case['gpus'] else ''
+    return f"{system}_{kind}_{case['ntasks']}x{case['omp_threads']}{gpus}"
+
+def expand_matrix(matrix):
+    """Every (system, type, ntasks, omp threads, GPUs) combination of the matrix as a case dict."""
+    cases = []
+    for system in matrix['systems']:
+        for kind in matrix['types']:
+            for ntasks in matrix['ntasks']:
+                for threads in matrix['omp_threads']:
+                    for gpus in matrix['gpus']:
+                        case = {'folder': matrix['folder'], 'dataname': system['dataname'],
+                                'interaction': matrix['interaction'], 'nsteps': matrix['nsteps'],
+                                'oldsteps': matrix['oldsteps'], 'type': kind, 'ntasks': ntasks,
+                                'omp_threads': threads, 'gpus': gpus, 'natoms': system.get('natoms')}
+                        case['name'] = case_name(case)
+                        cases.append(case)
+    return cases
+
+def node_layout(ntasks, threads, cores_per_node):
+    """(nodes, tasks per node) needed to place ntasks x threads cores."""
+    tasks_per_node = max(1, cores_per_node // threads)
+    nodes = -(-ntasks // tasks_per_node)
+    return nodes, -(-ntasks // nodes)
+
+def batch_script(case, template_text, cores_per_node, walltime, gpu_partition='GPU-shared'):
+    """The template batch file with its #SBATCH layout and run parameters set for one case.
+
+    GPU cases are sent to gpu_partition. The job exports SKIP_TRACKING=1 so
+    the benchmark run is not recorded in tracking.
+    """
+    nodes, per_node = node_layout(case['ntasks'], case['omp_threads'], cores_per_node)
+    sbatch = {'job-name': f"bench_{case['name']}", 'output': f"{case['name']}_%j.out",
+              'error': f"{case['name']}_%j.err", 'nodes': nodes, 'ntasks-per-node': per_node,
+              'cpus-per-task': case['omp_threads'], 'time': walltime}
+    if case['gpus']:
+        sbatch['gpus'] = case['gpus']
+        sbatch['partition'] = gpu_partition
+    params = {'FOLDER': f'"{case["folder"]}"', 'DATANAME': f'"{case["dataname"]}"',
+              'INTERACTION': f'"{case["interaction"]}"', 'NSTEPS': case['nsteps'],
+              'OLDSTEPS': case['oldsteps'], 'TYPE': f'"{case["type"]}"'}
+
+    lines, seen, last_param = [], set(), None
+    for line in template_text.splitlines():
+        m = re.match(r'#SBATCH --([\w-]+)=', line)
+        if m and m.group(1) in sbatch:
+            if m.group(1) in seen:
+                continue  # Drop repeated directives (pure_solvent.batch sets ntasks-per-node twice)
+            seen.add(m.group(1))
+            line = f"#SBATCH --{m.group(1)}={sbatch[m.group(1)]}"
+        m = re.match(r'(\w+)=', line)
+        if m and m.group(1) in params:
+            line = f"{m.group(1)}={params[m.group(1)]}"
+            last_param = len(lines)
+        lines.append(line)
+
+    # Directives the template does not have go after the last #SBATCH line
+    missing = [f"#SBATCH --{k}={v}" for k, v in sbatch.items() if k not in seen]
+    last = max(i for i, line in enumerate(lines) if line.startswith('#SBATCH'))
+    lines[last + 1:last + 1] = missing
+    # run_lammps.sh then skips write_tracking.py, keeping benchmarks out of tracking.db
+    at = last + 1 + len(missing) if last_param is None else last_param + len(missing) + 1
+    lines.insert(at, 'export SKIP_TRACKING=1')
+    return '\n'.join(lines) + '\n'
+
+def ensure_data_files(matrix, data_dir=None, workers=None):
+    """Generate the data files of generator systems that are not in input_data yet, in parallel.
+
+    An existing <dataname>.data must have been generated with the system's
+    params (same params_key); otherwise ValueError is raised rather than
+    benchmarking the old file. A matching file cached under another name is
+    linked as <dataname>.data, since that is the name the batch files run.
+    """
+    from input_cache import generate_sweep, params_key, file_key
+    data_dir = data_dir or get_input_data_dir()
+    by_generator = {}
+    for system in matrix['systems']:
+        if 'generator' not in system:
+            continue
+        params = system.get('params', {})
+        path = find_file(os.path.join(data_dir, f"{system['dataname']}.data"))
+        if os.path.exists(path):
+            if file_key(path) != params_key(system['generator'], params):
+                raise ValueError(f"{path} was not generated with the matrix parameters of "
+                                 f"{system['dataname']}: remove it or give the system another dataname")
+            continue
+        by_generator.setdefault(system['generator'], []).append(
+            {**params, 'output_name': f"{system['dataname']}.data"})
+
+    for generator, variants in by_generator.items():
+        for variant, path in zip(variants, generate_sweep(generator, variants, data_dir, workers)):
+            expected = os.path.join(data_dir, variant['output_name'])
+            if is_compressed(path):
+                expected += path[len(strip_suffix(path)):]
+            if os.path.abspath(path) == os.path.abspath(expected):
+                continue
+            if os.path.lexists(expected):
+                raise ValueError(f"{variant['output_name']} was generated as {path}, "
+                                 f"but {expected} holds other parameters")
+            os.symlink(os.path.basename(path), expected)
+            print(f"Linked {expected} -> {path}")
+
+def plan_benchmark(matrix, bench_dir, generate=False):
+    """Write one batch file per case, submit_all.sh and the cases.json manifest."""
+    if generate:
+        ensure_data_files(matrix)
+    template = matrix['template'] or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'simulations', matrix['folder'],
+        f"{matrix['folder']}.batch")
+    with open(template, 'r') as f:
+        template_text = f.read()
+
+    os.makedirs(bench_dir, exist_ok=True)
+    cases = expand_matrix(matrix)
+    for case in cases:
+        with open(os.path.join(bench_dir, f"{case['name']}.batch"), 'w') as f:
+            f.write(batch_script(case, template_text, matrix['cores_per_node'], matrix['time'],
+                                 matrix['gpu_partition']))
+    with open(os.path.join(bench_dir, 'submit_all.sh'), 'w') as f:
+        f.write('#!/bin/bash\ncd "$(dirname "$0")" || exit 1\n')
+        f.writelines(f"sbatch {case['name']}.batch\n" for case in cases)
+    with open(os.path.join(bench_dir, 'cases.json'), 'w') as f:
+        json.dump({'matrix': matrix, 'cases': cases}, f, indent=1)
+    print(f"Wrote {len(cases)} batch files to {bench_dir}")
+    return cases
+
+def tracked_run_names(db_path=None, tracking_file=None):
+    """Names of the runs in tracking.db, or in tracking.txt when there is no database yet."""
+    db_path = db_path or tracking_db.get_tracking_db_path()
+    if os.path.exists(db_path):
+        return {r['name'] for r in tracking_db.query_runs(db_path)}
+    tracking_file = tracking_file or get_tracking_file_path()
+    if not os.path.exists(tracking_file):
+        return set()
+    with open(tracking_file, 'r') as f:
+        return {line.split()[0] for line in f.readlines()[2:] if line.strip()}
+
+def recorded_type(log_file, tracked=()):
+    """Run type ('', 'stress', 'volume', 'stressvol') of a recorded slurm output, or None if unknown.
+
+    run_lammps.sh echoes "type=...". For older outputs the type is the padding
+    suffix of the one tracked run name (tracked, see tracked_run_names) that
+    matches the echoed dataname, interaction and totsteps; failing that, it is
+    told from which profile plots the post-processing saved.
+    """
+    fields = {}
+    stress = volume = postprocessed = False
+    with open_file(log_file, 'rt') as f:
+        for line in f:
+            m = re.match(r'\s*type=(\w*)\s*$', line)
+            if m:
+                return m.group(1)
+            for key, value in re.findall(r'\b(dataname|epsSS|epsSP|totsteps)=([^\s,]+)', line):
+                fields.setdefault(key, value)
+            postprocessed |= line.startswith('Generating stress profiles')
+            stress |= line.startswith('Stress profile saved')
+            volume |= line.startswith('Volume fraction profile saved')
+
+    if len(fields) == 4:
+        tail = f"_{fields['epsSS']}_{fields['epsSP']}_{fields['totsteps']}"
+        found = [kind for kind, suffix in TYPE_SUFFIX.items()
+                 if f"{fields['dataname']}{suffix}{tail}" in tracked]
+        if len(found) == 1:
+            return found[0]
+    if not postprocessed:
+        return None
+    return {(True, False): 'stress', (False, True): 'volume', (True, True): 'stressvol'}.get((stress, volume), '')
+
+def replay_logs(matrix, bench_dir, log_files):
+    """Local stand-in for running the benchmark: copy a recorded log in as each case's output.
+
+    A case gets the log with the same run type (see recorded_type), MPI tasks,
+    OpenMP threads and GPUs and the closest atom count (from the case's data
+    file, or the system's "natoms" in the matrix when the data file is not
+    here). Cases without a matching log are left without output.
+    """
+    cases = plan_benchmark(matrix, bench_dir)
+    recorded, tracked = [], tracked_run_names()
+    for path in log_files:
+        blocks = parse_performance_blocks(path)
+        if blocks:
+            config = (recorded_type(path, tracked),) + tuple(parse_parallel_config(path))
+            recorded.append((config, blocks[-1]['natoms'], path))
+
+    from lammps_data_io import data_file_summary
+    for case in cases:
+        data_file = os.path.join(get_input_data_dir(), f"{case['dataname']}.data")
+        natoms = data_file_summary(data_file)['atoms'] if os.path.exists(data_file) else case['natoms']
+        config = (case['type'], case['ntasks'], case['omp_threads'], case['gpus'])
+        matches = [r for r in recorded if r[0] == config]
+        if not matches:
+            print(f"No recorded log for {case['name']}")
+            continue
+        if natoms:
+            matches.sort(key=lambda r: abs(np.log(r[1] / natoms)))
+        shutil.copyfile(matches[0][2], os.path.join(bench_dir, f"{case['name']}_replay.out"))
+        print(f"{case['name']}: replaying {matches[0][2]}")
+    return cases
+
+def collect_results(bench_dir):
+    """Parse the newest output of every case in the manifest; cases without output are skipped."""
+    with open(os.path.join(bench_dir, 'cases.json'), 'r') as f:
+        cases = json.load(f)['cases']
+
+    results = []
+    for case in cases:
+        # <name>_<jobid>.out or <name>_replay.out; not the outputs of <name>_1gpu etc.
+        own = re.compile(rf"{re.escape(case['name'])}_(\d+|replay)\.out")
+        outputs = [p for p in glob.glob(os.path.join(bench_dir, f"{case['name']}_*.out"))
+                   if own.fullmatch(os.path.basename(p))]
+        blocks = parse_performance_blocks(max(outputs, key=os.path.getmtime)) if outputs else []
+        if not blocks:
+            continue
+        b = blocks[-1]  # The production run
+        section, pct = limiting_section(b)
+        results.append({**case, 'natoms': b['natoms'], 'loop_time': b['loop_time'],
+                        'run_steps': b['nsteps'], 'time_per_step': b['loop_time'] / b['nsteps'],
+                        'timesteps_per_s': b['timesteps_per_s'],
+                        'cores': case['ntasks'] * case['omp_threads'],
+                        'limiting_section': section, 'limiting_pct': pct,
+                        'timing_pct': {k: v['total'] for k, v in b['timing'].items()}})
+    return results
+
+def scaling_analysis(results):
+    """Speedup, parallel efficiency and log-log scaling slopes of the benchmark results.
+
+    Strong scaling groups runs of the same system and type: speedup and
+    efficiency are relative to the run on the fewest cores, and the slope is
+    that of time/step against cores (-1 is ideal). Weak scaling groups runs of
+    the same type and task layout: the slope is that of time/step against atoms
+    (the fit plot_performance draws; 1 is ideal), and efficiency compares
+    core-seconds per atom-step with the smallest system.
+    """
+    strong, weak = [], []
+    for key in sorted({(r['dataname'], r['type']) for r in results}):
+        group = sorted((r for r in results if (r['dataname'], r['type']) == key),
+                       key=lambda r: (r['cores'], r['gpus']))
+        base = group[0]
+        for r in group:
+            r['speedup'] = base['time_per_step'] / r['time_per_step']
+            r['efficiency'] = r['speedup'] * base['cores'] / r['cores']
+        fit = loglog_fit([r['cores'] for r in group], [r['time_per_step'] for r in group], 2)
+        strong.append({'dataname': key[0], 'type': key[1], 'runs': len(group),
+                       'slope': None if fit is None else float(fit[0])})
+
+    for key in sorted({(r['type'], r['ntasks'], r['omp_threads'], r['gpus']) for r in results}):
+        group = sorted((r for r in results
+                        if (r['type'], r['ntasks'], r['omp_threads'], r['gpus']) == key),
+                       key=lambda r: r['natoms'])
+        cost = [r['time_per_step'] * r['cores'] / r['natoms'] for r in group]
+        for r, c in zip(group, cost):
+            r['weak_efficiency'] = cost[0] / c
+        fit = loglog_fit([r['natoms'] for r in group], [r['time_per_step'] for r in group], 2)
+        weak.append({'type': key[0], 'ntasks': key[1], 'omp_threads': key[2], 'gpus': key[3],
+                     'runs': len(group), 'slope': None if fit is None else float(fit[0])})
+    return {'strong': strong, 'weak': weak}
+
+def _fmt(value, spec):
+    return 'N/A' if value is None else format(value, spec)
+
+def write_report(bench_dir, results, analysis):
+    """scaling_report.txt (fixed width, like tracking.txt), scaling_report.json and plots."""
+    with open(os.path.join(bench_dir, 'scaling_report.json'), 'w') as f:
+        json.dump({'results': results, 'analysis': analysis}, f, indent=1)
+
+    path = os.path.join(bench_dir, 'scaling_report.txt')
+    with open(path, 'w') as f:
+        f.write(f"{'Case':<60} {'Atoms':<10} {'Cores':<6} {'s/step':<12} {'Speedup':<8} "
+                f"{'Eff.':<6} {'Weak eff.':<10} {'Limited by':<16}\n")
+        f.write("-" * 133 + "\n")
+        for r in sorted(results, key=lambda r: (r['dataname'], r['type'], r['cores'])):
+            limit = f"{r['limiting_section']} {r['limiting_pct']:.0f}%" if r['limiting_section'] else 'N/A'
+            f.write(f"{r['name']:<60} {r['natoms']:<10} {r['cores']:<6} {r['time_per_step']:<12.5g} "
+                    f"{r['speedup']:<8.2f} {r['efficiency']:<6.2f} {r['weak_efficiency']:<10.2f} "
+                    f"{limit:<16}\n")
+        f.write("\nStrong scaling slopes (time/step vs cores, ideal -1)\n")
+        for s in analysis['strong']:
+            f.write(f"  {s['dataname']} {s['type'] or 'sim'}: {_fmt(s['slope'], '.2f')} ({s['runs']} runs)\n")
+        f.write("\nWeak scaling slopes (time/step vs atoms, ideal 1)\n")
+        for s in analysis['weak']:
+            f.write(f"  {s['type'] or 'sim'} {s['ntasks']}x{s['omp_threads']} {s['gpus']} GPUs: "
+                    f"{_fmt(s['slope'], '.2f')} ({s['runs']} runs)\n")
+    print(f"Saved {path}")
+    plot_scaling(bench_dir, results)
+
+def plot_scaling(bench_dir, results):
+    """Speedup and parallel efficiency against cores, one line per system and type."""
+    fig, (ax_speed, ax_eff) = plt.subplots(1, 2, figsize=(14, 6))
+    max_cores = 1
+    for key in sorted({(r['dataname'], r['type']) for r in results}):
+        group = sorted((r for r in results if (r['dataname'], r['type']) == key), key=lambda r: r['cores'])
+        cores = [r['cores'] for r in group]
+        max_cores = max(max_cores, max(cores))
+        label = f"{key[0]} ({key[1] or 'sim only'})"
+        ax_speed.plot(cores, [r['speedup'] for r in group], 'o-', label=label)
+        ax_eff.plot(cores, [r['efficiency'] for r in group], 'o-', label=label)
+    base = min(r['cores'] for r in results)
+    ax_speed.plot([base, max_cores], [1, max_cores / base], 'k--', alpha=0.5, label='Ideal')
+    ax_eff.axhline(1, color='k', linestyle='--', alpha=0.5)
+    for ax, ylabel in ((ax_speed, 'Speedup'), (ax_eff, 'Parallel Efficiency')):
+        ax.set_xscale('log')
+        ax.set_xlabel('Cores (MPI tasks x OpenMP threads)')
+        ax.set_ylabel(ylabel)
+        ax.grid(alpha=0.3, which='both')
+    ax_speed.set_yscale('log')
+    ax_speed.legend(fontsize=8)
+    plt.tight_layout()
+    output = os.path.join(bench_dir, 'strong_scaling.png')
+    plt.savefig(output, dpi=150, bbox_inches='tight')
+    print(f"Saved {output}")
+    plt.close(fig)
+
+def report_benchmark(bench_dir):
+    results = collect_results(bench_dir)
+    if not results:
+        print(f"No finished cases in {bench_dir}")
+        return None
+    analysis = scaling_analysis(results)
+    write_report(bench_dir, results, analysis)
+    return analysis
+
+if __name__ == "__main__":
+    usage = ("Usage: python scaling_benchmark.py plan <matrix.json> <bench_dir> [--generate]\n"
+             "       python scaling_benchmark.py replay <matrix.json> <bench_dir> <log> [<log> ...]\n"
+             "       python scaling_benchmark.py report <bench_dir>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(args) < 2:
+        print(usage)
+        sys.exit(1)
+
+    command = args[0]
+    if command == 'plan' and len(args) >= 3:
+        plan_benchmark(load_matrix(args[1]), args[2], '--generate' in sys.argv)
+    elif command == 'replay' and len(args) >= 4:
+        replay_logs(load_matrix(args[1]), args[2], args[3:])
+        report_benchmark(args[2])
+    elif command == 'report':
+        report_benchmark(args[1])
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+import os
+import re
+import sqlite3
+import time
+import numpy as np
+
+# Performance tracking store: one row per run in ~/Documents/lammps_work/tracking.db.
+# tracking.txt is still written from it (export_tracking_txt) for reading by eye.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY,
+    name         TEXT NOT NULL UNIQUE,
+    beads        INTEGER,
+    padding      INTEGER,
+    interaction  TEXT,
+    nsteps       INTEGER,
+    natoms       INTEGER,
+    box_x        REAL,
+    box_y        REAL,
+    box_z        REAL,
+    wall_time    REAL,
+    mpi_tasks    INTEGER,
+    omp_threads  INTEGER,
+    gpus         INTEGER NOT NULL DEFAULT 0,
+    recorded_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_padding_beads ON runs (padding, beads);
+CREATE INDEX IF NOT EXISTS runs_natoms ON runs (natoms);
+CREATE INDEX IF NOT EXISTS runs_wall_time ON runs (wall_time);
+
+CREATE TABLE IF NOT EXISTS performance (
+    run_name          TEXT NOT NULL,
+    block             INTEGER NOT NULL,
+    loop_time         REAL,
+    nprocs            INTEGER,
+    nsteps            INTEGER,
+    natoms            INTEGER,
+    tau_per_day       REAL,
+    timesteps_per_s   REAL,
+    atom_steps_per_s  REAL,
+    cpu_percent       REAL,
+    mpi_tasks         INTEGER,
+    omp_threads       INTEGER,
+    proc_grid         TEXT,
+    nlocal_ave        REAL,
+    nlocal_max        REAL,
+    nlocal_min        REAL,
+    nghost_ave        REAL,
+    nghost_max        REAL,
+    nghost_min        REAL,
+    neighs_ave        REAL,
+    neighs_max        REAL,
+    neighs_min        REAL,
+    total_neighbors   INTEGER,
+    ave_neighs_per_atom REAL,
+    neighbor_builds   INTEGER,
+    dangerous_builds  INTEGER,
+    PRIMARY KEY (run_name, block)
+);
+CREATE TABLE IF NOT EXISTS timing (
+    run_name   TEXT NOT NULL,
+    block      INTEGER NOT NULL,
+    section    TEXT NOT NULL,
+    min_time   REAL,
+    avg_time   REAL,
+    max_time   REAL,
+    varavg     REAL,
+    pct_total  REAL,
+    PRIMARY KEY (run_name, block, section)
+);
+CREATE INDEX IF NOT EXISTS timing_section ON timing (section);
+"""
+
+PERFORMANCE_SCALARS = ('loop_time', 'nprocs', 'nsteps', 'natoms', 'tau_per_day', 'timesteps_per_s',
+                       'atom_steps_per_s', 'cpu_percent', 'mpi_tasks', 'omp_threads',
+                       'total_neighbors', 'ave_neighs_per_atom', 'neighbor_builds', 'dangerous_builds')
+
+COLUMNS = ('name', 'beads', 'padding', 'interaction', 'nsteps', 'natoms', 'box_x', 'box_y', 'box_z',
+           'wall_time', 'mpi_tasks', 'omp_threads', 'gpus', 'recorded_at')
+
+def get_tracking_db_path():
+    """Path to the tracking database, next to tracking.txt in lammps_work."""
+    home = os.path.expanduser('~')
+    return os.path.join(home, 'Documents', 'lammps_work', 'tracking.db')
+
+def connect(db_path=None):
+    """Open (and create if needed) the tracking database.
+
+    The default rollback journal plus a generous busy timeout lets several
+    SLURM jobs finishing at once insert without clobbering each other. WAL is
+    not used: its shared-memory index does not work across the compute nodes
+    that share home over the network filesystem.
+    """
+    db_path = db_path or get_tracking_db_path()
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.row_factory = sqlite3.Row
+    # Explicit, so a database left in WAL mode by an older version is switched back
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.executescript(SCHEMA)
+    return conn
+
+def parse_run_name(name):
+    """beads, padding code, interaction and nsteps from a tracking name.
+
+    Format: slab_support_5beads_10x10x5_rho6_extra_padding431_1.5_1.4_30000
+    """
+    beads_match = re.search(r'(\d+)beads', name)
+    padding_match = re.search(r'extra_padding(\d+)', name)
+    interaction_match = re.search(r'_(\d+\.\d+_\d+\.\d+)_\d+$', name)
+    nsteps_match = re.search(r'_(\d+)$', name)
+    return {
+        'beads': int(beads_match.group(1)) if beads_match else 0,
+        'padding': int(padding_match.group(1)) if padding_match else 1,
+        'interaction': interaction_match.group(1) if interaction_match else None,
+        'nsteps': int(nsteps_match.group(1)) if nsteps_match else 0,
+    }
+
+# Output type from the third digit of the padding code (none: simulation only)
+RUN_KINDS = ('sim_only', 'stress', 'volume', 'stressvol')
+
+# Columnar view of the runs for plotting and fitting (see runs_table)
+TABLE_DTYPE = [('name', 'U128'), ('beads', 'i8'), ('padding', 'i8'), ('nsteps', 'i8'),
+               ('natoms', 'i8'), ('time_sec', 'f8'), ('mpi_tasks', 'i8'), ('omp_threads', 'i8'),
+               ('gpus', 'i8'), ('kind', 'i8'), ('piston', '?')]
+
+def decode_padding(padding):
+    """Index into RUN_KINDS and piston flag for an array of padding codes.
+
+    The third digit is the output type (1 stress, 2 volume, 3 stress/vol, none
+    for simulation only) and a leading 4 means a piston run, e.g. 431 is a
+    piston run with stress output. kind is -1 for codes that fit neither
+    (fewer than two digits, or a third digit outside 1-3).
+    """
+    padding = np.atleast_1d(np.asarray(padding, dtype=np.int64))
+    n_digits = np.where(padding > 0, np.floor(np.log10(np.maximum(padding, 1))).astype(np.int64) + 1, 0)
+    lead = padding // 10 ** np.maximum(n_digits - 1, 0)
+    third = np.where(n_digits >= 3, padding // 10 ** np.maximum(n_digits - 3, 0) % 10, 0)
+    kind = np.where((n_digits < 2) | (third > 3) | ((n_digits >= 3) & (third == 0)), -1, third)
+    return kind, lead == 4
+
+def run_class(padding):
+    """Configuration class of one run from its padding code, e.g. 431 -> 'stress_piston'.
+
+    Returns None for names without a padding code.
+    """
+    kind, piston = decode_padding(padding)
+    if kind[0] < 0:
+        return None
+    return RUN_KINDS[kind[0]] + ('_piston' if piston[0] else '')
+
+def runs_table(rows):
+    """Structured array (TABLE_DTYPE) of run dicts as returned by query_runs.
+
+    Unknown task/thread counts are -1; kind and piston are decoded from the
+    padding code once for all runs.
+    """
+    table = np.zeros(len(rows), dtype=TABLE_DTYPE)
+    for field in ('name', 'beads', 'padding', 'nsteps', 'natoms', 'time_sec',
+                  'mpi_tasks', 'omp_threads', 'gpus'):
+        default = -1 if field in ('mpi_tasks', 'omp_threads') else 0
+        table[field] = [default if r.get(field) is None else r[field] for r in rows]
+    table['kind'], table['piston'] = decode_padding(table['padding']) if len(table) else ([], [])
+    return table
+
+def group_by(table, *fields):
+    """{key: rows of table} for each distinct combination of fields, in sorted key order.
+
+    One sort over the key columns instead of a filter pass per group.
+    """
+    if len(table) == 0:
+        return {}
+    keys = table[list(fields)]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(unique)))[:-1]
+    return {tuple(k.item() for k in key): table[idx]
+            for key, idx in zip(unique, np.split(order, bounds))}
+
+def table_digest(table):
+    """Hash of the table contents, to tell whether plots made from it are stale."""
+    import hashlib
+    return hashlib.sha1(np.ascontiguousarray(np.sort(table, order='name')).tobytes()).hexdigest()
+
+def record_run(name, box_dims, natoms, wall_time, mpi_tasks=None, omp_threads=None, gpus=0,
+               db_path=None):
+    """Insert one run; returns False if a run with this name is already recorded."""
+    row = {'name': name, **parse_run_name(name), 'natoms': natoms,
+           'box_x': box_dims.get('x'), 'box_y': box_dims.get('y'), 'box_z': box_dims.get('z'),
+           'wall_time': wall_time, 'mpi_tasks': mpi_tasks, 'omp_threads': omp_threads,
+           'gpus': gpus or 0, 'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    conn = connect(db_path)
+    try:
+        with conn:
+            cur = conn.execute(
+                f"INSERT OR IGNORE INTO runs ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join(':' + c for c in COLUMNS)})", row)
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+def record_performance(name, blocks, db_path=None):
+    """Store the performance summaries of a run (see parse_performance_blocks), replacing old ones.
+
+    block is the index of the summary in the log; the production run is the last.
+    """
+    perf_rows, timing_rows = [], []
+    for i, b in enumerate(blocks):
+        row = {'run_name': name, 'block': i, **{k: b.get(k) for k in PERFORMANCE_SCALARS},
+               'proc_grid': 'x'.join(str(v) for v in b['proc_grid']) if b.get('proc_grid') else None}
+        for stat in ('nlocal', 'nghost', 'neighs'):
+            for k in ('ave', 'max', 'min'):
+                row[f'{stat}_{k}'] = b[stat][k] if b.get(stat) else None
+        perf_rows.append(row)
+        for section, t in b.get('timing', {}).items():
+            timing_rows.append((name, i, section, t['min'], t['avg'], t['max'], t['varavg'], t['total']))
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute('DELETE FROM performance WHERE run_name = ?', (name,))
+            conn.execute('DELETE FROM timing WHERE run_name = ?', (name,))
+            if perf_rows:
+                columns = list(perf_rows[0])
+                conn.executemany(f"INSERT INTO performance ({', '.join(columns)}) "
+                                 f"VALUES ({', '.join(':' + c for c in columns)})", perf_rows)
+            conn.executemany('INSERT INTO timing VALUES (?, ?, ?, ?, ?, ?, ?, ?)', timing_rows)
+    finally:
+        conn.close()
+
+def query_performance(db_path=None, last_block_only=True):
+    """Performance rows joined with their run, one per run (its last summary) by default."""
+    sql = """SELECT r.name, r.beads, r.padding, r.gpus, p.* FROM performance p
+             JOIN runs r ON r.name = p.run_name"""
+    if last_block_only:
+        sql += " WHERE p.block = (SELECT MAX(block) FROM performance q WHERE q.run_name = p.run_name)"
+    sql += " ORDER BY p.mpi_tasks, p.omp_threads, p.natoms"
+    conn = connect(db_path)
+    try:
+        return [dict(r) for r in conn.execute(sql)]
+    finally:
+        conn.close()
+
+def query_timing(db_path=None, section=None, last_block_only=True):
+    """MPI task timing breakdown rows (optionally for one section) with the run's task layout."""
+    sql = """SELECT t.*, p.mpi_tasks, p.omp_threads, p.natoms FROM timing t
+             JOIN performance p ON p.run_name = t.run_name AND p.block = t.block"""
+    clauses, params = [], []
+    if section:
+        clauses.append('t.section = ?')
+        params.append(section)
+    if last_block_only:
+        clauses.append('t.block = (SELECT MAX(block) FROM performance q WHERE q.run_name = t.run_name)')
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY p.mpi_tasks, t.run_name, t.section'
+    conn = connect(db_path)
+    try:
+        return [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+def query_runs(db_path=None, where=None, params=(), order_by='wall_time'):
+    """Rows as dicts, optionally filtered by an SQL where clause (e.g. 'padding = ?').
+
+    Each dict also carries 'time_sec' (the wall time), the key plot_performance uses.
+    """
+    sql = 'SELECT * FROM runs'
+    if where:
+        sql += f' WHERE {where}'
+    sql += f' ORDER BY {order_by} IS NULL, {order_by}'
+    conn = connect(db_path)
+    try:
+        rows = [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+    for r in rows:
+        r['time_sec'] = r['wall_time']
+    return rows
+
+def _format_time(wall_time):
+    if wall_time is None:
+        return "N/A"
+    return f"{int(wall_time // 60)}:{int(wall_time % 60):02d}"
+
+def export_tracking_txt(tracking_file, db_path=None):
+    """Write the legacy fixed-width tracking.txt (sorted by wall time) from the database."""
+    rows = query_runs(db_path)
+    tmp = f'{tracking_file}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(f"{'Simulation':<70} {'Box X':<10} {'Box Y':<10} {'Box Z':<10} {'Atoms':<10} {'Simulation Time':<15}\n")
+        f.write("-" * 125 + "\n")
+        for r in rows:
+            box_str = f"{r['box_x'] or 0:<10.2f} {r['box_y'] or 0:<10.2f} {r['box_z'] or 0:<10.2f}"
+            f.write(f"{r['name']:<70} {box_str} {r['natoms']:<10} {_format_time(r['wall_time']):<15}\n")
+    os.replace(tmp, tracking_file)
+
+def import_tracking_txt(tracking_file, db_path=None):
+    """Load the entries of an existing tracking.txt into the database; returns the number added."""
+    if not os.path.exists(tracking_file):
+        return 0
+    added = 0
+    with open(tracking_file, 'r') as f:
+        for line in f.readlines()[2:]:
+            parts = line.split()
+            if len(parts) < 6:
+                continue
+            time_str = parts[5]
+            if ':' in time_str:
+                fields = [int(v) for v in time_str.split(':')]
+                wall_time = fields[0] * 60 + fields[1] if len(fields) == 2 else \
+                    fields[0] * 3600 + fields[1] * 60 + fields[2]
+            else:
+                wall_time = None
+            box_dims = {'x': float(parts[1]), 'y': float(parts[2]), 'z': float(parts[3])}
+            added += record_run(parts[0], box_dims, int(parts[4]), wall_time, db_path=db_path)
+    return added
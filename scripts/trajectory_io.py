@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import sys
+import os
+import json
+import mmap
+import hashlib
+import numpy as np
+
+from output_cache import CACHE_DIR, DIGEST_BYTES
+
+# HOW TO RUN
+# python trajectory_io.py <file.lammpstrj> [--every N]
+# Builds (or updates) the frame index and prints one line per N-th frame.
+#
+# From Python:
+#   from trajectory_io import Trajectory
+#   with Trajectory('traj_files/polymer_<run>.lammpstrj') as traj:
+#       for frame in traj.iter_frames(step=10):      # every 10th frame
+#           x, y, z = frame['x'], frame['y'], frame['z']
+#       last = traj.frame_at(traj.timesteps[-1])     # random access by timestep
+
+# Byte offsets and header of every frame; saved next to the dump in .npcache
+INDEX_DTYPE = [('timestep', 'i8'), ('natoms', 'i8'), ('offset', 'i8'), ('data_offset', 'i8'),
+               ('end', 'i8'), ('box', 'f8', (3, 2))]
+INT_COLUMNS = ('id', 'type', 'mol', 'ix', 'iy', 'iz')
+HEADER_BYTES = 4096
+
+def _index_prefix(path):
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, CACHE_DIR, f'{name}.frames')
+
+def _parse_header(header):
+    """timestep, natoms, box (3x2), columns and the length of the header text of one frame."""
+    lines = header.split(b'\n')
+    timestep, natoms = int(lines[1]), int(lines[3])
+    box = np.array([[float(v) for v in line.split()[:2]] for line in lines[5:8]])
+    atoms_line = lines[8]
+    if not atoms_line.startswith(b'ITEM: ATOMS'):
+        raise ValueError(f"Unexpected dump header line: {atoms_line[:80]!r}")
+    columns = atoms_line.split()[2:]
+    length = sum(len(line) + 1 for line in lines[:9])
+    return timestep, natoms, box, [c.decode() for c in columns], length
+
+def scan_frames(mm, start=0):
+    """Index the complete frames of a mapped dump from byte start on.
+
+    Returns (index rows, columns). Each frame's end is the start of the next
+    ITEM: TIMESTEP, found with mmap.find, so the scan holds at most one frame
+    in memory. A last frame with fewer atom lines than it declares (still being
+    written) is left out.
+    """
+    rows, columns = [], None
+    pos = mm.find(b'ITEM: TIMESTEP', start)
+    while pos != -1:
+        try:
+            timestep, natoms, box, columns, length = _parse_header(mm[pos:pos + HEADER_BYTES])
+        except (ValueError, IndexError):
+            break  # Header cut off mid-write
+        data_offset = pos + length
+        nxt = mm.find(b'ITEM: TIMESTEP', data_offset)
+        end = nxt
+        if nxt == -1:
+            # Last frame: stop after its natoms lines, ignoring a partly written next header
+            newlines = np.flatnonzero(np.frombuffer(mm[data_offset:], dtype=np.uint8) == 10)
+            if len(newlines) < natoms:
+                break
+            end = data_offset + int(newlines[natoms - 1]) + 1 if natoms else data_offset
+        rows.append((timestep, natoms, pos, data_offset, end, box))
+        pos = nxt
+    return np.array(rows, dtype=INDEX_DTYPE), columns
+
+class Trajectory:
+    """Memory-mapped LAMMPS dump (.lammpstrj) with a byte-offset index of its frames.
+
+    The index is built on the first open and saved to .npcache next to the
+    dump; later opens load it, and if the dump has grown only the new part is
+    scanned. Frames are parsed one at a time into dicts of column arrays
+    (id, type, mol, x, y, z, ... as the dump has them) plus 'timestep' and
+    'box' (3x2 lo/hi), so memory stays at one frame whatever the file size.
+    """
+
+    def __init__(self, path, save_index=True):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.index, self.columns = self._load_or_build_index(save_index)
+        self.timesteps = self.index['timestep']
+
+    def _load_or_build_index(self, save_index):
+        prefix = _index_prefix(self.path)
+        size = len(self._mm)
+        digest = hashlib.sha1(self._mm[:DIGEST_BYTES]).hexdigest()
+        index, columns, start = None, None, 0
+        try:
+            with open(prefix + '.json', 'r') as f:
+                meta = json.load(f)
+            if meta['digest'] == digest and meta['size'] <= size:
+                index, columns = np.load(prefix + '.npy'), meta['columns']
+                if meta['size'] == size:
+                    return index, columns
+                # The dump grew: rescan from the last frame, which may have been extended
+                index, start = index[:-1], int(index['offset'][-1]) if len(index) else 0
+        except (OSError, ValueError, KeyError):
+            index = None
+
+        new, new_columns = scan_frames(self._mm, start)
+        index = np.concatenate([index, new]) if index is not None else new
+        columns = new_columns or columns or []
+        if save_index:
+            self._save_index(prefix, index, {'size': size, 'digest': digest, 'columns': columns})
+        return index, columns
+
+    @staticmethod
+    def _save_index(prefix, index, meta):
+        try:
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+            np.save(prefix + '.tmp.npy', index)
+            os.replace(prefix + '.tmp.npy', prefix + '.npy')
+            with open(prefix + '.json.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.replace(prefix + '.json.tmp', prefix + '.json')
+        except OSError:
+            pass  # Read-only scratch directory: the index is rebuilt next time
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def frame(self, i, types=None, sort=False):
+        """Frame i as a dict of column arrays.
+
+        types keeps only atoms of those types (e.g. (1, 2) for the polymer);
+        sort orders atoms by id, which LAMMPS does not do unless dump_modify sort is set.
+        """
+        row = self.index[i]
+        block = self._mm[row['data_offset']:row['end']]
+        values = np.fromstring(block, sep=' ')
+        n_cols = len(self.columns)
+        if values.size != row['natoms'] * n_cols:
+            raise ValueError(f"Frame at timestep {row['timestep']} of {self.path} is malformed")
+        values = values.reshape(row['natoms'], n_cols)
+
+        if types is not None and 'type' in self.columns:
+            values = values[np.isin(values[:, self.columns.index('type')], types)]
+        if sort and 'id' in self.columns:
+            values = values[np.argsort(values[:, self.columns.index('id')], kind='stable')]
+
+        frame = {'timestep': int(row['timestep']), 'box': row['box'].copy()}
+        for j, name in enumerate(self.columns):
+            frame[name] = values[:, j].astype(np.int64) if name in INT_COLUMNS else values[:, j]
+        return frame
+
+    def frame_at(self, timestep, **kwargs):
+        """The frame dumped at timestep (the last one if a restart wrote it twice)."""
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            raise KeyError(f"No frame at timestep {timestep} in {self.path}")
+        return self.frame(matches[-1], **kwargs)
+
+    def iter_frames(self, start=0, stop=None, step=1, **kwargs):
+        """Frames start, start + step, ... (negative indices count from the end)."""
+        for i in range(*slice(start, stop, step).indices(len(self))):
+            yield self.frame(i, **kwargs)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python trajectory_io.py <file.lammpstrj> [--every N]")
+        sys.exit(1)
+
+    every = int(sys.argv[sys.argv.index('--every') + 1]) if '--every' in sys.argv else 1
+    with Trajectory(sys.argv[1]) as traj:
+        if not len(traj):
+            print(f"No complete frames in {sys.argv[1]}")
+            sys.exit(1)
+        print(f"{len(traj)} frames, timesteps {traj.timesteps[0]}-{traj.timesteps[-1]}, "
+              f"columns: {' '.join(traj.columns)}")
+        for frame in traj.iter_frames(step=every):
+            lengths = frame['box'][:, 1] - frame['box'][:, 0]
+            print(f"  {frame['timestep']:>12}  {len(frame['id'] if 'id' in frame else [])} atoms  "
+                  f"box {lengths[0]:.2f} x {lengths[1]:.2f} x {lengths[2]:.2f}")
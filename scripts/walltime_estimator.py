@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import sys
+import os
+import numpy as np
+
+import tracking_db
+
+# HOW TO RUN
+# cd ~/Documents/lammps_work/scripts
+# python walltime_estimator.py <dataname> <nsteps> [--type stress] [--ntasks 120] [--threads 1]
+#        [--gpus 0] [--oldsteps 0] [--natoms N] [--limit 48:00:00]
+# e.g. python walltime_estimator.py slab_support_5beads_10x10x5_rho6_extra_padding43 10000000 --type stress
+#
+# Fits log(time/step) = b0 + b1 log(atoms) + b2 log(MPI tasks) + b3 log(OpenMP threads)
+# + b4 log(1 + GPUs) per configuration class on the runs in tracking.db, predicts
+# the wall time of the run with a confidence interval, and splits it into restart
+# segments that fit the queue time limit.
+
+MODEL_CLASSES = ('sim_only', 'stress', 'volume', 'stressvol', 'piston')
+TYPE_SUFFIX = {'': '', 'stress': '1', 'volume': '2', 'stressvol': '3'}
+FEATURES = ('natoms', 'mpi_tasks', 'omp_threads', 'gpus')
+# Two-sided 95% Student-t quantiles by degrees of freedom (1-30, then a few larger)
+T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+T_975_LARGE = ((40, 2.021), (60, 2.000), (120, 1.980))
+
+def t_quantile(dof):
+    """Two-sided 95% Student-t quantile for dof degrees of freedom (1.96 in the normal limit)."""
+    if dof <= len(T_975):
+        return T_975[max(dof, 1) - 1]
+    for limit, t in T_975_LARGE:
+        if dof <= limit:
+            return t
+    return 1.96
+
+def model_class(padding):
+    """Cost model class of a padding code: piston runs share one class, the rest go by output type."""
+    cls = tracking_db.run_class(padding)
+    if cls is None:
+        return None
+    return 'piston' if cls.endswith('_piston') else cls
+
+def _feature(name, value):
+    return np.log1p(value) if name == 'gpus' else np.log(value)
+
+def training_rows(db_path=None):
+    """Runs of tracking.db as dicts with the cost model features and their time per step.
+
+    Runs with a stored performance breakdown use the production (last) loop for
+    time/step and the earlier loops (minimization, soft push, equilibration) as
+    setup overhead; runs imported from tracking.txt use wall time / nsteps.
+    """
+    perf = {}
+    for p in tracking_db.query_performance(db_path, last_block_only=False):
+        perf.setdefault(p['run_name'], []).append(p)
+
+    rows = []
+    for r in tracking_db.query_runs(db_path, where='wall_time IS NOT NULL AND nsteps > 0'):
+        row = {'name': r['name'], 'cls': model_class(r['padding']), 'natoms': r['natoms'],
+               'mpi_tasks': r['mpi_tasks'], 'omp_threads': r['omp_threads'], 'gpus': r['gpus'] or 0,
+               'time_per_step': r['wall_time'] / r['nsteps'], 'overhead': None}
+        blocks = sorted(perf.get(r['name'], []), key=lambda p: p['block'])
+        if blocks and blocks[-1]['nsteps'] and blocks[-1]['loop_time']:
+            last = blocks[-1]
+            row.update(time_per_step=last['loop_time'] / last['nsteps'],
+                       overhead=sum(p['loop_time'] or 0 for p in blocks[:-1]),
+                       mpi_tasks=last['mpi_tasks'] or row['mpi_tasks'],
+                       omp_threads=last['omp_threads'] or row['omp_threads'])
+        if row['natoms'] and row['time_per_step'] > 0:
+            rows.append(row)
+    return rows
+
+def fit_cost_model(rows):
+    """Least-squares fit of log(time/step) on the log features that are known and vary in rows.
+
+    Returns a model dict (features, coef, xtx_inv, sigma, n, dof, overhead_per_atom)
+    or None when there are not enough runs for the features used.
+    """
+    features = ['natoms']
+    for name in FEATURES[1:]:
+        values = [r[name] for r in rows]
+        if all(v is not None for v in values) and len(set(values)) > 1:
+            features.append(name)
+    if len(set(r['natoms'] for r in rows)) < 2:
+        features.remove('natoms')
+    if len(rows) < len(features) + 2:
+        return None
+
+    X = np.column_stack([np.ones(len(rows))] +
+                        [[_feature(f, r[f]) for r in rows] for f in features])
+    y = np.log([r['time_per_step'] for r in rows])
+    coef, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    if rank < X.shape[1]:
+        return None
+    dof = len(rows) - X.shape[1]
+    resid = y - X @ coef
+    overheads = [r['overhead'] / r['natoms'] for r in rows if r['overhead'] is not None]
+    return {'features': features, 'coef': coef, 'xtx_inv': np.linalg.inv(X.T @ X),
+            'sigma': float(np.sqrt(resid @ resid / dof)) if dof else 0.0, 'n': len(rows), 'dof': dof,
+            'overhead_per_atom': float(np.median(overheads)) if overheads else 0.0,
+            'layouts': sorted({(r['mpi_tasks'], r['omp_threads'], r['gpus']) for r in rows},
+                              key=str)}
+
+def fit_models(db_path=None):
+    """A cost model per class in MODEL_CLASSES that has enough runs, plus 'all' fitted on every run."""
+    rows = training_rows(db_path)
+    models = {}
+    for cls in MODEL_CLASSES:
+        model = fit_cost_model([r for r in rows if r['cls'] == cls])
+        if model is not None:
+            models[cls] = model
+    model = fit_cost_model(rows)
+    if model is not None:
+        models['all'] = model
+    return models
+
+def predict(model, natoms, nsteps, mpi_tasks=120, omp_threads=1, gpus=0, fresh=True, z=None):
+    """Predicted wall time (s) of nsteps with a 95% prediction interval (z sigma when z is given).
+
+    The interval combines the residual scatter of the fit with the uncertainty
+    of its coefficients at this point, and uses the Student-t quantile for the
+    fit's degrees of freedom since a class often has only a few runs. fresh
+    adds the setup overhead a run with oldsteps = 0 pays before production.
+    """
+    if z is None:
+        z = t_quantile(model['dof'])
+    values = {'natoms': natoms, 'mpi_tasks': mpi_tasks, 'omp_threads': omp_threads, 'gpus': gpus}
+    x = np.array([1.0] + [_feature(f, values[f]) for f in model['features']])
+    log_t = float(x @ model['coef'])
+    spread = z * model['sigma'] * np.sqrt(1 + x @ model['xtx_inv'] @ x)
+    overhead = model['overhead_per_atom'] * natoms if fresh else 0.0
+    return {'time_per_step': np.exp(log_t), 'overhead': overhead,
+            'wall_time': np.exp(log_t) * nsteps + overhead,
+            'lower': np.exp(log_t - spread) * nsteps + overhead,
+            'upper': np.exp(log_t + spread) * nsteps + overhead}
+
+def split_segments(model, natoms, nsteps, oldsteps=0, time_limit=48 * 3600, safety=0.9,
+                   round_to=10000, **layout):
+    """Split nsteps into restart segments whose upper wall time bound fits safety * time_limit.
+
+    Segment lengths are rounded down to multiples of round_to (keep it a
+    multiple of the ave/time and dump frequencies). Returns a list of dicts with
+    oldsteps, nsteps, totsteps and the prediction of each segment.
+    """
+    segments = []
+    remaining = nsteps
+    while remaining > 0:
+        fresh = oldsteps == 0
+        one_step = predict(model, natoms, 1, fresh=fresh, **layout)
+        budget = safety * time_limit - one_step['overhead']
+        upper_per_step = one_step['upper'] - one_step['overhead']
+        max_steps = int(budget / upper_per_step) // round_to * round_to if budget > 0 else 0
+        if max_steps <= 0:
+            raise ValueError(f"Not even {round_to} steps fit in {format_time(time_limit)}")
+        seg_steps = min(remaining, max_steps)
+        segments.append({'oldsteps': oldsteps, 'nsteps': seg_steps, 'totsteps': oldsteps + seg_steps,
+                         **predict(model, natoms, seg_steps, fresh=fresh, **layout)})
+        oldsteps += seg_steps
+        remaining -= seg_steps
+    return segments
+
+def format_time(seconds):
+    """H:MM:SS, the format of #SBATCH --time."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def parse_time(text):
+    """Seconds from H:MM:SS, MM:SS or D-HH:MM:SS."""
+    days = 0
+    if '-' in text:
+        days, text = text.split('-')
+    fields = [int(v) for v in text.split(':')]
+    while len(fields) < 3:
+        fields.insert(0, 0)
+    return int(days) * 86400 + fields[0] * 3600 + fields[1] * 60 + fields[2]
+
+def dataname_atoms(dataname, data_dir=None):
+    """Atom count of ~/Documents/lammps_data/input_data/<dataname>.data, or None."""
+    from lammps_data_io import data_file_summary
+    data_dir = data_dir or os.path.join(os.path.expanduser('~'), 'Documents', 'lammps_data', 'input_data')
+    path = os.path.join(data_dir, f'{dataname}.data')
+    return data_file_summary(path)['atoms'] if os.path.exists(path) else None
+
+def estimate(dataname, nsteps, run_type='', natoms=None, oldsteps=0, time_limit=48 * 3600,
+             db_path=None, **layout):
+    """Pick the model for dataname (+ run type) and return (class, model, prediction, segments)."""
+    natoms = natoms or dataname_atoms(dataname)
+    if not natoms:
+        raise ValueError(f"Unknown atom count for {dataname}: pass natoms")
+    # Tracking names carry the type suffix right after the padding code
+    cls = model_class(tracking_db.parse_run_name(f'{dataname}{TYPE_SUFFIX[run_type]}_0')['padding'])
+    models = fit_models(db_path)
+    name = cls if cls in models else 'all'
+    if name not in models:
+        raise ValueError("Not enough runs with wall times in the tracking database to fit a model")
+    model = models[name]
+    prediction = predict(model, natoms, nsteps, fresh=oldsteps == 0, **layout)
+    segments = split_segments(model, natoms, nsteps, oldsteps, time_limit, **layout)
+    return name, model, prediction, segments
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {'--type': '', '--ntasks': '120', '--threads': '1', '--gpus': '0',
+               '--oldsteps': '0', '--natoms': None, '--limit': '48:00:00'}
+    for key in options:
+        if key in args:
+            i = args.index(key)
+            options[key] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) < 2:
+        print("Usage: python walltime_estimator.py <dataname> <nsteps> [--type stress|volume|stressvol] "
+              "[--ntasks N] [--threads M] [--gpus G] [--oldsteps N] [--natoms N] [--limit H:MM:SS]")
+        sys.exit(1)
+
+    dataname, nsteps = args[0], int(args[1])
+    layout = {'mpi_tasks': int(options['--ntasks']), 'omp_threads': int(options['--threads']),
+              'gpus': int(options['--gpus'])}
+    time_limit = parse_time(options['--limit'])
+    cls, model, prediction, segments = estimate(
+        dataname, nsteps, options['--type'], int(options['--natoms'] or 0) or None,
+        int(options['--oldsteps']), time_limit, **layout)
+
+    print(f"Model: {cls} ({model['n']} runs, features: {', '.join(model['features'])}, "
+          f"residual sigma {model['sigma']:.3f} in log time/step)")
+    print(f"Time per step: {prediction['time_per_step']:.4g} s")
+    print(f"Wall time for {nsteps} steps: {format_time(prediction['wall_time'])} "
+          f"(95% interval {format_time(prediction['lower'])} - {format_time(prediction['upper'])})")
+    if len(segments) == 1:
+        print(f"Fits in one job: #SBATCH --time={format_time(min(prediction['upper'] * 1.1, time_limit))}")
+    else:
+        print(f"Split into {len(segments)} restart segments within {options['--limit']}:")
+    suffix_arg = f" {options['--type']}" if options['--type'] else ''
+    for seg in segments:
+        print(f"  ./run_lammps.sh <folder> {dataname} <interaction> {seg['nsteps']} {seg['oldsteps']}"
+              f"{suffix_arg}   # ~{format_time(seg['wall_time'])}, at most {format_time(seg['upper'])}")